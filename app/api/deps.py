@@ -14,6 +14,10 @@ from app.core.license_checker import LicenseChecker
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    return user_from_token(token, db)
+
+def user_from_token(token: str, db: Session) -> User:
+    """Validates a bearer token (logout blacklist, signature, expiry, user) and returns its user."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
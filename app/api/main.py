@@ -1,21 +1,28 @@
+import asyncio
 import csv
 import io
 import os
+import json
+import base64
 import shutil
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
-from sqlalchemy.orm import Session, selectinload
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session, selectinload, contains_eager
 from sqlalchemy.exc import IntegrityError
-from app.db.session import get_db
-from app.db.models import Corso, Certificato, ValidationStatus, Dipendente, User as UserModel
-from app.services import ai_extraction, certificate_logic, matcher
+from app.db.session import get_db, get_read_db
+from app.db.models import Corso, Certificato, ValidationStatus, Dipendente, StatoCertificato, ImportJob, ImportJobItem, User as UserModel
+from app.services import ai_extraction, certificate_logic, matcher, import_jobs, extraction_cache
 from app.services.document_locator import find_document, construct_certificate_path
+from app.services.document_index import document_index
 from app.services.sync_service import archive_certificate_file, link_orphaned_certificates, get_unique_filename, remove_empty_folders
 from app.core.config import settings, get_user_data_dir
 from app.utils.date_parser import parse_date_flexible
 from app.utils.file_security import verify_file_signature
 from app.utils.audit import log_security_action
 from app.api import deps
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional, List
 import charset_normalizer
 from app.schemas.schemas import (
@@ -70,6 +77,7 @@ def _move_linked_cert_file(cert, match, old_path, database_path, db):
     if old_path != new_path:
         os.makedirs(os.path.dirname(new_path), exist_ok=True)
         shutil.move(old_path, new_path)
+        document_index.record_move(old_path, new_path)
 
 def _process_orphan_cert(cert, match, database_path, db):
     """
@@ -101,28 +109,6 @@ async def _read_file_securely(file: UploadFile, max_size: int) -> bytes:
             raise HTTPException(status_code=413, detail=f"Il file supera il limite massimo di {max_size // (1024*1024)}MB.")
     return bytes(content)
 
-def _normalize_extracted_dates(extracted_data):
-    """Parses and normalizes dates in extracted data."""
-    for date_field in ["data_scadenza", "data_rilascio", "data_nascita"]:
-        if extracted_data.get(date_field):
-            parsed_date = parse_date_flexible(extracted_data[date_field])
-            if parsed_date:
-                extracted_data[date_field] = parsed_date.strftime(DATE_FORMAT_DMY)
-
-def _infer_expiration_date(db, extracted_data):
-    """Calculates missing expiration date based on course category."""
-    if not extracted_data.get("data_scadenza") and extracted_data.get("data_rilascio"):
-        try:
-            issue_date = datetime.strptime(extracted_data["data_rilascio"], DATE_FORMAT_DMY).date()
-            category = extracted_data.get("categoria")
-            course = db.query(Corso).filter(Corso.categoria_corso.ilike(f"%{category}%")).first()
-            if course:
-                expiration_date = certificate_logic.calculate_expiration_date(issue_date, course.validita_mesi)
-                if expiration_date:
-                    extracted_data["data_scadenza"] = expiration_date.strftime(DATE_FORMAT_DMY)
-        except (ValueError, TypeError):
-            pass
-
 def _append_cert_to_result(cert, status_map, result):
     """Helper to format and append certificate to result list."""
     ragione_fallimento = None
@@ -231,6 +217,7 @@ def _handle_file_rename(database_path, status, old_file_path, new_cert_data):
         new_file_path = os.path.join(dest_dir, unique_filename)
 
         shutil.move(old_file_path, new_file_path)
+        document_index.record_move(old_file_path, new_file_path)
         return True, new_file_path
 
     return False, None
@@ -476,7 +463,12 @@ async def upload_pdf(
     if not verify_file_signature(pdf_bytes, 'pdf'):
          raise HTTPException(status_code=400, detail="File non valido: firma digitale PDF non riconosciuta.")
 
-    extracted_data = ai_extraction.extract_entities_with_ai(pdf_bytes)
+    cache_key = extraction_cache.content_hash(pdf_bytes)
+    extracted_data = extraction_cache.lookup(db, cache_key)
+    if extracted_data is None:
+        # Off the event loop: the rate limiter may hold the call for a while
+        extracted_data = await run_in_threadpool(ai_extraction.extract_entities_with_ai, pdf_bytes)
+        extraction_cache.store(db, cache_key, extracted_data)
     if "error" in extracted_data:
         if extracted_data.get("is_rejected"):
              log_security_action(db, current_user, "AI_REJECT", f"File rejected by AI: {file.filename}. Reason: {extracted_data['error']}", category="AI_ANALYSIS", severity="MEDIUM")
@@ -485,27 +477,216 @@ async def upload_pdf(
             raise HTTPException(status_code=429, detail=extracted_data["error"])
         raise HTTPException(status_code=500, detail=extracted_data["error"])
 
-    _normalize_extracted_dates(extracted_data)
-    _infer_expiration_date(db, extracted_data)
+    import_jobs.normalize_extracted_dates(extracted_data)
+    import_jobs.infer_expiration_date(db, extracted_data)
 
     return {"filename": file.filename, "entities": extracted_data}
 
-@router.get("/certificati/", response_model=List[CertificatoSchema], dependencies=[Depends(deps.verify_license)])
-def get_certificati(validated: Optional[bool] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(Certificato).options(selectinload(Certificato.dipendente), selectinload(Certificato.corso))
+# --- Batch import jobs ---
+# Files are queued and extracted by the server's worker pool (see services/import_jobs):
+# clients submit, then poll the job/items or follow the event stream.
+
+STR_JOB_NON_TROVATO = "Job di importazione non trovato"
+
+def _get_import_job(db, job_id, current_user):
+    job = db.get(ImportJob, job_id)
+    if not job or (job.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail=STR_JOB_NON_TROVATO)
+    return job
+
+async def _read_job_files(files: List[UploadFile]):
+    staged = []
+    for file in files:
+        pdf_bytes = await _read_file_securely(file, settings.MAX_UPLOAD_SIZE)
+        if not verify_file_signature(pdf_bytes, 'pdf'):
+            raise HTTPException(status_code=400, detail=f"File non valido: {file.filename} non è un PDF.")
+        staged.append((file.filename, pdf_bytes))
+    return staged
+
+@router.post("/import-jobs/", status_code=202, dependencies=[Depends(deps.check_write_permission), Depends(deps.verify_license)])
+async def create_import_job(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(deps.get_current_user)
+):
+    job, items = import_jobs.create_job(db, current_user, await _read_job_files(files))
+    return {**import_jobs.job_summary(job), "items": [import_jobs.item_summary(i) for i in items]}
+
+@router.post("/import-jobs/{job_id}/files", status_code=202, dependencies=[Depends(deps.check_write_permission), Depends(deps.verify_license)])
+async def add_import_job_files(
+    job_id: str,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(deps.get_current_user)
+):
+    job = _get_import_job(db, job_id, current_user)
+    staged = await _read_job_files(files)
+    try:
+        items = import_jobs.add_files(db, job, staged)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**import_jobs.job_summary(job), "items": [import_jobs.item_summary(i) for i in items]}
+
+@router.get("/import-jobs/{job_id}")
+def get_import_job(job_id: str, db: Session = Depends(get_read_db), current_user: UserModel = Depends(deps.get_current_user)):
+    return import_jobs.job_summary(_get_import_job(db, job_id, current_user))
+
+@router.get("/import-jobs/{job_id}/items")
+def get_import_job_items(
+    job_id: str,
+    status: Optional[str] = Query(None, description="Comma-separated item statuses"),
+    db: Session = Depends(get_read_db),
+    current_user: UserModel = Depends(deps.get_current_user)
+):
+    job = _get_import_job(db, job_id, current_user)
+    wanted = set(status.split(",")) if status else None
+    return [import_jobs.item_summary(i) for i in job.items if wanted is None or i.status in wanted]
+
+@router.get("/import-jobs/{job_id}/items/{item_id}")
+def get_import_job_item(job_id: str, item_id: int, db: Session = Depends(get_read_db), current_user: UserModel = Depends(deps.get_current_user)):
+    job = _get_import_job(db, job_id, current_user)
+    item = db.get(ImportJobItem, item_id)
+    if not item or item.job_id != job.id:
+        raise HTTPException(status_code=404, detail=STR_JOB_NON_TROVATO)
+    return import_jobs.item_summary(item)
+
+@router.get("/import-jobs/{job_id}/events")
+def stream_import_job(job_id: str, db: Session = Depends(get_read_db), current_user: UserModel = Depends(deps.get_current_user)):
+    """Server-sent events: the job summary every time it changes, until the job ends."""
+    _get_import_job(db, job_id, current_user)
+
+    async def events():
+        last = None
+        while True:
+            summary = await run_in_threadpool(import_jobs.read_job_summary, job_id)
+            if summary != last:
+                yield f"data: {json.dumps(summary)}\n\n"
+                last = summary
+            if summary is None or summary["status"] != import_jobs.JOB_RUNNING:
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.delete("/import-jobs/{job_id}", dependencies=[Depends(deps.check_write_permission)])
+def cancel_import_job(job_id: str, db: Session = Depends(get_db), current_user: UserModel = Depends(deps.get_current_user)):
+    job = _get_import_job(db, job_id, current_user)
+    if job.status == import_jobs.JOB_RUNNING:
+        import_jobs.cancel_job(db, job)
+    return import_jobs.job_summary(job)
+
+# Sort keys for GET /certificati/: (expression, decoder for cursor values).
+# Nullable columns are coalesced so keyset comparisons never hit NULL.
+_CERT_SORT_KEYS = {
+    "id": (Certificato.id, int),
+    "nome": (func.lower(func.coalesce(Dipendente.cognome + " " + Dipendente.nome, Certificato.nome_dipendente_raw, "")), str),
+    "corso": (func.lower(Corso.nome_corso), str),
+    "categoria": (func.lower(func.coalesce(Corso.categoria_corso, "")), str),
+    "data_rilascio": (func.coalesce(Certificato.data_rilascio, date.min), date.fromisoformat),
+    "data_scadenza": (func.coalesce(Certificato.data_scadenza_calcolata, date.max), date.fromisoformat),
+    "stato": (func.coalesce(StatoCertificato.stato, ""), str),
+}
+
+def _encode_cert_cursor(sort_value, cert_id):
+    payload = json.dumps([sort_value.isoformat() if isinstance(sort_value, date) else sort_value, cert_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def _decode_cert_cursor(cursor, decoder):
+    try:
+        sort_value, cert_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return decoder(sort_value), int(cert_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursore di paginazione non valido.")
+
+def _filter_certificati_query(query, validated, assegnato, search, categoria, stato, scadenza_da, scadenza_a):
+    """Applies the listing filters. Every condition is evaluated in SQL."""
     if validated is not None:
         query = query.filter(Certificato.stato_validazione == (ValidationStatus.MANUAL if validated else ValidationStatus.AUTOMATIC))
+    if assegnato is not None:
+        query = query.filter(Certificato.dipendente_id.isnot(None) if assegnato else Certificato.dipendente_id.is_(None))
+    if search and search.strip():
+        pattern = f"%{search.strip()}%"
+        query = query.filter(or_(
+            (Dipendente.cognome + " " + Dipendente.nome).ilike(pattern),
+            Dipendente.matricola.ilike(pattern),
+            Certificato.nome_dipendente_raw.ilike(pattern),
+            Corso.nome_corso.ilike(pattern),
+            Corso.categoria_corso.ilike(pattern)
+        ))
+    if categoria:
+        query = query.filter(func.upper(Corso.categoria_corso) == categoria.strip().upper())
+    if stato:
+        # Certificates without a current status row are classified in SQL too
+        query = query.filter(certificate_logic.status_expression(date.today()).in_(stato))
+    if scadenza_da:
+        query = query.filter(Certificato.data_scadenza_calcolata >= scadenza_da)
+    if scadenza_a:
+        query = query.filter(Certificato.data_scadenza_calcolata <= scadenza_a)
+    return query
+
+def _apply_cert_keyset(query, sort_expr, decoder, descending, cursor):
+    if cursor:
+        last_value, last_id = _decode_cert_cursor(cursor, decoder)
+        if descending:
+            query = query.filter(or_(sort_expr < last_value, and_(sort_expr == last_value, Certificato.id < last_id)))
+        else:
+            query = query.filter(or_(sort_expr > last_value, and_(sort_expr == last_value, Certificato.id > last_id)))
+    if descending:
+        return query.order_by(sort_expr.desc(), Certificato.id.desc())
+    return query.order_by(sort_expr.asc(), Certificato.id.asc())
 
-    certificati = query.all()
+@router.get("/certificati/", response_model=List[CertificatoSchema], dependencies=[Depends(deps.verify_license)])
+def get_certificati(
+    response: Response,
+    validated: Optional[bool] = Query(None),
+    assegnato: Optional[bool] = Query(None),
+    search: Optional[str] = Query(None),
+    categoria: Optional[str] = Query(None),
+    stato: Optional[List[str]] = Query(None),
+    scadenza_da: Optional[date] = Query(None),
+    scadenza_a: Optional[date] = Query(None),
+    sort: str = Query("id"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Lists certificates with server-side filtering and sorting.
+    Without `limit` the whole (filtered) list is returned. With `limit` results are
+    paginated by keyset: X-Next-Cursor carries the cursor of the next page and
+    X-Total-Count the number of matching certificates.
+    """
+    if sort not in _CERT_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Ordinamento non supportato: {sort}")
+    sort_expr, decoder = _CERT_SORT_KEYS[sort]
 
-    # Optimize: Calculate statuses in bulk to avoid N+1 queries
-    status_map = certificate_logic.get_bulk_certificate_statuses(db, certificati)
+    query = db.query(Certificato, sort_expr.label("sort_key"))\
+        .join(Corso, Certificato.corso_id == Corso.id)\
+        .outerjoin(Dipendente, Certificato.dipendente_id == Dipendente.id)\
+        .outerjoin(StatoCertificato, and_(StatoCertificato.certificato_id == Certificato.id, StatoCertificato.aggiornato_il == date.today()))\
+        .options(contains_eager(Certificato.corso), contains_eager(Certificato.dipendente))
+    query = _filter_certificati_query(query, validated, assegnato, search, categoria, stato, scadenza_da, scadenza_a)
+
+    total = query.count() if limit else None
+    query = _apply_cert_keyset(query, sort_expr, decoder, order == "desc", cursor)
+    rows = query.limit(limit + 1).all() if limit else query.all()
+
+    has_more = bool(limit) and len(rows) > limit
+    rows = rows[:limit] if limit else rows
+    certificati = [cert for cert, _ in rows]
+
+    # Statuses come from the materialized table; only stale rows are recomputed
+    status_map = certificate_logic.get_stored_statuses(db, certificati)
 
     result = []
     for cert in certificati:
-        if not cert.corso:
-            continue
         _append_cert_to_result(cert, status_map, result)
+
+    response.headers["X-Total-Count"] = str(total if total is not None else len(result))
+    if has_more:
+        last_cert, last_key = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cert_cursor(last_key, last_cert.id)
     return result
 
 @router.get("/certificati/{certificato_id}", response_model=CertificatoSchema, dependencies=[Depends(deps.verify_license)])
@@ -643,6 +824,7 @@ def _rollback_file_move(file_moved, old_file_path, new_file_path, certificato_id
     if file_moved and old_file_path and new_file_path:
         try:
             shutil.move(new_file_path, old_file_path)
+            document_index.record_move(new_file_path, old_file_path)
         except Exception as rollback_err:
             print(f"CRITICAL: Failed to rollback file move for cert {certificato_id}: {rollback_err}")
 
@@ -766,6 +948,7 @@ def delete_certificato(
                     dest_path = os.path.join(trash_dir, new_filename)
 
                     shutil.move(file_path, dest_path)
+                    document_index.record_move(file_path, dest_path)
 
                     # Clean up empty folders up to DOCUMENTI DIPENDENTI
                     docs_root = os.path.join(database_path, "DOCUMENTI DIPENDENTI")
@@ -850,7 +1033,7 @@ async def import_dipendenti_csv(
     }
 
 @router.get("/dipendenti", response_model=List[DipendenteSchema], dependencies=[Depends(deps.verify_license)])
-def get_dipendenti(db: Session = Depends(get_db)):
+def get_dipendenti(db: Session = Depends(get_read_db)):
     return db.query(Dipendente).all()
 
 @router.get("/dipendenti/{dipendente_id}", response_model=DipendenteDetailSchema, dependencies=[Depends(deps.verify_license)])
@@ -863,7 +1046,7 @@ def get_dipendente_detail(dipendente_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail=STR_DIP_NON_TROVATO)
 
     # Calculate status for all certs
-    status_map = certificate_logic.get_bulk_certificate_statuses(db, dipendente.certificati)
+    status_map = certificate_logic.get_stored_statuses(db, dipendente.certificati)
 
     cert_schemas = []
     for cert in dipendente.certificati:
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 from app.api.deps import get_current_active_admin, check_write_permission, get_current_user
 from app.core.config import settings, get_user_data_dir
+from app.services import certificate_logic
 import logging
 from pathlib import Path
 
@@ -116,6 +117,10 @@ async def update_mutable_config(
         # Save the updated settings
         settings.save_mutable_settings(filtered_data)
 
+        # "in_scadenza" depends on the alert thresholds
+        if "ALERT_THRESHOLD_DAYS" in filtered_data or "ALERT_THRESHOLD_DAYS_VISITE" in filtered_data:
+            certificate_logic.rollover_statuses()
+
         return None # Return 204 No Content on success
 
     except HTTPException:
@@ -20,13 +20,15 @@ class ChatResponse(BaseModel):
     response: str
 
 @router.post("/", response_model=ChatResponse)
-async def chat_endpoint(
+def chat_endpoint(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Chat endpoint using Gemini Flash with RAG context.
+    A plain def, so FastAPI runs it in the threadpool: the AI rate limiter may
+    make the call wait, and that must not stall the event loop.
     """
     try:
         # 1. Build Context (with user message for smart employee search)
@@ -1,33 +1,33 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from app.db.session import get_db
-from app.db.models import Certificato, Dipendente, Corso, ValidationStatus
+from app.db.session import get_read_db
+from app.db.models import Certificato, Dipendente, ValidationStatus
 from app.api import deps
-from datetime import date, timedelta
-from app.core.config import settings
+from app.services import certificate_logic
 
 router = APIRouter()
 
-@router.get("/summary")
-def get_stats_summary(db: Session = Depends(get_db), current_user = Depends(deps.get_current_user)):
-    today = date.today()
-    threshold = today + timedelta(days=settings.ALERT_THRESHOLD_DAYS)
+# The buckets are the certificate statuses shown in the lists: a certificate
+# without an expiry date is active, and medical visits are "in scadenza" within
+# ALERT_THRESHOLD_DAYS_VISITE. Archived certificates are expired too: they just
+# have a newer replacement.
+_EXPIRED_STATUSES = ("scaduto", "archiviato")
 
+@router.get("/summary")
+def get_stats_summary(db: Session = Depends(get_read_db), current_user = Depends(deps.get_current_user)):
     total_dipendenti = db.query(Dipendente).count()
 
     # Only consider Validated Certificates for stats
-    base_query = db.query(Certificato).filter(Certificato.stato_validazione == ValidationStatus.MANUAL)
-    total_certificati = base_query.count()
-
-    scaduti = base_query.filter(Certificato.data_scadenza_calcolata < today).count()
+    counts = certificate_logic.get_status_counts(db, Certificato.stato_validazione == ValidationStatus.MANUAL)
+    totals = {}
+    for bucket in counts.values():
+        for status, count in bucket.items():
+            totals[status] = totals.get(status, 0) + count
 
-    in_scadenza = base_query.filter(
-        Certificato.data_scadenza_calcolata >= today,
-        Certificato.data_scadenza_calcolata <= threshold
-    ).count()
-
-    validi_safe = base_query.filter(Certificato.data_scadenza_calcolata > threshold).count()
+    total_certificati = sum(totals.values())
+    scaduti = sum(totals.get(s, 0) for s in _EXPIRED_STATUSES)
+    in_scadenza = totals.get("in_scadenza", 0)
+    validi_safe = totals.get("attivo", 0)
 
     compliance = 0
     if total_certificati > 0:
@@ -44,30 +44,17 @@ def get_stats_summary(db: Session = Depends(get_db), current_user = Depends(deps
     }
 
 @router.get("/compliance")
-def get_compliance_by_category(db: Session = Depends(get_db), current_user = Depends(deps.get_current_user)):
-    today = date.today()
-    threshold = today + timedelta(days=settings.ALERT_THRESHOLD_DAYS)
-
-    results = db.query(
-        Corso.categoria_corso,
-        func.count(Certificato.id).label("total"),
-        func.sum(case((Certificato.data_scadenza_calcolata < today, 1), else_=0)).label("scaduti"),
-        func.sum(case((
-            (Certificato.data_scadenza_calcolata >= today) & 
-            (Certificato.data_scadenza_calcolata <= threshold), 1
-        ), else_=0)).label("in_scadenza"),
-        func.sum(case((Certificato.data_scadenza_calcolata > threshold, 1), else_=0)).label("attivi")
-    ).join(Certificato, Corso.id == Certificato.corso_id)\
-     .filter(Certificato.stato_validazione == ValidationStatus.MANUAL)\
-     .group_by(Corso.categoria_corso).all()
+def get_compliance_by_category(db: Session = Depends(get_read_db), current_user = Depends(deps.get_current_user)):
+    counts = certificate_logic.get_status_counts(db, Certificato.stato_validazione == ValidationStatus.MANUAL)
 
     data = []
-    for row in results:
-        cat = row[0]
-        total = row[1] or 0
-        expired = row[2] or 0
-        expiring = row[3] or 0
-        active = row[4] or 0
+    for cat, bucket in counts.items():
+        if cat is None:
+            continue
+        total = sum(bucket.values())
+        expired = sum(bucket.get(s, 0) for s in _EXPIRED_STATUSES)
+        expiring = bucket.get("in_scadenza", 0)
+        active = bucket.get("attivo", 0)
         
         compliance = int((active / total) * 100) if total > 0 else 0
         data.append({
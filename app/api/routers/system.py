@@ -4,6 +4,7 @@ from app.schemas.system import SystemAction
 from app.db.session import SessionLocal, get_db
 from app.services.file_maintenance import organize_expired_files
 from app.services.sync_service import synchronize_all_files
+from app.services import ai_extraction, extraction_cache, pdf_preprocessing
 from app.api import deps
 import logging
 
@@ -35,6 +36,18 @@ def run_maintenance_task():
         db.close()
         MAINTENANCE_RUNNING = False
 
+SYNC_WORKERS = 4  # Employee folders moved in parallel
+
+def run_file_sync_task():
+    """Runs the mass file synchronization in its own session."""
+    db = SessionLocal()
+    try:
+        synchronize_all_files(db, workers=SYNC_WORKERS)
+    except Exception as e:
+        logger.error(f"Error in file synchronization task: {e}")
+    finally:
+        db.close()
+
 @router.post("/maintenance/background", dependencies=[Depends(deps.get_current_user)])
 def trigger_maintenance(background_tasks: BackgroundTasks):
     """
@@ -56,6 +69,34 @@ def get_lock_status():
     from app.core.db_security import db_security
     return {"read_only": db_security.is_read_only}
 
+@router.get("/save-metrics", dependencies=[Depends(deps.get_current_active_admin)])
+def get_save_metrics():
+    """
+    Returns timings (snapshot, diff, encrypt, write) and bytes written by the last
+    database save, plus whether a background save is still running.
+    """
+    from app.core.db_security import db_security
+    return db_security.get_save_metrics()
+
+@router.get("/backups", dependencies=[Depends(deps.get_current_active_admin)])
+def list_backups():
+    """
+    Lists the restore points from the backup catalogue (newest first), with the
+    cached integrity result of each. Does not decrypt or re-read the backups.
+    """
+    from app.core.db_security import db_security
+    return db_security.list_backups()
+
+@router.post("/backups/verify", dependencies=[Depends(deps.get_current_active_admin)])
+def verify_backups(background_tasks: BackgroundTasks, force: bool = False):
+    """
+    Verifies restore points in the background and caches the results in the catalogue.
+    Only unverified or changed backups are checked unless `force` is set.
+    """
+    from app.core.db_security import db_security
+    background_tasks.add_task(db_security.verify_backups, force)
+    return {"status": "started"}
+
 @router.post("/optimize", dependencies=[Depends(deps.get_current_active_admin)])
 def optimize_system(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
@@ -77,6 +118,40 @@ def optimize_system(background_tasks: BackgroundTasks, db: Session = Depends(get
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Optimization failed: {e}")
 
+@router.post("/sync-files", dependencies=[Depends(deps.get_current_active_admin)])
+def sync_files(background_tasks: BackgroundTasks, dry_run: bool = False, db: Session = Depends(get_db)):
+    """
+    Moves every certificate file to the path matching its current data and status.
+    With `dry_run` the move plan is returned and no file is touched; otherwise the
+    moves run in the background.
+    """
+    if dry_run:
+        return synchronize_all_files(db, dry_run=True)
+    background_tasks.add_task(run_file_sync_task)
+    return {"status": "started"}
+
+@router.delete("/ai-cache", dependencies=[Depends(deps.get_current_active_admin)])
+def clear_ai_cache(db: Session = Depends(get_db)):
+    """
+    Drops every cached AI extraction result. Prompt or category changes invalidate
+    the cache on their own; this is for forcing a fresh analysis of known files.
+    """
+    return {"deleted": extraction_cache.clear(db)}
+
+@router.get("/ai-rate", dependencies=[Depends(deps.get_current_user)])
+def get_ai_rate():
+    """
+    Current state of the Gemini rate limiter: the learned request rate (None
+    until the first quota error), its optional ceiling, the calls waiting for a
+    slot and the quota errors seen so far.
+    """
+    return ai_extraction.rate_limiter.stats()
+
+@router.get("/ai-payload", dependencies=[Depends(deps.get_current_user)])
+def get_ai_payload():
+    """Documents reduced by the PDF pre-processing before the AI call, and the bytes saved."""
+    return pdf_preprocessing.stats()
+
 @router.post("/open-action")
 def open_action(action_request: SystemAction):
     """
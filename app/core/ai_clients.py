@@ -0,0 +1,35 @@
+"""
+Per-purpose Gemini clients.
+genai.configure() holds a single process-wide API key, so analysis and chat used to
+re-configure it under a global lock around every network call. Each purpose now has
+its own GenerativeServiceClient, created once with its own key (and rebuilt only when
+that key changes), so chat and PDF analysis calls run concurrently.
+"""
+import threading
+import google.ai.generativelanguage as glm
+
+ANALYSIS = "analysis"
+CHAT = "chat"
+
+_clients = {}  # purpose -> (api_key, client)
+_lock = threading.Lock()  # Guards _clients only, never held during a request
+
+def get_client(purpose: str, api_key: str):
+    """Returns the client of `purpose`, creating it if the key is new."""
+    with _lock:
+        entry = _clients.get(purpose)
+        if entry is None or entry[0] != api_key:
+            entry = _clients[purpose] = (api_key, glm.GenerativeServiceClient(client_options={"api_key": api_key}))
+        return entry[1]
+
+def bind(model, purpose: str, api_key: str):
+    """
+    Routes a genai.GenerativeModel (and its chat sessions) through the client of `purpose`.
+    The SDK takes no client argument: GenerativeModel creates its client lazily into
+    `_client` (google-generativeai 0.8), so that attribute is set here. An SDK without
+    it fails loudly instead of silently falling back to the global configuration.
+    """
+    if not hasattr(model, "_client"):
+        raise RuntimeError("Unsupported google-generativeai version: GenerativeModel has no _client attribute")
+    model._client = get_client(purpose, api_key)
+    return model
@@ -0,0 +1,243 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class BackupStore:
+    """
+    Content-addressed, deduplicated store for database restore points.
+    - Each restore point is a small encrypted manifest (the `.bak` file) listing chunk IDs.
+    - Chunks are encrypted and stored once under `chunks/<id[:2]>/<id>`, so a new
+      restore point only writes the chunks that changed since the previous one.
+    - Chunk IDs are keyed HMACs of the plaintext: identical content deduplicates
+      without revealing anything about it.
+    - A catalogue (catalog.json) indexes restore points with cached integrity results,
+      so listing them needs neither globbing nor decryption.
+    """
+
+    MANIFEST_HEADER = b"INTELLEO_BAK_V1"
+    CHUNKS_DIR = "chunks"
+    CATALOG_NAME = "catalog.json"
+
+    # SQLite rewrites pages in place (no insertions that shift later bytes), so
+    # page-aligned boundaries give the same dedup as content-defined chunking
+    # without a per-byte rolling hash.
+    CHUNK_SIZE = 128 * 1024
+
+    KIND_IMAGE = "image"  # Plain SQLite image, re-encrypted on restore
+    KIND_RAW = "raw"      # Undecodable file kept verbatim
+
+    def __init__(self, backup_dir: Path, fernet, id_key: bytes):
+        self.backup_dir = Path(backup_dir)
+        self.chunks_dir = self.backup_dir / self.CHUNKS_DIR
+        self.catalog_path = self.backup_dir / self.CATALOG_NAME
+        self.fernet = fernet
+        self._id_key = id_key
+
+    def _chunk_id(self, chunk) -> str:
+        return hmac.new(self._id_key, chunk, hashlib.sha256).hexdigest()
+
+    def _chunk_path(self, chunk_id: str) -> Path:
+        return self.chunks_dir / chunk_id[:2] / chunk_id
+
+    @classmethod
+    def is_manifest(cls, path: Path) -> bool:
+        try:
+            with open(path, "rb") as f:
+                return f.read(len(cls.MANIFEST_HEADER)) == cls.MANIFEST_HEADER
+        except Exception:
+            return False
+
+    def store(self, manifest_path: Path, data: bytes, kind: str = KIND_IMAGE,
+              chunk_size: Optional[int] = None) -> Dict:
+        """
+        Stores `data` as a restore point described by `manifest_path`.
+        Returns the manifest, including how many chunks were actually written.
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        view = memoryview(data)
+        chunk_ids: List[str] = []
+        written = 0
+
+        for offset in range(0, len(view), chunk_size):
+            chunk = view[offset:offset + chunk_size]
+            chunk_id = self._chunk_id(chunk)
+            chunk_ids.append(chunk_id)
+            path = self._chunk_path(chunk_id)
+            if path.exists():
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._atomic_write(path, self.fernet.encrypt(bytes(chunk)))
+            written += 1
+
+        manifest = {
+            "version": 1,
+            "created": time.time(),
+            "kind": kind,
+            "size": len(view),
+            "sha256": hashlib.sha256(view).hexdigest(),
+            "chunks": chunk_ids,
+        }
+        payload = json.dumps(manifest).encode("utf-8")
+        self._atomic_write(manifest_path, self.MANIFEST_HEADER + self.fernet.encrypt(payload))
+
+        manifest["chunks_written"] = written
+        logger.info(f"Restore point {manifest_path.name}: {len(chunk_ids)} chunk(s), {written} new.")
+        return manifest
+
+    def read_manifest(self, manifest_path: Path) -> Dict:
+        with open(manifest_path, "rb") as f:
+            content = f.read()
+        if not content.startswith(self.MANIFEST_HEADER):
+            raise ValueError(f"{manifest_path.name} is not a backup manifest")
+        try:
+            payload = self.fernet.decrypt(content[len(self.MANIFEST_HEADER):])
+        except Exception as e:
+            raise ValueError(f"Failed to decrypt backup manifest: {e}")
+        return json.loads(payload)
+
+    def load(self, manifest_path: Path) -> Tuple[bytearray, str]:
+        """
+        Reassembles a restore point. Every chunk is checked against its ID and the
+        result against the manifest hash. Returns (data, kind).
+        """
+        manifest = self.read_manifest(manifest_path)
+        data = bytearray()
+        for chunk_id in manifest["chunks"]:
+            try:
+                with open(self._chunk_path(chunk_id), "rb") as f:
+                    chunk = self.fernet.decrypt(f.read())
+            except FileNotFoundError:
+                raise ValueError(f"Backup chunk {chunk_id[:12]} is missing")
+            except Exception as e:
+                raise ValueError(f"Backup chunk {chunk_id[:12]} is unreadable: {e}")
+            if not hmac.compare_digest(self._chunk_id(chunk), chunk_id):
+                raise ValueError(f"Backup chunk {chunk_id[:12]} is corrupted")
+            data += chunk
+
+        if len(data) != manifest["size"] or hashlib.sha256(data).hexdigest() != manifest["sha256"]:
+            raise ValueError(f"Restore point {manifest_path.name} does not match its manifest")
+        return data, manifest.get("kind", self.KIND_IMAGE)
+
+    def referenced_chunks(self, manifests: Iterable[Path]) -> Optional[Set[str]]:
+        """
+        Returns the chunk IDs used by the given manifests, or None if any manifest
+        cannot be read (in which case nothing may safely be deleted).
+        """
+        referenced: Set[str] = set()
+        for path in manifests:
+            if not self.is_manifest(path):
+                continue  # Legacy full-copy backup
+            try:
+                referenced.update(self.read_manifest(path)["chunks"])
+            except Exception as e:
+                logger.warning(f"Cannot read manifest {path.name} ({e}). Skipping chunk cleanup.")
+                return None
+        return referenced
+
+    def collect_garbage(self, manifests: Iterable[Path]) -> int:
+        """Deletes chunks no longer referenced by any of `manifests`. Returns the count."""
+        if not self.chunks_dir.exists():
+            return 0
+
+        referenced = self.referenced_chunks(manifests)
+        if referenced is None:
+            return 0
+
+        removed = 0
+        for path in self.chunks_dir.glob("*/*"):
+            if path.name in referenced:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except Exception as e:
+                logger.warning(f"Failed to delete backup chunk {path.name}: {e}")
+        if removed:
+            logger.info(f"Removed {removed} unreferenced backup chunk(s).")
+        return removed
+
+    # --- Catalogue ---
+
+    @staticmethod
+    def file_hash(path: Path) -> str:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def describe(self, path: Path, manifest: Optional[Dict] = None) -> Dict:
+        """Builds the catalogue entry of a restore point (manifest or legacy full copy)."""
+        stat = path.stat()
+        entry = {
+            "name": path.name,
+            "created": stat.st_mtime,
+            "file_size": stat.st_size,
+            "size": stat.st_size,
+            "kind": "legacy",
+            "hash": self.file_hash(path),
+            "integrity": None,
+            "verified_at": None,
+        }
+        if manifest is not None:
+            entry.update(created=manifest["created"], size=manifest["size"], kind=manifest["kind"])
+        return entry
+
+    def load_catalog(self) -> Optional[Dict[str, Dict]]:
+        """Returns {name: entry}, or None if the catalogue is missing or unreadable."""
+        try:
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {entry["name"]: entry for entry in data["backups"]}
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Backup catalogue unreadable ({e}). It will be rebuilt.")
+            return None
+
+    def save_catalog(self, entries: Dict[str, Dict]):
+        ordered = sorted(entries.values(), key=lambda e: e["created"], reverse=True)
+        payload = json.dumps({"version": 1, "backups": ordered}, indent=2).encode("utf-8")
+        self._atomic_write(self.catalog_path, payload)
+
+    def rebuild_catalog(self, previous: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        Scans the backup folder once. Entries whose file hash is unchanged keep
+        their cached integrity result.
+        """
+        previous = previous or {}
+        entries = {}
+        for path in self.backup_dir.glob("*.bak"):
+            manifest = None
+            if self.is_manifest(path):
+                try:
+                    manifest = self.read_manifest(path)
+                except Exception as e:
+                    # Still listed, so verification can flag it
+                    logger.warning(f"Backup manifest {path.name} unreadable: {e}")
+            try:
+                entry = self.describe(path, manifest)
+            except OSError as e:
+                logger.warning(f"Cannot catalogue {path.name}: {e}")
+                continue
+            cached = previous.get(path.name)
+            if cached and cached.get("hash") == entry["hash"]:
+                entry["integrity"] = cached.get("integrity")
+                entry["verified_at"] = cached.get("verified_at")
+            entries[path.name] = entry
+        self.save_catalog(entries)
+        return entries
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
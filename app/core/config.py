@@ -138,6 +138,9 @@ class MutableSettings:
             "ALERT_THRESHOLD_DAYS_VISITE": 30,
             "MAX_UPLOAD_SIZE": 20 * 1024 * 1024, # 20 MB
             "MAX_CSV_SIZE": 5 * 1024 * 1024, # 5 MB
+            "AI_EXTRACTION_WORKERS": 2,
+            "AI_REQUESTS_PER_MINUTE": None,  # Optional ceiling; the quota errors set the pace
+            "AI_PDF_PREPROCESSING": True,
         }
         self.load_settings()
 
@@ -292,6 +295,18 @@ class SettingsManager:
     def MAX_CSV_SIZE(self): # NOSONAR
         return self.mutable.get("MAX_CSV_SIZE", 5 * 1024 * 1024)
 
+    @property
+    def AI_EXTRACTION_WORKERS(self): # NOSONAR
+        return self.mutable.get("AI_EXTRACTION_WORKERS", 2)
+
+    @property
+    def AI_REQUESTS_PER_MINUTE(self): # NOSONAR
+        return self.mutable.get("AI_REQUESTS_PER_MINUTE")
+
+    @property
+    def AI_PDF_PREPROCESSING(self): # NOSONAR
+        return self.mutable.get("AI_PDF_PREPROCESSING", True)
+
     def save_mutable_settings(self, new_settings: dict):
         """Updates and saves the mutable settings."""
         self.mutable.update(new_settings)
@@ -6,23 +6,47 @@ import time
 import logging
 import sqlite3
 import socket
+import struct
 import threading
 import uuid
 import psutil
-from typing import Dict, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 from cryptography.fernet import Fernet
 from app.core.config import settings, get_user_data_dir
 from app.core.lock_manager import LockManager
+from app.core.backup_store import BackupStore
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type, RetryError
 
 logger = logging.getLogger(__name__)
 
+class _HashingWriter:
+    """File wrapper that tracks the SHA-256 and size of everything written through it."""
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._hasher.update(data)
+        self.size += len(data)
+        return self._f.write(data)
+
+    def digest(self) -> bytes:
+        return self._hasher.digest()
+
 class DBSecurityManager:
     """
     Manages the security of the SQLite database using strict In-Memory handling.
     - Loads encrypted DB into RAM (sqlite3 deserialize).
-    - Saves RAM DB to encrypted disk file (sqlite3 serialize).
+    - Saves RAM DB to encrypted disk file (sqlite3 serialize), streamed in authenticated chunks.
+    - Persists only changed pages to an encrypted append-only sidecar between compactions.
+    - Auto-save snapshots the DB quickly and encrypts/writes it on a background worker.
+    - Keeps deduplicated restore points in Backups/ (see BackupStore).
+    - Hosts the decrypted DB in a named `memdb` database so a pool of read-only
+      connections can query it concurrently while writes go through one writer.
     - Enforces single-user access via Crash-Safe LockManager.
     """
 
@@ -34,6 +58,28 @@ class DBSecurityManager:
 
     _HEADER = b"INTELLEO_SEC_V1"
 
+    # V2 layout: _HEADER_V2 | chunk_size (u32) | records of [len (u32) | token].
+    # Each token encrypts (index u64, is_last u8, chunk) so reordered, dropped or
+    # truncated chunks are detected. V1 files are still read and are rewritten as
+    # V2 on the next full save.
+    _HEADER_V2 = b"INTELLEO_SEC_V2"
+    _CHUNK_SIZE = 1024 * 1024
+
+    # Incremental persistence: dirty pages are appended as encrypted records to
+    # "<db>.delta". The sidecar header carries the SHA-256 of the base file it
+    # applies to, so a sidecar left behind by an interrupted compaction is ignored.
+    _DELTA_HEADER = b"INTELLEO_SEC_D1"
+    _DELTA_SUFFIX = ".delta"
+    _DELTA_MAX_RECORDS = 50     # Compact after this many appended records
+    _DELTA_MAX_RATIO = 0.5      # ...or when the sidecar exceeds half of the base file
+    _SQLITE_MAGIC = b"SQLite format 3\x00"
+
+    _BACKUP_KEEP = 30   # Restore points are deduplicated, so many are cheap
+
+    _READ_POOL_SIZE = 4         # Concurrent read-only connections (0 = single shared connection)
+    _BUSY_TIMEOUT_MS = 15000    # Readers wait for the writer's commit (and vice versa)
+    _DEFERRED_SAVE_DELAY = 5.0  # Seconds a requested save waits for further writes
+
     def __init__(self, db_name: str = "database_documenti.db"):
         # Deobfuscate key at runtime
         self._STATIC_SECRET = base64.b64decode(self._STATIC_SECRET_OBF).decode('utf-8')
@@ -79,6 +125,29 @@ class DBSecurityManager:
         self.is_read_only = True    # Controls permission to save (Default: Read-Only until lock acquired)
         self.read_only_info: Optional[Dict] = None # Stores owner info if read-only
 
+        # Incremental persistence state (describes what is currently on disk)
+        self.incremental_save = True
+        self._page_size = 0
+        self._page_hashes: Optional[List[bytes]] = None
+        self._base_fingerprint: Optional[bytes] = None
+        self._base_size = 0
+        self._delta_records = 0
+        self._delta_size = 0
+
+        # Read pool: the writer lives in a uniquely named memdb database that
+        # readers attach to; the generation changes whenever a new writer is created.
+        self.read_pool_size = self._READ_POOL_SIZE if self._memdb_supported() else 0
+        self.memory_generation = 0
+        self._memdb_uri: Optional[str] = None
+
+        # Save pipeline: _save_lock orders snapshots; encryption + write may run on the worker
+        self._save_lock = threading.Lock()
+        self._save_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_save: Optional[Future] = None
+        self._deferred_save: Optional[threading.Timer] = None  # Set while a requested save is due
+        self._deferred_lock = threading.Lock()
+        self.save_metrics: Dict = {"saves": 0, "failures": 0}
+
         # Initialize LockManager
         self.lock_manager = LockManager(str(self.lock_path))
         self._heartbeat_timer: Optional[threading.Timer] = None
@@ -210,7 +279,7 @@ class DBSecurityManager:
                 return
 
             logger.info("Auto-save triggered.")
-            self.save_to_disk()
+            self.save_to_disk_async()
 
             # Schedule next save (e.g., every 5 minutes = 300 seconds)
             self._autosave_timer = threading.Timer(300.0, _save_tick)
@@ -234,6 +303,7 @@ class DBSecurityManager:
         self.is_read_only = True
         self._stop_heartbeat()
         self._stop_autosave()
+        self._cancel_deferred_save()
         logger.warning("System switched to READ-ONLY mode due to lock instability.")
 
     def acquire_session_lock(self, user_info: Dict) -> Tuple[bool, Optional[Dict]]:
@@ -278,6 +348,8 @@ class DBSecurityManager:
         """
         self._stop_heartbeat()
         self._stop_autosave()
+        self._cancel_deferred_save()
+        self.wait_for_pending_save()
         self.lock_manager.release()
         self.is_read_only = False # Reset state, though usually app is closing.
 
@@ -293,60 +365,129 @@ class DBSecurityManager:
             self.initial_bytes = None # Will create empty in get_connection
             return
 
-        # BACKUP ON STARTUP (Rolling Backup)
-        self.create_backup()
-
         try:
-            with open(self.db_path, "rb") as f:
-                content = f.read()
+            base_image, fingerprint, file_format = self._read_database_file(self.db_path)
+        except ValueError:
+            # BACKUP ON STARTUP: keep the undecodable file verbatim
+            self.create_backup()
+            raise
         except Exception as e:
             raise RuntimeError(f"Could not read database file: {e}")
 
-        if content.startswith(self._HEADER):
+        self.is_locked_mode = True
+        if file_format == self._HEADER_V2:
             logger.info("Loading ENCRYPTED database into memory.")
-            self.is_locked_mode = True
-            try:
-                self.initial_bytes = self.fernet.decrypt(content[len(self._HEADER):])
-            except Exception as e:
-                raise ValueError(f"Failed to decrypt database: {e}")
+        elif file_format == self._HEADER:
+            logger.info("Loading ENCRYPTED (V1) database into memory. It will be migrated to V2 on next save.")
         else:
             logger.info("Loading PLAIN database into memory. Security upgrade enforced.")
-            self.is_locked_mode = True
-            self.initial_bytes = content
+
+        payloads, torn = self._read_deltas(self._delta_path(self.db_path), fingerprint)
+        if payloads:
+            logger.info(f"Applying {len(payloads)} incremental record(s) from sidecar.")
+        self.initial_bytes = self._apply_deltas(base_image, payloads)
+
+        # BACKUP ON STARTUP (Rolling Backup): reuse the decrypted image, only changed chunks are written
+        self.create_backup(image=self.initial_bytes)
+
+        # Deltas may only be appended on top of a V2 base; anything else is
+        # rewritten in full on the next save (V1 migration / encryption upgrade).
+        if file_format == self._HEADER_V2:
+            self._remember_disk_state(self.initial_bytes, fingerprint, self._file_size(self.db_path))
+            self._delta_records = self._DELTA_MAX_RECORDS if torn else len(payloads)
+            self._delta_size = self._file_size(self._delta_path(self.db_path))
+        else:
+            self._forget_disk_state()
+
+    @staticmethod
+    def _memdb_supported() -> bool:
+        """The memdb VFS (SQLite 3.36+) lets several connections share one in-memory DB."""
+        try:
+            probe = sqlite3.connect(f"file:/intelleo-probe-{uuid.uuid4().hex}?vfs=memdb", uri=True)
+            probe.close()
+            return True
+        except Exception:
+            return False
 
     def get_connection(self):
         """
-        Factory for SQLAlchemy to create the connection.
+        Factory for SQLAlchemy to create the (writer) connection.
         Deserializes the initial bytes into the new connection's memory.
+        With the read pool enabled the DB is hosted in a named memdb database;
+        deserialize() always creates a private DB, so the image is staged in a
+        private connection and copied over with the backup API.
         """
         if self.active_connection is None:
             # Create fresh memory connection
-            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            memdb_uri = None
+            if self.read_pool_size:
+                memdb_uri = f"file:/intelleo-{uuid.uuid4().hex}?vfs=memdb"
+                conn = sqlite3.connect(memdb_uri, uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
 
             # --- SECURITY & PERFORMANCE HARDENING ---
             try:
                 conn.execute("PRAGMA journal_mode=WAL;")
                 conn.execute("PRAGMA synchronous=FULL;")
+                conn.execute(f"PRAGMA busy_timeout={self._BUSY_TIMEOUT_MS};")
             except Exception as e:
                 logger.warning(f"Failed to set PRAGMA security settings: {e}")
 
             if self.initial_bytes:
+                target = sqlite3.connect(':memory:') if memdb_uri else conn
                 try:
-                    conn.deserialize(self.initial_bytes)
+                    target.deserialize(self.initial_bytes)
                 except AttributeError:
                     raise RuntimeError("Your Python/SQLite version does not support 'deserialize'. Upgrade required.")
                 except Exception as e:
                     raise RuntimeError(f"Failed to deserialize database: {e}")
-
+                # SQLite now owns its own copy: drop ours to halve resident memory
+                self.initial_bytes = None
+
+                if memdb_uri:
+                    try:
+                        target.backup(conn)
+                    except Exception as e:
+                        raise RuntimeError(f"Failed to load database into shared memory: {e}")
+                    finally:
+                        target.close()
+
+            self._memdb_uri = memdb_uri
+            self.memory_generation += 1
             self.active_connection = conn
 
         return self.active_connection
 
+    def get_read_connection(self):
+        """
+        Factory for the read-only SQLAlchemy pool.
+        Opens another connection to the writer's memdb database; falls back to the
+        shared writer connection when the read pool is disabled.
+        """
+        writer = self.get_connection()
+        if not self._memdb_uri:
+            return writer
+
+        conn = sqlite3.connect(self._memdb_uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={self._BUSY_TIMEOUT_MS};")
+        conn.execute("PRAGMA query_only=1;")
+        return conn
+
     @retry(stop=stop_after_attempt(5), wait=wait_fixed(2), retry=retry_if_exception_type(PermissionError))
-    def _safe_write(self, data: bytes):
+    def _safe_write(self, data: Union[bytes, Callable[[BinaryIO], None]]) -> Tuple[bytes, int]:
+        """
+        Atomically replaces the DB file. `data` is either the full content or a
+        callable that streams it into the given file object (re-invoked on retry).
+        Returns (sha256 of the written content, bytes written).
+        """
         swp_path = self.db_path.with_suffix(".swp")
         with open(swp_path, "wb") as f:
-            f.write(data)
+            sink = _HashingWriter(f)
+            if callable(data):
+                data(sink)
+            else:
+                sink.write(data)
 
         if os.name == 'nt' and self.db_path.exists():
             try:
@@ -358,9 +499,102 @@ class DBSecurityManager:
         else:
             os.replace(swp_path, self.db_path)
 
-    def save_to_disk(self) -> bool:
+        return sink.digest(), sink.size
+
+    def _encrypted_writer(self, image: bytes, metrics: Optional[Dict] = None) -> Callable[[BinaryIO], None]:
+        """
+        Returns a writer that encrypts `image` into the V2 chunked format.
+        Time spent encrypting is accumulated in metrics["encrypt_ms"].
+        """
+        def write(f: BinaryIO):
+            encrypt_seconds = 0.0
+            view = memoryview(image)
+            total = len(view)
+            f.write(self._HEADER_V2 + struct.pack(">I", self._CHUNK_SIZE))
+            index = 0
+            offset = 0
+            while True:
+                chunk = view[offset:offset + self._CHUNK_SIZE]
+                offset += len(chunk)
+                is_last = offset >= total
+                start = time.perf_counter()
+                token = self.fernet.encrypt(struct.pack(">QB", index, is_last) + chunk)
+                encrypt_seconds += time.perf_counter() - start
+                f.write(struct.pack(">I", len(token)))
+                f.write(token)
+                if is_last:
+                    break
+                index += 1
+            if metrics is not None:
+                metrics["encrypt_ms"] = round(encrypt_seconds * 1000, 2)
+        return write
+
+    def _read_database_file(self, path: Path) -> Tuple[bytearray, bytes, bytes]:
+        """
+        Reads a database file in any supported format.
+        Returns (plain SQLite image, sha256 of the file, format header or b"" if plain).
+        Raises ValueError if the content cannot be decrypted or is truncated.
+        """
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            header = f.read(len(self._HEADER_V2))
+            hasher.update(header)
+            if header == self._HEADER_V2:
+                image = self._read_v2_chunks(f, hasher)
+                return image, hasher.digest(), self._HEADER_V2
+
+            rest = f.read()
+            hasher.update(rest)
+
+        if header == self._HEADER:
+            try:
+                image = bytearray(self.fernet.decrypt(rest))
+            except Exception as e:
+                raise ValueError(f"Failed to decrypt database: {e}")
+            return image, hasher.digest(), self._HEADER
+
+        image = bytearray(header)
+        image += rest
+        return image, hasher.digest(), b""
+
+    def _read_v2_chunks(self, f: BinaryIO, hasher) -> bytearray:
+        """Decrypts V2 records one at a time, so only one chunk is buffered besides the image."""
+        raw = f.read(4)
+        hasher.update(raw)
+        if len(raw) < 4:
+            raise ValueError("Failed to decrypt database: truncated header")
+
+        image = bytearray()
+        expected = 0
+        while True:
+            raw = f.read(4)
+            hasher.update(raw)
+            if len(raw) < 4:
+                raise ValueError("Failed to decrypt database: missing final chunk")
+            (length,) = struct.unpack(">I", raw)
+            token = f.read(length)
+            hasher.update(token)
+            if len(token) < length:
+                raise ValueError("Failed to decrypt database: truncated chunk")
+            try:
+                payload = self.fernet.decrypt(token)
+            except Exception as e:
+                raise ValueError(f"Failed to decrypt database: {e}")
+            index, is_last = struct.unpack_from(">QB", payload, 0)
+            if index != expected:
+                raise ValueError(f"Failed to decrypt database: chunk {index} out of order")
+            image += memoryview(payload)[9:]
+            if is_last:
+                return image
+            expected += 1
+
+    def save_to_disk(self, compact: bool = False) -> bool:
         """
         Serializes the memory DB, Encrypts it, and writes to disk.
+        When possible only the pages changed since the last save are appended to the
+        encrypted sidecar; a full rewrite (compaction) happens when the sidecar grows
+        too large, when `compact` is requested or when encryption is disabled.
+        Waits for any background save first, so the newest state always wins.
         CRITICAL: Only executes if this session holds the lock (is NOT Read-Only).
         """
         if not self.active_connection:
@@ -370,27 +604,330 @@ class DBSecurityManager:
             logger.warning("Attempted to save in READ-ONLY mode. Operation ignored.")
             return False
 
-        try:
-            try:
-                serialized = self.active_connection.serialize()
-            except AttributeError:
-                logger.error("SQLite serialize not supported.")
+        with self._save_lock:
+            self.wait_for_pending_save()
+            snapshot = self._take_snapshot()
+            if snapshot is None:
                 return False
+            return self._persist_snapshot(*snapshot, compact=compact, background=False)
 
-            if self.is_locked_mode:
-                final_data = self._HEADER + self.fernet.encrypt(serialized)
-            else:
-                final_data = serialized
+    def save_to_disk_async(self, compact: bool = False) -> bool:
+        """
+        Takes a snapshot of the memory DB on the calling thread (a single serialize)
+        and hands encryption + write to the background save worker, so the shared
+        connection is only held for the copy. Returns False if the snapshot failed.
+        """
+        if not self.active_connection:
+            return True
+
+        if self.is_read_only:
+            logger.warning("Attempted to save in READ-ONLY mode. Operation ignored.")
+            return False
+
+        with self._save_lock:
+            if self._pending_save is not None and not self._pending_save.done():
+                logger.info("Background save still running. Skipping this cycle.")
+                return True
+
+            snapshot = self._take_snapshot()
+            if snapshot is None:
+                return False
+
+            if self._save_executor is None:
+                self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-save")
+            self._pending_save = self._save_executor.submit(
+                self._persist_snapshot, *snapshot, compact=compact, background=True
+            )
+            return True
+
+    def request_save(self, delay: Optional[float] = None):
+        """
+        Marks the database dirty and saves it in the background `delay` seconds
+        later. Requests made meanwhile share that save, so a burst of small writes
+        (e.g. files appended one by one to an import job) costs one snapshot.
+        """
+        with self._deferred_lock:
+            if self._deferred_save is not None:
+                return
+            timer = threading.Timer(self._DEFERRED_SAVE_DELAY if delay is None else delay, self._run_deferred_save)
+            timer.daemon = True
+            self._deferred_save = timer
+            timer.start()
+
+    def _run_deferred_save(self):
+        with self._deferred_lock:
+            self._deferred_save = None
+        # A save still running took its snapshot before the requested writes
+        self.wait_for_pending_save()
+        self.save_to_disk_async()
+
+    def _cancel_deferred_save(self):
+        with self._deferred_lock:
+            timer, self._deferred_save = self._deferred_save, None
+        if timer is not None:
+            timer.cancel()
+
+    def wait_for_pending_save(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the in-flight background save (if any) has completed."""
+        pending = self._pending_save
+        if pending is None:
+            return True
+        try:
+            return bool(pending.result(timeout=timeout))
+        except Exception as e:
+            logger.error(f"Background save failed: {e}")
+            return False
+
+    def get_save_metrics(self) -> Dict:
+        """Returns timings and sizes of the last save plus running counters."""
+        metrics = dict(self.save_metrics)
+        metrics["pending"] = self._pending_save is not None and not self._pending_save.done()
+        return metrics
+
+    def _take_snapshot(self) -> Optional[Tuple[bytes, float]]:
+        """Returns (serialized image, snapshot seconds), or None on failure."""
+        start = time.perf_counter()
+        try:
+            serialized = self.active_connection.serialize()
+        except AttributeError:
+            logger.error("SQLite serialize not supported.")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to save database: {e}")
+            self.save_metrics["failures"] += 1
+            return None
+        return serialized, time.perf_counter() - start
+
+    def _persist_snapshot(self, serialized: bytes, snapshot_seconds: float,
+                          compact: bool = False, background: bool = False) -> bool:
+        """Encrypts and writes a snapshot (full or incremental) and records metrics."""
+        metrics = {
+            "background": background,
+            "snapshot_ms": round(snapshot_seconds * 1000, 2),
+            "diff_ms": 0.0,
+            "encrypt_ms": 0.0,
+            "write_ms": 0.0,
+            "bytes_written": 0,
+            "image_bytes": len(serialized),
+        }
+        start = time.perf_counter()
+        try:
+            if self.is_read_only:
+                # Lock lost while the snapshot was queued
+                logger.warning("Lock lost before background save. Snapshot discarded.")
+                return False
 
-            self._safe_write(final_data)
-            logger.info("Database state saved to disk.")
+            mode = None if compact else self._save_incremental(serialized, metrics)
+            if mode is None:
+                self._save_full(serialized, metrics)
+                mode = "full"
+                logger.info("Database state saved to disk.")
+            metrics["mode"] = mode
             return True
         except Exception as e:
             logger.error(f"Failed to save database: {e}")
+            self.save_metrics["failures"] += 1
             return False
+        finally:
+            if "mode" in metrics:
+                metrics["total_ms"] = round((time.perf_counter() - start + snapshot_seconds) * 1000, 2)
+                metrics["saved_at"] = time.time()
+                metrics["saves"] = self.save_metrics["saves"] + 1
+                metrics["failures"] = self.save_metrics["failures"]
+                self.save_metrics = metrics
+
+    def _save_full(self, serialized: bytes, metrics: Dict):
+        """Rewrites the whole DB file and drops the sidecar (compaction)."""
+        start = time.perf_counter()
+        if self.is_locked_mode:
+            fingerprint, written = self._safe_write(self._encrypted_writer(serialized, metrics))
+        else:
+            fingerprint, written = self._safe_write(serialized)
+        metrics["write_ms"] = round((time.perf_counter() - start) * 1000 - metrics["encrypt_ms"], 2)
+        metrics["bytes_written"] = written
+
+        self._discard_delta(self.db_path)
+        if self.is_locked_mode:
+            self._remember_disk_state(serialized, fingerprint, written)
+        else:
+            self._forget_disk_state()
 
-    def create_backup(self):
-        """Creates a timestamped backup of the database file."""
+    # --- Incremental persistence helpers ---
+
+    def _delta_path(self, base_path: Path) -> Path:
+        return base_path.with_name(base_path.name + self._DELTA_SUFFIX)
+
+    @staticmethod
+    def _file_size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    @classmethod
+    def _page_size_of(cls, data: bytes) -> int:
+        """Returns the page size of a serialized SQLite image, or 0 if it is not one."""
+        if len(data) < 100 or not data.startswith(cls._SQLITE_MAGIC):
+            return 0
+        page_size = int.from_bytes(data[16:18], "big")
+        if page_size == 1:
+            page_size = 65536
+        if page_size < 512 or page_size & (page_size - 1) or len(data) % page_size:
+            return 0
+        return page_size
+
+    @staticmethod
+    def _hash_pages(data: bytes, page_size: int) -> List[bytes]:
+        view = memoryview(data)
+        return [hashlib.blake2b(view[i:i + page_size], digest_size=16).digest()
+                for i in range(0, len(data), page_size)]
+
+    def _remember_disk_state(self, image: bytes, fingerprint: bytes, base_size: int):
+        """Records the page hashes of the image now represented by base (+ sidecar) on disk."""
+        self._page_size = self._page_size_of(image)
+        self._page_hashes = self._hash_pages(image, self._page_size) if self._page_size else None
+        self._base_fingerprint = fingerprint
+        self._base_size = base_size
+        self._delta_records = 0
+        self._delta_size = 0
+
+    def _forget_disk_state(self):
+        self._page_size = 0
+        self._page_hashes = None
+        self._base_fingerprint = None
+        self._base_size = 0
+        self._delta_records = 0
+        self._delta_size = 0
+
+    def _save_incremental(self, serialized: bytes, metrics: Dict) -> Optional[str]:
+        """
+        Appends the pages that changed since the last save to the sidecar.
+        Returns the save mode ("incremental" / "unchanged"), or None when a full
+        save is required instead.
+        """
+        if not (self.incremental_save and self.is_locked_mode and self._page_hashes is not None):
+            return None
+
+        page_size = self._page_size_of(serialized)
+        if page_size != self._page_size:
+            return None
+
+        start = time.perf_counter()
+        new_hashes = self._hash_pages(serialized, page_size)
+        old_hashes = self._page_hashes
+        dirty = [i for i, h in enumerate(new_hashes) if i >= len(old_hashes) or old_hashes[i] != h]
+        metrics["diff_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        if not dirty and len(new_hashes) == len(old_hashes):
+            logger.info("Database unchanged since last save. Nothing to write.")
+            return "unchanged"
+
+        if self._delta_records >= self._DELTA_MAX_RECORDS:
+            return None
+        projected = self._delta_size + len(dirty) * (page_size + 4)
+        if projected > self._base_size * self._DELTA_MAX_RATIO:
+            return None
+
+        start = time.perf_counter()
+        view = memoryview(serialized)
+        parts = [struct.pack(">III", page_size, len(new_hashes), len(dirty))]
+        for page_no in dirty:
+            parts.append(struct.pack(">I", page_no))
+            parts.append(view[page_no * page_size:(page_no + 1) * page_size])
+        token = self.fernet.encrypt(b"".join(parts))
+        metrics["encrypt_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        start = time.perf_counter()
+        delta_path = self._delta_path(self.db_path)
+        try:
+            with open(delta_path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(self._DELTA_HEADER + self._base_fingerprint)
+                f.write(struct.pack(">I", len(token)) + token)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            # A partially appended record would hide later ones: compact now.
+            logger.warning(f"Incremental save failed ({e}). Falling back to full save.")
+            self._delta_records = self._DELTA_MAX_RECORDS
+            return None
+        metrics["write_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        metrics["bytes_written"] = len(token) + 4
+
+        self._page_hashes = new_hashes
+        self._delta_records += 1
+        self._delta_size = self._file_size(delta_path)
+        logger.info(f"Incremental save: {len(dirty)} page(s) appended to sidecar.")
+        return "incremental"
+
+    def _read_deltas(self, delta_path: Path, fingerprint: bytes) -> Tuple[List[bytes], bool]:
+        """
+        Reads and decrypts the sidecar records that apply to the base with `fingerprint`.
+        Returns (payloads, torn) where torn signals a truncated trailing record.
+        """
+        if not delta_path.exists():
+            return [], False
+
+        with open(delta_path, "rb") as f:
+            data = f.read()
+
+        prefix = self._DELTA_HEADER + fingerprint
+        if not data.startswith(prefix):
+            logger.warning(f"Ignoring stale sidecar {delta_path.name} (base mismatch).")
+            return [], False
+
+        payloads = []
+        pos = len(prefix)
+        while pos < len(data):
+            if pos + 4 > len(data):
+                return payloads, True
+            (length,) = struct.unpack_from(">I", data, pos)
+            token = data[pos + 4:pos + 4 + length]
+            if len(token) < length:
+                logger.warning(f"Sidecar {delta_path.name} ends with a truncated record. Ignoring it.")
+                return payloads, True
+            try:
+                payloads.append(self.fernet.decrypt(token))
+            except Exception as e:
+                raise ValueError(f"Failed to decrypt database sidecar: {e}")
+            pos += 4 + length
+        return payloads, False
+
+    @staticmethod
+    def _apply_deltas(base: bytearray, payloads: List[bytes]) -> bytearray:
+        """Applies sidecar records to `base` in place (avoids another full copy)."""
+        image = base if isinstance(base, bytearray) else bytearray(base)
+        for payload in payloads:
+            page_size, total_pages, count = struct.unpack_from(">III", payload, 0)
+            del image[total_pages * page_size:]
+            if len(image) < total_pages * page_size:
+                image.extend(bytes(total_pages * page_size - len(image)))
+            pos = 12
+            for _ in range(count):
+                (page_no,) = struct.unpack_from(">I", payload, pos)
+                pos += 4
+                image[page_no * page_size:(page_no + 1) * page_size] = payload[pos:pos + page_size]
+                pos += page_size
+        return image
+
+    def _discard_delta(self, base_path: Path):
+        delta_path = self._delta_path(base_path)
+        try:
+            if delta_path.exists():
+                delta_path.unlink()
+        except Exception as e:
+            logger.warning(f"Failed to remove sidecar {delta_path.name}: {e}")
+
+    def _backup_store(self, backup_dir: Path) -> BackupStore:
+        id_key = hashlib.sha256(b"INTELLEO_BACKUP_CHUNK_ID" + self.key).digest()
+        return BackupStore(backup_dir, self.fernet, id_key)
+
+    def create_backup(self, image: Optional[bytes] = None):
+        """
+        Creates a timestamped restore point of the database.
+        `image` is the decrypted DB when the caller already has it; otherwise the
+        file (plus sidecar) is decoded here. Undecodable files are kept verbatim.
+        """
         if not self.db_path.exists():
             return
 
@@ -402,50 +939,142 @@ class DBSecurityManager:
         backup_path = backup_dir / backup_name
 
         try:
-            shutil.copy2(self.db_path, backup_path)
+            kind = BackupStore.KIND_IMAGE
+            if image is None:
+                try:
+                    image = self._read_restore_point(self.db_path)
+                except ValueError as e:
+                    logger.warning(f"Backing up undecodable database verbatim: {e}")
+                    with open(self.db_path, "rb") as f:
+                        image = f.read()
+                    kind = BackupStore.KIND_RAW
+
+            store = self._backup_store(backup_dir)
+            manifest = store.store(backup_path, image, kind)
             logger.info(f"Backup created: {backup_path}")
+            self._update_catalog(store, add={backup_path: manifest})
             self.rotate_backups(backup_dir)
         except Exception as e:
             logger.error(f"Backup failed: {e}")
 
-    def rotate_backups(self, backup_dir: Path, keep: int = 5):
-        """Keeps only the recent N backups."""
+    def rotate_backups(self, backup_dir: Path, keep: Optional[int] = None):
+        """Keeps only the recent N backups and drops chunks no longer referenced."""
+        keep = self._BACKUP_KEEP if keep is None else keep
         try:
             # Find all .bak files matching the pattern
             backups = sorted(backup_dir.glob("*.bak"), key=lambda f: f.stat().st_mtime, reverse=True)
 
             # Remove older ones
+            removed = []
             for old_backup in backups[keep:]:
                 try:
                     old_backup.unlink()
+                    self._discard_delta(old_backup)
+                    removed.append(old_backup.name)
                     logger.info(f"Deleted old backup: {old_backup.name}")
                 except Exception as e:
                     logger.warning(f"Failed to delete old backup {old_backup.name}: {e}")
+
+            if len(backups) > keep:
+                store = self._backup_store(backup_dir)
+                store.collect_garbage(backup_dir.glob("*.bak"))
+                self._update_catalog(store, remove=removed)
         except Exception as e:
              logger.error(f"Rotation failed: {e}")
 
+    def _update_catalog(self, store: BackupStore, add: Optional[Dict[Path, Dict]] = None,
+                        remove: Optional[List[str]] = None, results: Optional[Dict[str, bool]] = None):
+        """Applies changes to the backup catalogue, rebuilding it if missing or unreadable."""
+        try:
+            entries = store.load_catalog()
+            if entries is None:
+                entries = store.rebuild_catalog()
+            for path, manifest in (add or {}).items():
+                entries[path.name] = store.describe(path, manifest)
+            for name in remove or []:
+                entries.pop(name, None)
+            for name, ok in (results or {}).items():
+                if name in entries:
+                    entries[name]["integrity"] = "ok" if ok else "failed"
+                    entries[name]["verified_at"] = time.time()
+            store.save_catalog(entries)
+        except Exception as e:
+            logger.warning(f"Failed to update backup catalogue: {e}")
+
+    def list_backups(self) -> List[Dict]:
+        """
+        Returns the restore points (newest first) from the catalogue, including the
+        cached integrity result ("ok", "failed" or None if never verified).
+        """
+        backup_dir = self.data_dir / "Backups"
+        if not backup_dir.exists():
+            return []
+        store = self._backup_store(backup_dir)
+        entries = store.load_catalog()
+        if entries is None:
+            entries = store.rebuild_catalog()
+        return sorted(entries.values(), key=lambda e: e["created"], reverse=True)
+
+    def verify_backups(self, force: bool = False, max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """
+        Verifies restore points in parallel and caches the results in the catalogue.
+        Only unverified or changed backups are checked unless `force` is set.
+        Threads are enough: decryption and PRAGMA integrity_check release the GIL.
+        """
+        backup_dir = self.data_dir / "Backups"
+        if not backup_dir.exists():
+            return {}
+
+        store = self._backup_store(backup_dir)
+        entries = store.rebuild_catalog(store.load_catalog())
+        pending = [name for name, entry in entries.items() if force or entry.get("integrity") is None]
+        if not pending:
+            return {name: entry["integrity"] == "ok" for name, entry in entries.items()}
+
+        results: Dict[str, bool] = {}
+        workers = max_workers or min(4, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backup-verify") as pool:
+            futures = {pool.submit(self.verify_integrity, backup_dir / name): name for name in pending}
+            for future in as_completed(futures):
+                results[futures[future]] = bool(future.result())
+
+        self._update_catalog(store, results=results)
+        failed = [name for name, ok in results.items() if not ok]
+        if failed:
+            logger.warning(f"Backup verification failed for: {', '.join(failed)}")
+
+        summary = {name: entry["integrity"] == "ok" for name, entry in entries.items()}
+        summary.update(results)
+        return summary
+
+    def _read_restore_point(self, path: Path) -> bytearray:
+        """
+        Returns the plain SQLite image stored at `path`: a backup manifest, or a DB
+        file in any format with its sidecar applied. Raises ValueError if undecodable.
+        """
+        if BackupStore.is_manifest(path):
+            data, _ = self._backup_store(path.parent).load(path)
+            return data
+
+        image, fingerprint, _ = self._read_database_file(path)
+        payloads, _ = self._read_deltas(self._delta_path(path), fingerprint)
+        return self._apply_deltas(image, payloads)
+
     def verify_integrity(self, file_path: Path = None) -> bool:
         """
-        Verifies the integrity of a database file (encrypted or plain).
-        If encrypted, it attempts to decrypt first.
+        Verifies the integrity of a database file (encrypted or plain) or backup manifest.
+        If encrypted, it attempts to decrypt first; a matching sidecar is applied on top.
         """
         target = file_path or self.db_path
         if not target.exists():
             return False
 
         try:
-            with open(target, "rb") as f:
-                content = f.read()
-
-            if content.startswith(self._HEADER):
-                # Decrypt
-                try:
-                    raw_data = self.fernet.decrypt(content[len(self._HEADER):])
-                except Exception:
-                    logger.warning(f"Integrity Check: Decryption failed for {target.name}")
-                    return False
-            else:
-                raw_data = content
+            try:
+                raw_data = self._read_restore_point(target)
+            except ValueError as e:
+                logger.warning(f"Integrity Check: Decryption failed for {target.name}: {e}")
+                return False
 
             # Test SQLite Integrity
             conn = sqlite3.connect(':memory:')
@@ -487,26 +1116,47 @@ class DBSecurityManager:
             self.active_connection.execute("ANALYZE")
             logger.info("Database optimization completed.")
 
-            # Save the optimized DB to disk
-            self.save_to_disk()
+            # VACUUM rewrites every page: persist it as a fresh base file
+            self.save_to_disk(compact=True)
         except Exception as e:
             logger.error(f"Optimization failed: {e}")
             raise
 
     def restore_from_backup(self, backup_path: Path):
-        """Restores the database from a backup file."""
+        """
+        Restores the database from a backup manifest (or a legacy full-copy backup).
+        Holds the save lock after draining the background save, so no queued
+        snapshot can overwrite the restored file.
+        """
         if not backup_path.exists():
             raise FileNotFoundError(f"Backup not found: {backup_path}")
 
-        # Backup current state before overwriting (Safety net)
-        self.create_backup()
+        with self._save_lock:
+            self.wait_for_pending_save()
 
-        try:
-            shutil.copy2(backup_path, self.db_path)
-            logger.info(f"Restored database from {backup_path}")
-        except Exception as e:
-            logger.error(f"Restore failed: {e}")
-            raise
+            # Backup current state before overwriting (Safety net)
+            self.create_backup()
+
+            try:
+                if BackupStore.is_manifest(backup_path):
+                    data, kind = self._backup_store(backup_path.parent).load(backup_path)
+                    if kind == BackupStore.KIND_RAW:
+                        self._safe_write(bytes(data))
+                    else:
+                        self._safe_write(self._encrypted_writer(data))
+                    self._discard_delta(self.db_path)
+                else:
+                    shutil.copy2(backup_path, self.db_path)
+                    backup_delta = self._delta_path(backup_path)
+                    if backup_delta.exists():
+                        shutil.copy2(backup_delta, self._delta_path(self.db_path))
+                    else:
+                        self._discard_delta(self.db_path)
+                self._forget_disk_state()
+                logger.info(f"Restored database from {backup_path}")
+            except Exception as e:
+                logger.error(f"Restore failed: {e}")
+                raise
 
     def cleanup(self):
         """
@@ -552,6 +1202,9 @@ class DBSecurityManager:
         # 2. Move the file
         try:
             shutil.move(str(current_path), str(new_path))
+            current_delta = self._delta_path(current_path)
+            if current_delta.exists():
+                shutil.move(str(current_delta), str(self._delta_path(new_path)))
             logger.info(f"Successfully moved database from {current_path} to {new_path}")
         except (IOError, OSError) as e:
             logger.error(f"Failed to move database file: {e}")
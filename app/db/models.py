@@ -109,13 +109,72 @@ class Certificato(Base):
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    dipendente_id = Column(Integer, ForeignKey('dipendenti.id'), nullable=True)
+    dipendente_id = Column(Integer, ForeignKey('dipendenti.id'), nullable=True, index=True)
     nome_dipendente_raw = Column(String, nullable=True)  # Store the raw name from AI
     data_nascita_raw = Column(String, nullable=True)  # Store the raw birth date from AI
-    corso_id = Column(Integer, ForeignKey('corsi.id'))
-    data_rilascio = Column(Date)
-    data_scadenza_calcolata = Column(Date)
+    corso_id = Column(Integer, ForeignKey('corsi.id'), index=True)
+    data_rilascio = Column(Date, index=True)
+    data_scadenza_calcolata = Column(Date, index=True)
     file_path = Column(String)
-    stato_validazione = Column(Enum(ValidationStatus))
+    stato_validazione = Column(Enum(ValidationStatus), index=True)
     dipendente = relationship("Dipendente", back_populates="certificati")
     corso = relationship("Corso", back_populates="certificati")
+
+class StatoCertificato(Base):
+    """
+    Materialized status of a certificate (attivo, in_scadenza, scaduto, archiviato).
+    Rows are maintained by certificate_logic on every flush that touches certificates
+    and refreshed by a daily job, since statuses also depend on the current date.
+    A row is only trusted if it was computed today (aggiornato_il).
+    """
+    __tablename__ = 'stati_certificati'
+
+    certificato_id = Column(Integer, ForeignKey('certificati.id', ondelete='CASCADE'), primary_key=True)
+    stato = Column(String, index=True, nullable=False)
+    aggiornato_il = Column(Date, index=True, nullable=False)
+
+class ImportJob(Base):
+    """
+    A batch of PDFs submitted for AI extraction (see services/import_jobs).
+    The uploaded files are staged on disk until their item is processed, so a
+    job interrupted by a shutdown or crash resumes on the next start.
+    """
+    __tablename__ = 'import_jobs'
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    status = Column(String, index=True, nullable=False, default="running")  # running, completed, cancelled
+    created_at = Column(DateTime, default=utc_now)
+    finished_at = Column(DateTime, nullable=True)
+    items = relationship("ImportJobItem", back_populates="job", cascade="all, delete-orphan", order_by="ImportJobItem.position")
+
+class ImportJobItem(Base):
+    """
+    One file of an ImportJob. `result` holds the extracted entities as a JSON string.
+    """
+    __tablename__ = 'import_job_items'
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey('import_jobs.id', ondelete='CASCADE'), index=True, nullable=False)
+    position = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    status = Column(String, index=True, nullable=False, default="queued")  # queued, running, done, rejected, error, cancelled
+    attempts = Column(Integer, default=0)
+    result = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=utc_now, onupdate=utc_now)
+    job = relationship("ImportJob", back_populates="items")
+
+class AIExtractionCache(Base):
+    """
+    AI extraction results keyed by the SHA-256 of the PDF bytes and the prompt
+    version (see services/extraction_cache). `result` is a JSON string.
+    """
+    __tablename__ = 'ai_extraction_cache'
+
+    content_hash = Column(String, primary_key=True)
+    prompt_version = Column(String, primary_key=True)
+    result = Column(String, nullable=False)
+    created_at = Column(DateTime, default=utc_now)
+    last_used_at = Column(DateTime, default=utc_now, index=True)
+    hits = Column(Integer, default=0)
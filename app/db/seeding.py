@@ -5,6 +5,7 @@ from app.db.session import SessionLocal
 from app.core.security import get_password_hash
 from app.core.config import settings, get_user_data_dir
 from app.services.document_locator import find_document
+from app.services.document_index import document_index
 from app.services.sync_service import remove_empty_folders
 import os
 import shutil
@@ -65,6 +66,9 @@ def migrate_schema(db: Session):
         try:
             db.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_logs_timestamp ON audit_logs (timestamp)"))
             db.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_logs_ip_address ON audit_logs (ip_address)"))
+            # Filters and sort keys of the paginated certificate listing
+            for column in ("dipendente_id", "corso_id", "data_rilascio", "data_scadenza_calcolata", "stato_validazione"):
+                db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_certificati_{column} ON certificati ({column})"))
             db.commit()
         except Exception as e:
             print(f"Error creating indexes: {e}")
@@ -138,6 +142,7 @@ def _move_deprecated_file(cert, database_path, trash_dir):
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 dest = os.path.join(trash_dir, f"{os.path.splitext(filename)[0]}_deprecated_{timestamp}.pdf")
                 shutil.move(file_path, dest)
+                document_index.record_move(file_path, dest)
                 remove_empty_folders(os.path.dirname(file_path))
     except Exception as e:
         print(f"Error moving deprecated file: {e}")
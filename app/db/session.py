@@ -2,11 +2,14 @@
 This module handles the database session and engine creation.
 It sets up the SQLAlchemy engine to use a shared In-Memory SQLite connection
 managed by DBSecurityManager, ensuring strict data security (decryption in RAM).
+Read-heavy endpoints can use a separate pool of read-only connections to the same
+in-memory database, so they no longer queue behind each other on the writer.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool, QueuePool
 import os
+import itertools
 from app.core.db_security import db_security
 
 # Database URL for In-Memory SQLite
@@ -23,6 +26,66 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only pool over the same in-memory database (see DBSecurityManager.get_read_connection).
+# Falls back to the writer engine when the SQLite build lacks the memdb VFS.
+if db_security.read_pool_size:
+    read_engine = create_engine(
+        DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=db_security.read_pool_size,
+        max_overflow=0,
+        creator=db_security.get_read_connection
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _tag_read_connection(dbapi_connection, connection_record):
+        connection_record.info["generation"] = db_security.memory_generation
+
+    @event.listens_for(read_engine, "checkout")
+    def _discard_stale_read_connection(dbapi_connection, connection_record, connection_proxy):
+        # A new writer (reload/restore) lives in a new memdb database: drop readers of the old one
+        if connection_record.info.get("generation") != db_security.memory_generation:
+            raise exc.DisconnectionError("In-memory database was replaced")
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# --- Data version ---
+# Incremented after every commit that wrote something. Together with the in-memory
+# database generation (bumped on reload/restore) it identifies the current state of
+# the data, e.g. for HTTP ETags.
+_commit_counter = itertools.count(1)
+_data_version = 0
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_dirty(session, flush_context):
+    session.info["data_changed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    # Bulk query.update()/delete() and insert() statements skip the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["data_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _bump_data_version(session):
+    global _data_version
+    if session.info.pop("data_changed", False):
+        _data_version = next(_commit_counter)
+
+@event.listens_for(Session, "after_rollback")
+def _clear_session_dirty(session):
+    session.info.pop("data_changed", None)
+
+def bump_data_version():
+    """Marks the data as changed after writes that bypass the ORM session."""
+    global _data_version
+    _data_version = next(_commit_counter)
+
+def get_data_version() -> str:
+    return f"{db_security.memory_generation}.{_data_version}"
+
 def reconfigure_engine(new_url: str):
     """
     No-op: The engine is statically configured to use the memory connection from DBSecurityManager.
@@ -48,3 +111,15 @@ def get_db():
     finally:
         # Close will also rollback any uncommitted transaction
         db.close()
+
+def get_read_db():
+    """
+    FastAPI dependency for read-only endpoints.
+    The session uses a pooled read-only connection, so concurrent requests can
+    query in parallel. Any write attempt fails (PRAGMA query_only).
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,10 +1,12 @@
 import uvicorn
-import google.generativeai as genai
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from app.api import main as api_router
+from app.api import deps
 from app.api.routers import notifications as notifications_router
 from app.api.routers import auth, users, audit, config, system, app_config, stats, chat
 from app.db.session import engine
@@ -14,10 +16,14 @@ from app.core.db_security import db_security
 from app.db.seeding import seed_database
 from app.services.notification_service import check_and_send_alerts
 from app.services.file_maintenance import organize_expired_files
-from app.db.session import SessionLocal
+from app.services.certificate_logic import rollover_statuses
+from app.services import import_jobs, extraction_cache
+from app.services.document_index import document_index
+from app.db.session import SessionLocal, get_data_version
 from app.utils.logging import setup_logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from app import __version__
+import hashlib
 import logging
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
@@ -26,6 +32,12 @@ import os
 import sys
 import base64
 
+try:
+    # Optional: brotli compression, with gzip for clients that don't accept br
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
 # --- SENTRY INTEGRATION (Obfuscated DSN) ---
 def _get_sentry_dsn():
     """Decode obfuscated Sentry DSN to bypass static analysis."""
@@ -121,6 +133,10 @@ async def lifespan(app: FastAPI):
         try:
             Base.metadata.create_all(bind=engine)
             seed_database()
+            rollover_statuses()
+            # Batch imports interrupted by the last shutdown pick up where they stopped
+            import_jobs.resume_pending_jobs()
+            extraction_cache.prune_cache()
         except Exception as e:
             logger.warning(f"Database Seeding/Migration failed: {e}. Proceeding in Recovery Mode.")
             # Do NOT raise. Continue.
@@ -133,15 +149,19 @@ async def lifespan(app: FastAPI):
         # File Maintenance is now deferred to background task triggered by UI
         # to prevent blocking startup.
 
-        if settings.GEMINI_API_KEY_ANALYSIS:
-            genai.configure(api_key=settings.GEMINI_API_KEY_ANALYSIS)
-
         # Schedule the daily alert job
         scheduler.add_job(check_and_send_alerts, 'cron', hour=8, minute=0)
 
+        # Certificate statuses depend on today's date: refresh them right after midnight
+        scheduler.add_job(rollover_statuses, 'cron', hour=0, minute=1)
+        scheduler.add_job(extraction_cache.prune_cache, 'cron', hour=0, minute=5)
+
         # DB Sync (Auto-save) is managed by db_security internal timer to avoid double-write conflicts
 
         scheduler.start()
+
+        # Keeps the document index current while files are moved around, incl. in Explorer
+        document_index.start_watching()
     except Exception as e:
         print(f"STARTUP EXCEPTION (Handled): {e}")
         # Only set startup_error for truly fatal things that prevent the API from even serving status
@@ -155,6 +175,8 @@ async def lifespan(app: FastAPI):
             scheduler.shutdown()
         except Exception as e:
             logger.warning(f"Error during scheduler shutdown: {e}")
+        import_jobs.runner.shutdown()
+        document_index.stop_watching()
         # Save and Unlock
         db_security.cleanup()
 
@@ -165,6 +187,77 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# GET endpoints whose responses depend only on the database content, today's date and the alert thresholds.
+# They get an ETag derived from the data version, so unchanged lists cost a 304.
+CONDITIONAL_GET_PREFIXES = (
+    "/api/v1/certificati",
+    "/api/v1/dipendenti",
+    "/api/v1/corsi",
+    "/api/v1/audit/",
+    "/api/v1/stats/",
+)
+CONDITIONAL_GET_EXCLUDED = ("/api/v1/audit/export",)
+
+def _compute_etag(request: Request) -> str:
+    parts = (
+        __version__,
+        get_data_version(),
+        date.today().isoformat(),  # Certificate statuses change with the date
+        str(settings.ALERT_THRESHOLD_DAYS),  # ...and with the alert thresholds
+        str(settings.ALERT_THRESHOLD_DAYS_VISITE),
+        request.url.path,
+        request.url.query,
+        request.headers.get("authorization", ""),
+        request.headers.get("accept-encoding", ""),
+    )
+    return '"' + hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def _credentials_still_valid(request: Request) -> bool:
+    """
+    The ETag covers the Authorization header, but a 304 must not outlive the token
+    itself: an expired, logged out or unknown token gets the route's own answer.
+    """
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return True
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    db = SessionLocal()
+    try:
+        deps.user_from_token(token, db)
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    path = request.url.path
+    if (request.method != "GET" or not path.startswith(CONDITIONAL_GET_PREFIXES)
+            or path.startswith(CONDITIONAL_GET_EXCLUDED)):
+        return await call_next(request)
+
+    # Computed before the handler runs: a write racing with this request yields a
+    # newer version on the next call, never a stale 304
+    etag = _compute_etag(request)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if (if_none_match and _etag_matches(if_none_match, etag)
+            and await run_in_threadpool(_credentials_still_valid, request)):
+        return Response(status_code=304, headers=cache_headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(cache_headers)
+    return response
+
 @app.middleware("http")
 async def check_startup_error(request: Request, call_next):
     if hasattr(request.app.state, "startup_error") and request.app.state.startup_error:
@@ -186,6 +279,12 @@ async def health_check(request: Request):
         )
     return {"status": "ok"}
 
+# Response compression (outermost, so it also covers error responses)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Include API routers
 app.include_router(api_router.router, prefix="/api/v1")
 app.include_router(notifications_router.router, prefix="/api/v1/notifications", tags=["Notifications"])
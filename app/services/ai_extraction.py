@@ -1,17 +1,145 @@
 import google.generativeai as genai
+import collections
+import heapq
+import itertools
 import logging
 import json
 import re
 import threading
+import time
+from typing import Optional
 from google.api_core import exceptions
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from app.core.config import settings
 from app.core.constants import CATEGORIE_STATICHE
-from app.core.ai_lock import ai_global_lock
+from app.core import ai_clients
+from app.services import pdf_preprocessing
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+MODEL_NAME = 'models/gemini-2.5-pro'
+
+PRIORITY_INTERACTIVE = 0  # Chat: a user is waiting for the answer
+PRIORITY_BULK = 1  # PDF extractions
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every Gemini call, chat included, since both use the
+    same project quota. Calls run unpaced until the first quota error: the quota
+    errors define the rate, not a guess. A quota error halves the rate actually
+    in use (at most the calls started in the last minute) and stops new calls
+    for COOLDOWN seconds; each success then probes upward by INCREASE_STEP.
+    AI_REQUESTS_PER_MINUTE is an optional ceiling (None: no ceiling). Waiting
+    callers are served by priority, then in arrival order, so a chat message
+    overtakes the queued bulk extractions.
+    """
+    MIN_PER_MINUTE = 1.0
+    INCREASE_STEP = 0.5  # Requests per minute gained per successful call
+    COOLDOWN = 30.0
+    BURST = 2
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        ceiling = self.max_per_minute
+        self._rate = float(ceiling) if ceiling is not None else None  # None: unpaced
+        self._tokens = float(self.BURST)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []  # Heap of (priority, arrival) tickets
+        self._arrivals = itertools.count()
+        self._started = collections.deque()  # Start times of the calls of the last minute
+        self._throttled = 0
+
+    @property
+    def max_per_minute(self) -> Optional[float]:
+        ceiling = settings.AI_REQUESTS_PER_MINUTE
+        return max(self.MIN_PER_MINUTE, float(ceiling)) if ceiling else None
+
+    def _refill(self, now):
+        # A ceiling set or lowered in the settings applies right away
+        ceiling = self.max_per_minute
+        if ceiling is not None:
+            self._rate = ceiling if self._rate is None else min(self._rate, ceiling)
+        if self._rate is not None:
+            self._tokens = min(self.BURST, self._tokens + (now - self._updated) * self._rate / 60.0)
+        self._updated = now
+
+    def _recent_calls(self, now) -> int:
+        while self._started and now - self._started[0] > 60.0:
+            self._started.popleft()
+        return len(self._started)
+
+    def acquire(self, priority: int = PRIORITY_BULK):
+        """Blocks until this call may start. Only the first caller in line takes tokens."""
+        with self._cond:
+            ticket = (priority, next(self._arrivals))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiting[0] != ticket:
+                        self._cond.wait()
+                    elif now < self._paused_until:
+                        self._cond.wait(self._paused_until - now)
+                    elif self._rate is not None and self._tokens < 1:
+                        self._cond.wait((1 - self._tokens) * 60.0 / self._rate)
+                    else:
+                        if self._rate is not None:
+                            self._tokens -= 1
+                        self._recent_calls(now)
+                        self._started.append(now)
+                        return
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def throttled(self):
+        """Reports a quota error. Calls already in flight during the cooldown count once."""
+        with self._cond:
+            now = time.monotonic()
+            if now >= self._paused_until:
+                self._refill(now)
+                in_use = max(self.MIN_PER_MINUTE, float(self._recent_calls(now)))
+                self._rate = max(self.MIN_PER_MINUTE, min(self._rate or in_use, in_use) / 2)
+                self._tokens = 1.0  # The cooldown is the wait for the next call
+                self._paused_until = now + self.COOLDOWN
+                self._throttled += 1
+                logging.warning(f"Gemini quota exhausted: rate lowered to {self._rate:.1f} requests/minute.")
+            self._cond.notify_all()
+
+    def succeeded(self):
+        with self._cond:
+            if self._rate is None:
+                return
+            self._rate += self.INCREASE_STEP
+            ceiling = self.max_per_minute
+            if ceiling is not None:
+                self._rate = min(ceiling, self._rate)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            priorities = [priority for priority, _ in self._waiting]
+            return {
+                "rate_per_minute": round(self._rate, 1) if self._rate is not None else None,
+                "max_per_minute": self.max_per_minute,
+                "queued_interactive": priorities.count(PRIORITY_INTERACTIVE),
+                "queued_bulk": priorities.count(PRIORITY_BULK),
+                "paused_seconds": round(max(0.0, self._paused_until - now), 1),
+                "throttled": self._throttled
+            }
+
+rate_limiter = AdaptiveRateLimiter()
+
 class GeminiClient:
+    """
+    Analysis model singleton. Requests go through the analysis client of
+    ai_clients, so no process-wide genai.configure() or lock is needed.
+    """
     _instance = None
     _model = None
     _lock = threading.Lock()
@@ -27,12 +155,10 @@ class GeminiClient:
                             logging.error("GEMINI_API_KEY_ANALYSIS not found.")
                             raise ValueError("GEMINI_API_KEY_ANALYSIS not configured.")
 
-                        # Configure with lock to prevent race with Chat
-                        with ai_global_lock:
-                            genai.configure(api_key=settings.GEMINI_API_KEY_ANALYSIS)
-                            cls._model = genai.GenerativeModel('models/gemini-2.5-pro')
+                        cls._model = genai.GenerativeModel(MODEL_NAME)
+                        ai_clients.bind(cls._model, ai_clients.ANALYSIS, settings.GEMINI_API_KEY_ANALYSIS)
 
-                        logging.info("Gemini model 'models/gemini-2.5-pro' initialized successfully.")
+                        logging.info(f"Gemini model '{MODEL_NAME}' initialized successfully.")
                     except Exception as e:
                         logging.error(f"Failed to initialize Gemini model: {e}")
                         cls._instance = None
@@ -40,6 +166,10 @@ class GeminiClient:
         return cls._instance
 
     def get_model(self):
+        # Follows key changes made in the settings; the client is reused otherwise
+        current_key = settings.GEMINI_API_KEY_ANALYSIS
+        if current_key:
+            ai_clients.bind(self._model, ai_clients.ANALYSIS, current_key)
         return self._model
 
 def get_gemini_model():
@@ -139,10 +269,19 @@ Se il documento è VALIDO, estrai le seguenti informazioni:
 JSON:
 """
 
+_service_error_wait = wait_exponential(multiplier=2, min=5, max=60)
+
+def _retry_wait(retry_state):
+    # After a quota error the rate limiter holds the next attempt back (and every
+    # other caller with it), so tenacity only waits on service errors
+    if isinstance(retry_state.outcome.exception(), exceptions.ResourceExhausted):
+        return 0
+    return _service_error_wait(retry_state)
+
 # Bug 10 Fix: Robust Retry Policy
 @retry(
     stop=stop_after_attempt(6),
-    wait=wait_exponential(multiplier=2, min=5, max=60),
+    wait=_retry_wait,
     retry=retry_if_exception_type((
         exceptions.ResourceExhausted,
         exceptions.ServiceUnavailable,
@@ -150,24 +289,21 @@ JSON:
     )),
     reraise=True
 )
-def _generate_content_with_retry(model, pdf_file_part, prompt):
+def _generate_content_with_retry(model, content_parts, prompt):
     """
     Wrapper for model.generate_content with tenacity retry logic.
-    
-    Note: The lock is held briefly only during the API call to prevent
-    race conditions with chat service configuration. The lock is released
-    automatically by the context manager even on exceptions.
+    No lock is held: the model has its own client, so calls run concurrently
+    with each other and with the chat. Every attempt waits for the rate limiter.
     """
+    rate_limiter.acquire(PRIORITY_BULK)
     logging.info("Calling AI for entity extraction...")
-    
-    # Acquire lock to prevent race with chat configuration
-    # Lock is released automatically on any exception (context manager)
-    with ai_global_lock:
-        # Only reconfigure if API key changed (optimization)
-        current_key = settings.GEMINI_API_KEY_ANALYSIS
-        if current_key:
-            genai.configure(api_key=current_key)
-        return model.generate_content([pdf_file_part, prompt])
+    try:
+        response = model.generate_content([*content_parts, prompt])
+    except exceptions.ResourceExhausted:
+        rate_limiter.throttled()
+        raise
+    rate_limiter.succeeded()
+    return response
 
 def _check_closing_char(stack, char):
     """Helper to check if closing char matches opening char on stack."""
@@ -255,11 +391,12 @@ def extract_entities_with_ai(pdf_bytes: bytes) -> dict:
         return {"error": "Modello Gemini non inizializzato."}
 
     prompt = _generate_prompt()
-    pdf_file_part = {"mime_type": "application/pdf", "data": pdf_bytes}
+    # The text layer or page renderings when smaller than the file itself
+    content_parts = pdf_preprocessing.prepare_parts(pdf_bytes)
 
     try:
         # Call the decorated function
-        response = _generate_content_with_retry(model, pdf_file_part, prompt)
+        response = _generate_content_with_retry(model, content_parts, prompt)
 
         # Bug 1 Fix: Robust JSON extraction using regex
         text_response = response.text.strip()
@@ -1,11 +1,17 @@
-from datetime import date, datetime
+import logging
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.db.models import Certificato, Corso
-from typing import Optional, List, Dict, Tuple
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, event, select, delete, insert, or_, and_, case, exists, inspect as sa_inspect
+from app.db.models import Certificato, Corso, StatoCertificato
+from typing import Optional, List, Dict, Tuple, Iterable
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Above this many certificates, reading every current status row beats a long IN (...) list
+_STATUS_IN_LIMIT = 500
+
 def calculate_expiration_date(issue_date: date, validity_months: int) -> Optional[date]:
     """
     Calcola la data di scadenza di un certificato.
@@ -51,20 +57,24 @@ def get_certificate_status(db: Session, certificato: Certificato) -> str:
 
     return "archiviato" if newer_cert_exists else "scaduto"
 
-def _determine_initial_status(cert, today, threshold_std, threshold_med):
-    if cert.data_scadenza_calcolata is None:
+def _status_from_dates(data_scadenza, categoria, dipendente_id, today, threshold_std, threshold_med):
+    if data_scadenza is None:
         return "attivo", False
 
-    threshold = threshold_med if cert.corso and cert.corso.categoria_corso == "VISITA MEDICA" else threshold_std
+    threshold = threshold_med if categoria == "VISITA MEDICA" else threshold_std
 
-    if cert.data_scadenza_calcolata >= today:
-        days = (cert.data_scadenza_calcolata - today).days
+    if data_scadenza >= today:
+        days = (data_scadenza - today).days
         return "in_scadenza" if days <= threshold else "attivo", False
 
     # Expired
-    needs_archive_check = cert.dipendente_id is not None
+    needs_archive_check = dipendente_id is not None
     return "scaduto", needs_archive_check
 
+def _determine_initial_status(cert, today, threshold_std, threshold_med):
+    categoria = cert.corso.categoria_corso if cert.corso else None
+    return _status_from_dates(cert.data_scadenza_calcolata, categoria, cert.dipendente_id, today, threshold_std, threshold_med)
+
 def _fetch_latest_dates(db, expired_linked_certs):
     relevant_ids = {c.dipendente_id for c in expired_linked_certs if c.dipendente_id}
     if not relevant_ids:
@@ -112,7 +122,230 @@ def get_bulk_certificate_statuses(db: Session, certificati: List[Certificato]) -
         if not category: continue
 
         max_date = latest_map.get((cert.dipendente_id, category))
-        if max_date and max_date > cert.data_rilascio:
+        if max_date and cert.data_rilascio and max_date > cert.data_rilascio:
             status_map[cert.id] = "archiviato"
 
     return status_map
+
+# --- Materialized statuses (stati_certificati) ---
+
+def _compute_status_rows(rows, today) -> Dict[int, str]:
+    """
+    Computes statuses from plain (id, dipendente_id, data_rilascio, data_scadenza, categoria) rows.
+    `rows` must contain every certificate of each employee it mentions, so the
+    latest issue date per employee+category can be derived without another query.
+    """
+    threshold_std = settings.ALERT_THRESHOLD_DAYS
+    threshold_med = settings.ALERT_THRESHOLD_DAYS_VISITE
+
+    latest_map = {}
+    for row in rows:
+        # Like SQL max(), missing issue dates are ignored
+        if row.dipendente_id is None or row.categoria is None or row.data_rilascio is None:
+            continue
+        key = (row.dipendente_id, row.categoria)
+        if key not in latest_map or row.data_rilascio > latest_map[key]:
+            latest_map[key] = row.data_rilascio
+
+    status_map = {}
+    for row in rows:
+        status, needs_check = _status_from_dates(row.data_scadenza, row.categoria, row.dipendente_id, today, threshold_std, threshold_med)
+        if needs_check and row.categoria:
+            max_date = latest_map.get((row.dipendente_id, row.categoria))
+            if max_date and row.data_rilascio and max_date > row.data_rilascio:
+                status = "archiviato"
+        status_map[row.id] = status
+    return status_map
+
+def _status_rows_query():
+    return select(
+        Certificato.id,
+        Certificato.dipendente_id,
+        Certificato.data_rilascio,
+        Certificato.data_scadenza_calcolata.label('data_scadenza'),
+        Corso.categoria_corso.label('categoria')
+    ).select_from(Certificato).outerjoin(Corso, Certificato.corso_id == Corso.id)
+
+def _write_status_rows(conn, status_map: Dict[int, str], today, stale_ids: Iterable[int] = ()):
+    ids = set(status_map) | set(stale_ids)
+    if ids:
+        conn.execute(delete(StatoCertificato).where(StatoCertificato.certificato_id.in_(ids)))
+    if status_map:
+        conn.execute(insert(StatoCertificato), [
+            {"certificato_id": cert_id, "stato": status, "aggiornato_il": today}
+            for cert_id, status in status_map.items()
+        ])
+
+def _sync_status_rows(conn, cert_ids, dipendente_ids, corso_ids, deleted_ids):
+    """
+    Recomputes the statuses affected by a flush: the changed certificates and every
+    certificate of the employees involved (a new issue date can archive older ones).
+    """
+    today = date.today()
+    if deleted_ids:
+        conn.execute(delete(StatoCertificato).where(StatoCertificato.certificato_id.in_(deleted_ids)))
+
+    if cert_ids or corso_ids:
+        direct = conn.execute(_status_rows_query().where(
+            or_(Certificato.id.in_(cert_ids), Certificato.corso_id.in_(corso_ids))
+        )).all()
+        cert_ids = cert_ids | {r.id for r in direct}
+        dipendente_ids = dipendente_ids | {r.dipendente_id for r in direct if r.dipendente_id is not None}
+
+    rows = conn.execute(_status_rows_query().where(
+        or_(Certificato.id.in_(cert_ids), Certificato.dipendente_id.in_(dipendente_ids))
+    )).all()
+    _write_status_rows(conn, _compute_status_rows(rows, today), today, stale_ids=cert_ids)
+
+def _history_values(obj, attr):
+    history = sa_inspect(obj).attrs[attr].history
+    return {v for v in list(history.added) + list(history.deleted) + list(history.unchanged) if v is not None}
+
+@event.listens_for(Session, "after_flush")
+def _on_after_flush(session, flush_context):
+    """Keeps stati_certificati in step with certificate writes, in the same transaction."""
+    cert_ids, dipendente_ids, corso_ids, deleted_ids = set(), set(), set(), set()
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Certificato) and obj.id is not None:
+            cert_ids.add(obj.id)
+            dipendente_ids |= _history_values(obj, 'dipendente_id')
+        elif isinstance(obj, Corso) and obj in session.dirty and obj.id is not None:
+            corso_ids.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Certificato) and obj.id is not None:
+            deleted_ids.add(obj.id)
+            dipendente_ids |= _history_values(obj, 'dipendente_id')
+
+    if not (cert_ids or corso_ids or deleted_ids):
+        return
+
+    try:
+        _sync_status_rows(session.connection(), cert_ids, dipendente_ids, corso_ids, deleted_ids)
+    except Exception as e:
+        # Readers fall back to live computation for certificates without a current row
+        logger.warning(f"Failed to update materialized certificate statuses: {e}")
+
+def refresh_status_table(db: Session) -> int:
+    """
+    Recomputes every materialized status (date rollover, threshold change).
+    Returns the number of certificates refreshed.
+    """
+    today = date.today()
+    conn = db.connection()
+    rows = conn.execute(_status_rows_query()).all()
+    status_map = _compute_status_rows(rows, today)
+
+    conn.execute(delete(StatoCertificato))
+    _write_status_rows(conn, status_map, today)
+    db.commit()
+    # The Core writes above skip the Session events that move the data version
+    from app.db.session import bump_data_version
+    bump_data_version()
+    return len(status_map)
+
+def rollover_statuses():
+    """Scheduled entry point: refreshes the status table in its own session."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = refresh_status_table(db)
+        logger.info(f"Refreshed {count} certificate statuses.")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Certificate status refresh failed: {e}")
+    finally:
+        db.close()
+
+def get_stored_statuses(db: Session, certificati: List[Certificato]) -> Dict[int, str]:
+    """
+    Reads statuses from stati_certificati. Certificates without a row computed today
+    (e.g. before the daily refresh has run) are computed live.
+    """
+    if not certificati:
+        return {}
+
+    ids = {cert.id for cert in certificati}
+    query = db.query(StatoCertificato.certificato_id, StatoCertificato.stato).filter(
+        StatoCertificato.aggiornato_il == date.today()
+    )
+    if len(ids) <= _STATUS_IN_LIMIT:
+        query = query.filter(StatoCertificato.certificato_id.in_(ids))
+
+    try:
+        status_map = {cert_id: stato for cert_id, stato in query.all() if cert_id in ids}
+    except Exception as e:
+        logger.warning(f"Materialized certificate statuses unavailable: {e}")
+        status_map = {}
+
+    missing = [cert for cert in certificati if cert.id not in status_map]
+    if missing:
+        status_map.update(get_bulk_certificate_statuses(db, missing))
+    return status_map
+
+def status_expression(today: date):
+    """
+    SQL expression of a certificate's status, for filtering in the query itself:
+    the joined stati_certificati row when there is a current one, otherwise the
+    rules of get_bulk_certificate_statuses() evaluated in SQL. The query must
+    select from Certificato joined with Corso and (outer) StatoCertificato.
+    """
+    newer = aliased(Certificato)
+    newer_corso = aliased(Corso)
+    renewed = exists().where(
+        newer.corso_id == newer_corso.id,
+        newer.dipendente_id == Certificato.dipendente_id,
+        newer_corso.categoria_corso == Corso.categoria_corso,
+        newer.data_rilascio > Certificato.data_rilascio
+    )
+    scadenza = Certificato.data_scadenza_calcolata
+    is_visita = func.coalesce(Corso.categoria_corso, "") == "VISITA MEDICA"
+    expiring = or_(
+        and_(is_visita, scadenza <= today + timedelta(days=settings.ALERT_THRESHOLD_DAYS_VISITE)),
+        and_(~is_visita, scadenza <= today + timedelta(days=settings.ALERT_THRESHOLD_DAYS))
+    )
+    return case(
+        (StatoCertificato.stato.isnot(None), StatoCertificato.stato),
+        (scadenza.is_(None), "attivo"),
+        (and_(scadenza >= today, expiring), "in_scadenza"),
+        (scadenza >= today, "attivo"),
+        (and_(Certificato.dipendente_id.isnot(None), renewed), "archiviato"),
+        else_="scaduto"
+    )
+
+def get_status_counts(db: Session, *filters) -> Dict[Optional[str], Dict[str, int]]:
+    """
+    Counts certificates per category and status, mostly with a single GROUP BY on
+    stati_certificati. Certificates without a current row are computed live.
+    """
+    today = date.today()
+    stato = StatoCertificato.stato
+    rows = db.query(Corso.categoria_corso, stato, func.count(Certificato.id)).select_from(Certificato)\
+        .outerjoin(Corso, Certificato.corso_id == Corso.id)\
+        .outerjoin(StatoCertificato, (StatoCertificato.certificato_id == Certificato.id) & (StatoCertificato.aggiornato_il == today))\
+        .filter(*filters)\
+        .group_by(Corso.categoria_corso, stato).all()
+
+    counts: Dict[Optional[str], Dict[str, int]] = {}
+    has_missing = False
+    for categoria, status, count in rows:
+        if status is None:
+            has_missing = True
+            continue
+        bucket = counts.setdefault(categoria, {})
+        bucket[status] = bucket.get(status, 0) + count
+
+    if has_missing:
+        missing = db.query(Certificato).outerjoin(
+            StatoCertificato, (StatoCertificato.certificato_id == Certificato.id) & (StatoCertificato.aggiornato_il == today)
+        ).filter(StatoCertificato.certificato_id.is_(None), *filters).all()
+        live = get_bulk_certificate_statuses(db, missing)
+        for cert in missing:
+            categoria = cert.corso.categoria_corso if cert.corso else None
+            bucket = counts.setdefault(categoria, {})
+            status = live.get(cert.id, "attivo")
+            bucket[status] = bucket.get(status, 0) + 1
+
+    return counts
@@ -1,11 +1,13 @@
 import logging
 import google.generativeai as genai
+from google.api_core import exceptions
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 from datetime import date, timedelta
 from typing import List, Dict, Any
 from app.core.config import settings
-from app.core.ai_lock import ai_global_lock
+from app.core import ai_clients
+from app.services import ai_extraction
 from app.db.models import Certificato, Dipendente, User
 from app.services.certificate_logic import get_bulk_certificate_statuses
 
@@ -190,13 +192,12 @@ DOCUMENTI DA VALIDARE/ORFANI (Top {len(orphans_list)}):
         if not api_key or "obf:" in api_key:
              return "Errore: Chiave API Chat non configurata."
 
-        # Bug 2 Fix: Lock the configuration
-        with ai_global_lock:
-            try:
-                genai.configure(api_key=api_key)
-                model = genai.GenerativeModel('models/gemini-2.5-flash')
+        # Own client and key: no process-wide configure or lock, so chat
+        # requests do not wait for PDF analysis calls (and vice versa)
+        try:
+            model = ai_clients.bind(genai.GenerativeModel('models/gemini-2.5-flash'), ai_clients.CHAT, api_key)
 
-                system_prompt = f"""
+            system_prompt = f"""
 Sei Intelleo, l'assistente AI avanzato per la sicurezza sul lavoro di COEMI.
 Il tuo compito è assistere l'utente nella gestione delle scadenze e dei documenti.
 
@@ -210,18 +211,26 @@ LINEE GUIDA:
 {context}
 """
 
-                gemini_history = []
-                for msg in history:
-                    role = 'user' if msg.get('role') == 'user' else 'model'
-                    gemini_history.append({'role': role, 'parts': [msg.get('content', '')]})
+            gemini_history = []
+            for msg in history:
+                role = 'user' if msg.get('role') == 'user' else 'model'
+                gemini_history.append({'role': role, 'parts': [msg.get('content', '')]})
 
-                chat_session = model.start_chat(history=gemini_history)
-                final_prompt = f"{system_prompt}\n\nUTENTE: {message}"
-                response = chat_session.send_message(final_prompt)
-                return response.text
+            chat_session = model.start_chat(history=gemini_history)
+            final_prompt = f"{system_prompt}\n\nUTENTE: {message}"
 
-            except Exception as e:
-                logger.error(f"Chat Error: {e}")
-                return f"Errore durante la generazione della risposta: {e}"
+            # Shares the quota with the PDF analysis, ahead of the queued extractions
+            ai_extraction.rate_limiter.acquire(ai_extraction.PRIORITY_INTERACTIVE)
+            try:
+                response = chat_session.send_message(final_prompt)
+            except exceptions.ResourceExhausted:
+                ai_extraction.rate_limiter.throttled()
+                raise
+            ai_extraction.rate_limiter.succeeded()
+            return response.text
+
+        except Exception as e:
+            logger.error(f"Chat Error: {e}")
+            return f"Errore durante la generazione della risposta: {e}"
 
 chat_service = ChatService()
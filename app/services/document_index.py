@@ -0,0 +1,444 @@
+"""
+In-memory index of the certificate PDFs.
+find_document() used to stat every candidate path and, on a miss, walk the whole
+DOCUMENTI DIPENDENTI tree twice; on a network share with tens of thousands of
+files one miss took seconds. The tree (and the analysis error folders) is now
+scanned once per database path and every lookup strategy is answered from:
+
+- a map of (name, matricola, category, expiry) parsed from the file names,
+- the PDFs of each folder, with their modification time,
+- an inverted index of the name tokens of the files in DOCUMENTI DIPENDENTI.
+
+The index is then kept current incrementally, without walking the tree again:
+- files moved by the application are recorded with record_move() / record_added();
+- while watching, native change notifications (watchdog, when installed) are
+  applied as they arrive;
+- a reconciliation pass stats every indexed folder and re-lists only those whose
+  mtime changed. It runs every RECONCILE_INTERVAL while watching, which also covers
+  network drives that send no notifications, and on a lookup miss at most every
+  RECONCILE_ON_MISS_AFTER seconds.
+Paths returned by the index are checked on disk and dropped when gone. Bulk
+readers (the nightly maintenance) work on a snapshot directly through query().
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+from desktop_app.constants import DIR_ANALYSIS_ERRORS
+
+try:
+    # Optional: without it the periodic reconciliation alone keeps the index current
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+DOCS_DIRNAME = "DOCUMENTI DIPENDENTI"
+RECONCILE_INTERVAL = 30  # Seconds
+RECONCILE_ON_MISS_AFTER = 5  # Seconds
+MTIME_GRANULARITY = 2  # Seconds; FAT and SMB round folder mtimes
+UNSETTLED = -1.0  # Never equal to a real mtime
+
+_FILENAME_PATTERN = re.compile(r"^(?P<nome>.+) \((?P<matricola>[^()]*)\) - (?P<categoria>.+) - (?P<scadenza>.+)\.pdf$", re.IGNORECASE)
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+def _is_pdf(name: str) -> bool:
+    return name.lower().endswith(".pdf")
+
+def filename_key(filename: str) -> Optional[tuple]:
+    """(name, matricola, category, expiry) of a file named as by construct_certificate_path()."""
+    match = _FILENAME_PATTERN.match(filename)
+    if match is None:
+        return None
+    return tuple(part.casefold() for part in match.group("nome", "matricola", "categoria", "scadenza"))
+
+def name_tokens(text: str) -> set:
+    return set(_TOKEN_PATTERN.findall(text.casefold()))
+
+class _Entry:
+    __slots__ = ("path", "filename", "mtime", "order", "in_docs")
+
+    def __init__(self, path, filename, mtime, order, in_docs):
+        self.path = path
+        self.filename = filename
+        self.mtime = mtime
+        self.order = order  # Scan order, so ties resolve as the old os.walk did
+        self.in_docs = in_docs
+
+class _Snapshot:
+    """The indexed PDFs and folders of one database path."""
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self.roots = [os.path.join(database_path, DOCS_DIRNAME), os.path.join(database_path, DIR_ANALYSIS_ERRORS)]
+        self.docs_root = _norm(self.roots[0])
+        self.errors_root = _norm(self.roots[1])
+        self.entries = {}  # normalized path -> _Entry
+        self.by_key = defaultdict(set)  # filename_key -> normalized paths
+        self.by_dir = defaultdict(set)  # normalized folder -> normalized paths
+        self.by_token = defaultdict(set)  # name token -> normalized paths (DOCUMENTI DIPENDENTI only)
+        self.dirs = {}  # normalized folder -> (path, mtime); mtime is UNSETTLED while it may still move
+        self.subdirs = defaultdict(set)  # normalized folder -> normalized child folders
+        self.reconciled_at = time.monotonic()
+        self._order = 0
+
+    def scan(self):
+        for root in self.roots:
+            self.scan_dir(root)
+        return self
+
+    def scan_dir(self, top: str):
+        """Indexes the folder `top` and everything below it."""
+        try:
+            top_mtime = os.stat(top).st_mtime
+        except OSError:
+            return
+        parent = _norm(os.path.dirname(top))
+        if parent in self.dirs:
+            self.subdirs[parent].add(_norm(top))
+
+        stack = [(top, top_mtime)]
+        while stack:
+            folder, mtime = stack.pop()
+            listing = self._list_dir(folder)
+            if listing is None:
+                continue
+            files, subfolders = listing
+            key = _norm(folder)
+            self.dirs[key] = (folder, self._settled(mtime))
+            for path, file_mtime in files:
+                self.add(path, file_mtime)
+            self.subdirs[key].update(_norm(path) for path, _ in subfolders)
+            # Depth-first, in name order
+            stack.extend(reversed(subfolders))
+
+    @staticmethod
+    def _list_dir(folder: str):
+        """PDFs and subfolders of `folder` as (path, mtime) pairs in name order, None if unreadable."""
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return None
+        files, subfolders = [], []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append((entry.path, entry.stat().st_mtime))
+                elif _is_pdf(entry.name) and entry.is_file():
+                    files.append((entry.path, entry.stat().st_mtime))
+            except OSError:
+                continue
+        return files, subfolders
+
+    @staticmethod
+    def _settled(mtime: float) -> float:
+        # A folder changed within the mtime granularity can change again without
+        # its mtime moving: it stays unsettled, and is re-listed, until then
+        return mtime if mtime < time.time() - MTIME_GRANULARITY else UNSETTLED
+
+    def drop_dir(self, folder: str):
+        """Forgets `folder` and everything below it."""
+        key = _norm(folder)
+        stack = [key]
+        while stack:
+            current = stack.pop()
+            for path in list(self.by_dir.get(current, ())):
+                self.remove(path)
+            self.by_dir.pop(current, None)
+            self.dirs.pop(current, None)
+            stack.extend(self.subdirs.pop(current, ()))
+        parent = self.subdirs.get(os.path.dirname(key))
+        if parent is not None:
+            parent.discard(key)
+
+    def folders(self) -> list:
+        """The indexed folders with their mtimes, plus the roots not indexed yet (mtime None)."""
+        known = list(self.dirs.values())
+        return known + [(root, None) for root in self.roots if _norm(root) not in self.dirs]
+
+    @staticmethod
+    def changed_dirs(folders: list) -> list:
+        """The `folders` whose mtime changed, or that appeared or vanished: one stat each."""
+        changed = []
+        for path, mtime in folders:
+            try:
+                current = os.stat(path).st_mtime
+            except OSError:
+                current = None
+            if current is None and mtime is None:
+                continue  # A root that still does not exist
+            if mtime is None or current != mtime:
+                changed.append((path, current))
+        return changed
+
+    def refresh(self, changed: list):
+        """Re-lists the folders returned by changed_dirs()."""
+        for path, mtime in changed:
+            key = _norm(path)
+            if mtime is None:
+                self.drop_dir(path)
+                continue
+            if key not in self.dirs:
+                self.scan_dir(path)
+                continue
+            listing = self._list_dir(path)
+            if listing is None:
+                self.drop_dir(path)
+                continue
+            files, subfolders = listing
+            self.dirs[key] = (path, self._settled(mtime))
+
+            listed = {_norm(p): (p, m) for p, m in files}
+            indexed = set(self.by_dir.get(key, ()))
+            for gone in indexed - listed.keys():
+                self.remove(gone)
+            for new in listed.keys() - indexed:
+                self.add(*listed[new])
+
+            listed_dirs = {_norm(p): p for p, _ in subfolders}
+            known_dirs = set(self.subdirs.get(key, ()))
+            for gone in known_dirs - listed_dirs.keys():
+                self.drop_dir(gone)
+            for new in listed_dirs.keys() - known_dirs:
+                self.scan_dir(listed_dirs[new])
+        self.reconciled_at = time.monotonic()
+
+    def add(self, path: str, mtime: Optional[float] = None):
+        key_path = _norm(path)
+        if key_path in self.entries:
+            self.remove(path)
+        if mtime is None:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = 0.0
+        filename = os.path.basename(path)
+        in_docs = key_path.startswith(self.docs_root + os.sep)
+        self._order += 1
+        self.entries[key_path] = _Entry(os.path.normpath(path), filename, mtime, self._order, in_docs)
+        self.by_dir[os.path.dirname(key_path)].add(key_path)
+        key = filename_key(filename)
+        if key:
+            self.by_key[key].add(key_path)
+        if in_docs:
+            for token in name_tokens(filename):
+                self.by_token[token].add(key_path)
+
+    def remove(self, path: str):
+        key_path = _norm(path)
+        entry = self.entries.pop(key_path, None)
+        if entry is None:
+            return
+        self.by_dir[os.path.dirname(key_path)].discard(key_path)
+        key = filename_key(entry.filename)
+        if key:
+            self.by_key[key].discard(key_path)
+        for token in name_tokens(entry.filename):
+            self.by_token[token].discard(key_path)
+
+    def empty_dirs(self, top: str) -> list:
+        """The folders below `top` without any indexed PDF beneath them, deepest first."""
+        top_key = _norm(top)
+        below = [key for key in self.dirs if key.startswith(top_key + os.sep)]
+        below.sort(key=lambda key: key.count(os.sep), reverse=True)
+        holding, empty = set(), []
+        for key in below:
+            if self.by_dir.get(key) or any(child in holding for child in self.subdirs.get(key, ())):
+                holding.add(key)
+            else:
+                empty.append(self.dirs[key][0])
+        return empty
+
+    def covers(self, path: str) -> bool:
+        key_path = _norm(path)
+        return any(key_path == root or key_path.startswith(root + os.sep) for root in (self.docs_root, self.errors_root))
+
+class _EventHandler:
+    """Applies the watchdog events under one database path to its snapshot."""
+
+    def __init__(self, lock, snapshot):
+        self.lock = lock
+        self.snapshot = snapshot
+
+    def dispatch(self, event):
+        if event.event_type not in ("created", "deleted", "moved"):
+            return
+        try:
+            with self.lock:
+                self._apply(event)
+        except Exception as e:
+            logger.warning(f"Document index event not applied ({event.event_type} {event.src_path}): {e}")
+
+    def _apply(self, event):
+        snapshot = self.snapshot
+        src = os.fsdecode(event.src_path)
+        if event.event_type in ("deleted", "moved") and snapshot.covers(src):
+            if event.is_directory:
+                snapshot.drop_dir(src)
+            else:
+                snapshot.remove(src)
+        target = os.fsdecode(event.dest_path) if event.event_type == "moved" else src
+        if event.event_type in ("created", "moved") and snapshot.covers(target):
+            if event.is_directory:
+                snapshot.scan_dir(target)
+            elif _is_pdf(target):
+                snapshot.add(target)
+
+class DocumentIndex:
+    """Index snapshots by database path, built on first use."""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.RLock()
+        self._observers = {}
+        self._watch_thread = None
+        self._stop = threading.Event()
+
+    def snapshot(self, database_path: str) -> _Snapshot:
+        """Returns the snapshot of `database_path`, scanning the tree the first time."""
+        root = _norm(database_path)
+        with self._lock:
+            snapshot = self._snapshots.get(root)
+            if snapshot is None:
+                start = time.monotonic()
+                snapshot = self._snapshots[root] = _Snapshot(database_path).scan()
+                logger.info(f"Indexed {len(snapshot.entries)} documents in {time.monotonic() - start:.2f}s.")
+                if self._watch_thread is not None:
+                    self._observe(root, snapshot)
+            return snapshot
+
+    def lookup(self, database_path: str, search):
+        """
+        Runs `search(snapshot)` and returns its path, verified on disk. A miss
+        reconciles the changed folders first, if the last pass is old enough.
+        """
+        with self._lock:
+            snapshot = self.snapshot(database_path)
+            result = self._verified(snapshot, search)
+            if result is not None or time.monotonic() - snapshot.reconciled_at <= RECONCILE_ON_MISS_AFTER:
+                return result
+            folders = snapshot.folders()
+        # As in reconcile(), the stats run without the lock
+        changed = _Snapshot.changed_dirs(folders)
+        with self._lock:
+            snapshot.refresh(changed)
+            return self._verified(snapshot, search)
+
+    def query(self, database_path: str, read, reconcile: bool = False):
+        """
+        Returns `read(snapshot)`, run under the index lock. With `reconcile`, the
+        folders changed since the last pass are re-listed first (a snapshot built
+        by this call is already current).
+        """
+        with self._lock:
+            known = _norm(database_path) in self._snapshots
+            snapshot = self.snapshot(database_path)
+            folders = snapshot.folders() if reconcile and known else None
+        if folders is not None:
+            changed = _Snapshot.changed_dirs(folders)
+            with self._lock:
+                snapshot.refresh(changed)
+        with self._lock:
+            return read(snapshot)
+
+    def _verified(self, snapshot: _Snapshot, search):
+        while True:
+            path = search(snapshot)
+            if path is None or os.path.isfile(path):
+                return path
+            # Removed outside the application
+            snapshot.remove(path)
+
+    def reconcile(self) -> int:
+        """Re-lists the folders changed since the last pass, in every snapshot. Returns their count."""
+        with self._lock:
+            pending = [(snapshot, snapshot.folders()) for snapshot in self._snapshots.values()]
+        count = 0
+        for snapshot, folders in pending:
+            # The stats run without the lock, so lookups are not held up on slow shares
+            changed = _Snapshot.changed_dirs(folders)
+            with self._lock:
+                snapshot.refresh(changed)
+            count += len(changed)
+        return count
+
+    def start_watching(self, interval: float = RECONCILE_INTERVAL):
+        """Starts the reconciliation thread, and the change notifications of every snapshot."""
+        with self._lock:
+            if self._watch_thread is not None:
+                return
+            self._stop.clear()
+            self._watch_thread = threading.Thread(target=self._reconcile_loop, args=(interval,), name="document-index", daemon=True)
+            self._watch_thread.start()
+            for root, snapshot in self._snapshots.items():
+                self._observe(root, snapshot)
+
+    def stop_watching(self):
+        with self._lock:
+            thread, self._watch_thread = self._watch_thread, None
+            observers, self._observers = list(self._observers.values()), {}
+        self._stop.set()
+        for observer in observers:
+            observer.stop()
+        for observer in observers:
+            observer.join(timeout=5)
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _observe(self, root: str, snapshot: _Snapshot):
+        if Observer is None or root in self._observers or not os.path.isdir(snapshot.database_path):
+            return
+        try:
+            observer = Observer()
+            observer.schedule(_EventHandler(self._lock, snapshot), snapshot.database_path, recursive=True)
+            observer.daemon = True
+            observer.start()
+            self._observers[root] = observer
+        except Exception as e:
+            logger.warning(f"Change notifications unavailable for {snapshot.database_path}: {e}")
+
+    def _reconcile_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                changed = self.reconcile()
+                if changed:
+                    logger.info(f"Document index: {changed} changed folders reconciled.")
+            except Exception as e:
+                logger.warning(f"Document index reconciliation failed: {e}")
+
+    def record_added(self, path: str):
+        """Adds a file written by the application to the indexes covering it."""
+        with self._lock:
+            for snapshot in self._snapshots.values():
+                if snapshot.covers(path):
+                    snapshot.add(path)
+
+    def record_removed(self, path: str):
+        with self._lock:
+            for snapshot in self._snapshots.values():
+                snapshot.remove(path)
+
+    def record_move(self, old_path: Optional[str], new_path: str):
+        if old_path:
+            self.record_removed(old_path)
+        self.record_added(new_path)
+
+    def invalidate(self, database_path: Optional[str] = None):
+        """Drops the snapshot of `database_path` (all when None); the next lookup rescans."""
+        with self._lock:
+            roots = list(self._snapshots) if database_path is None else [_norm(database_path)]
+            for root in roots:
+                self._snapshots.pop(root, None)
+                observer = self._observers.pop(root, None)
+                if observer is not None:
+                    observer.stop()
+
+document_index = DocumentIndex()
@@ -1,6 +1,7 @@
+import fnmatch
 import os
-import glob
 from datetime import datetime
+from app.services.document_index import document_index, filename_key, name_tokens
 from app.utils.file_security import sanitize_filename
 from desktop_app.constants import DIR_ANALYSIS_ERRORS, DATE_FORMAT_FILE
 
@@ -16,58 +17,56 @@ def _format_file_scadenza(data_scadenza_str):
             pass
     return "no scadenza"
 
-def _search_exact_path(base_path, filename, statuses):
+def _search_exact_path(snapshot, base_path, filename, statuses):
     """Search for exact filename in status folders."""
+    indexed = snapshot.by_key.get(filename_key(filename), ())
     for status in statuses:
-        candidate = os.path.join(base_path, status, filename)
-        if os.path.isfile(candidate):
-            return os.path.normpath(candidate)
+        candidate = os.path.normcase(os.path.normpath(os.path.join(base_path, status, filename)))
+        if candidate in indexed:
+            return snapshot.entries[candidate].path
     return None
 
-def _search_partial_match(base_path, nome_fs, categoria_fs, statuses):
+def _search_partial_match(snapshot, base_path, nome_fs, categoria_fs, statuses):
     """Search for files matching partial pattern (name and category)."""
+    pattern = f"*{nome_fs}*{categoria_fs}*.pdf"
     for status in statuses:
-        status_path = os.path.join(base_path, status)
-        if not os.path.isdir(status_path):
-            continue
-        # Search for files containing the name and category
-        pattern = os.path.join(status_path, f"*{nome_fs}*{categoria_fs}*.pdf")
-        matches = glob.glob(pattern, recursive=False)
+        status_path = os.path.normcase(os.path.normpath(os.path.join(base_path, status)))
+        # Same matching rules as glob, on the indexed folder content
+        matches = [snapshot.entries[p] for p in snapshot.by_dir.get(status_path, ())
+                   if fnmatch.fnmatch(snapshot.entries[p].filename, pattern)]
         if matches:
             # Return most recent file
-            return os.path.normpath(max(matches, key=os.path.getmtime))
+            return max(matches, key=lambda e: e.mtime).path
     return None
 
-def _search_in_folder_tree(database_path, nome_fs, categoria_fs):
-    """Deep search in the entire DOCUMENTI DIPENDENTI tree."""
-    docs_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI")
-    if not os.path.isdir(docs_path):
+def _search_in_folder_tree(snapshot, nome_fs, categoria_fs):
+    """Deep search in the entire DOCUMENTI DIPENDENTI tree, through the name token index."""
+    tokens = name_tokens(nome_fs)
+    if tokens:
+        candidates = set.intersection(*(snapshot.by_token.get(t, set()) for t in tokens))
+    else:
+        candidates = [p for p, e in snapshot.entries.items() if e.in_docs]
+
+    nome_lower = nome_fs.lower()
+    # Match by name in filename, in scan order
+    matches = sorted((snapshot.entries[p] for p in candidates if nome_lower in snapshot.entries[p].filename.lower()),
+                     key=lambda e: e.order)
+    if not matches:
         return None
 
-    # Search for any PDF containing the employee name
-    for root, dirs, files in os.walk(docs_path):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                file_lower = file.lower()
-                nome_lower = nome_fs.lower()
-                # Match by name in filename
-                if nome_lower in file_lower:
-                    # If category also matches, prioritize
-                    if categoria_fs.lower() in file_lower:
-                        return os.path.normpath(os.path.join(root, file))
+    # If category also matches, prioritize
+    categoria_lower = categoria_fs.lower()
+    for entry in matches:
+        if categoria_lower in entry.filename.lower():
+            return entry.path
 
     # Fallback: just name match
-    for root, dirs, files in os.walk(docs_path):
-        for file in files:
-            if file.lower().endswith('.pdf') and nome_fs.lower() in file.lower():
-                return os.path.normpath(os.path.join(root, file))
-
-    return None
+    return matches[0].path
 
 def find_document(database_path: str, cert_data: dict) -> str | None:
     """
     Locates the certificate PDF within the database directory structure.
-    Uses multiple search strategies:
+    Every strategy is answered from the in-memory document index:
     1. Exact match in standard path
     2. Exact match in error paths
     3. Partial match by name and category
@@ -75,6 +74,13 @@ def find_document(database_path: str, cert_data: dict) -> str | None:
     """
     if not database_path or not cert_data:
         return None
+    return document_index.lookup(database_path, document_search(database_path, cert_data))
+
+def document_search(database_path: str, cert_data: dict):
+    """
+    The search run by find_document(), as a function of an index snapshot, for
+    callers resolving many certificates against one snapshot.
+    """
 
     nome = cert_data.get('nome') or 'SCONOSCIUTO'
     matricola = cert_data.get('matricola')
@@ -95,41 +101,40 @@ def find_document(database_path: str, cert_data: dict) -> str | None:
     filename = f"{nome_fs} ({matricola_fs}) - {categoria_fs} - {file_scadenza}.pdf"
 
     statuses = ["ATTIVO", "IN SCADENZA", "SCADUTO", "STORICO", "RINNOVATO"]
-
-    # 1. Search in Standard Path (exact match)
     base_search_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI", employee_folder, categoria_fs)
-    result = _search_exact_path(base_search_path, filename, statuses)
-    if result:
-        return result
-
-    # 2. Search in Error Paths (exact match)
-    error_categories = ["ASSENZA MATRICOLE", "CATEGORIA NON TROVATA", "DUPLICATI", "ALTRI ERRORI"]
-    for err_cat in error_categories:
-        base_error_path = os.path.join(database_path, DIR_ANALYSIS_ERRORS, err_cat, employee_folder, categoria_fs)
-        result = _search_exact_path(base_error_path, filename, statuses)
+
+    def search(snapshot):
+        # 1. Search in Standard Path (exact match)
+        result = _search_exact_path(snapshot, base_search_path, filename, statuses)
         if result:
             return result
 
-    # 3. Try with orphan folder (N-A) if we have a matricola
-    if matricola != 'N-A':
-        orphan_folder = f"{nome_fs} (N-A)"
-        orphan_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI", orphan_folder, categoria_fs)
-        orphan_filename = f"{nome_fs} (N-A) - {categoria_fs} - {file_scadenza}.pdf"
-        result = _search_exact_path(orphan_path, orphan_filename, statuses)
+        # 2. Search in Error Paths (exact match)
+        error_categories = ["ASSENZA MATRICOLE", "CATEGORIA NON TROVATA", "DUPLICATI", "ALTRI ERRORI"]
+        for err_cat in error_categories:
+            base_error_path = os.path.join(database_path, DIR_ANALYSIS_ERRORS, err_cat, employee_folder, categoria_fs)
+            result = _search_exact_path(snapshot, base_error_path, filename, statuses)
+            if result:
+                return result
+
+        # 3. Try with orphan folder (N-A) if we have a matricola
+        if matricola != 'N-A':
+            orphan_folder = f"{nome_fs} (N-A)"
+            orphan_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI", orphan_folder, categoria_fs)
+            orphan_filename = f"{nome_fs} (N-A) - {categoria_fs} - {file_scadenza}.pdf"
+            result = _search_exact_path(snapshot, orphan_path, orphan_filename, statuses)
+            if result:
+                return result
+
+        # 4. Partial match search in employee folder
+        result = _search_partial_match(snapshot, base_search_path, nome_fs, categoria_fs, statuses)
         if result:
             return result
 
-    # 4. Partial match search in employee folder
-    result = _search_partial_match(base_search_path, nome_fs, categoria_fs, statuses)
-    if result:
-        return result
+        # 5. Deep search in entire DOCUMENTI DIPENDENTI tree
+        return _search_in_folder_tree(snapshot, nome_fs, categoria_fs)
 
-    # 5. Deep search in entire DOCUMENTI DIPENDENTI tree
-    result = _search_in_folder_tree(database_path, nome_fs, categoria_fs)
-    if result:
-        return result
-
-    return None
+    return search
 
 def construct_certificate_path(database_path: str, cert_data: dict, status: str = "ATTIVO") -> str:
     """
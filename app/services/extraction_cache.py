@@ -0,0 +1,111 @@
+"""
+Persistent cache of AI extraction results.
+Entries are keyed by the SHA-256 of the PDF bytes and the prompt version, so the
+same file imported again (even under another name) skips the Gemini call. The
+version hashes the model name and the full prompt, categories included: editing
+CATEGORIE_STATICHE or the prompt makes old entries stop matching, and prune()
+removes them together with stale and least recently used ones.
+"""
+import functools
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.db.models import AIExtractionCache, utc_now
+from app.services import ai_extraction
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_AGE_DAYS = 180  # Since the entry was last used
+CACHE_MAX_ENTRIES = 5000
+
+@functools.lru_cache(maxsize=1)
+def prompt_version() -> str:
+    source = f"{ai_extraction.MODEL_NAME}\n{ai_extraction._generate_prompt()}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+def content_hash(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def lookup(db: Session, key: str) -> Optional[dict]:
+    """Returns the cached result for the content hash `key`, or None on a miss."""
+    try:
+        entry = db.query(AIExtractionCache).filter(
+            AIExtractionCache.content_hash == key,
+            AIExtractionCache.prompt_version == prompt_version(),
+            AIExtractionCache.last_used_at >= utc_now() - timedelta(days=CACHE_MAX_AGE_DAYS)
+        ).first()
+        if entry is None:
+            return None
+        entry.last_used_at = utc_now()
+        entry.hits = (entry.hits or 0) + 1
+        result = json.loads(entry.result)
+        db.commit()
+        logger.info(f"AI extraction cache hit for {key[:12]}.")
+        return result
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"AI extraction cache lookup failed: {e}")
+        return None
+
+def store(db: Session, key: str, extracted_data: dict):
+    """
+    Caches a successful extraction or a rejection. Transient failures (quota,
+    service or parsing errors) are not cached, so the file is retried next time.
+    """
+    if "error" in extracted_data and not extracted_data.get("is_rejected"):
+        return
+    try:
+        db.merge(AIExtractionCache(
+            content_hash=key,
+            prompt_version=prompt_version(),
+            result=json.dumps(extracted_data),
+            created_at=utc_now(),
+            last_used_at=utc_now(),
+            hits=0
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"AI extraction cache store failed: {e}")
+
+def prune(db: Session) -> int:
+    """
+    Deletes entries of other prompt versions, entries unused for CACHE_MAX_AGE_DAYS
+    and the least recently used ones beyond CACHE_MAX_ENTRIES. Returns the count.
+    """
+    query = db.query(AIExtractionCache)
+    deleted = query.filter(
+        (AIExtractionCache.prompt_version != prompt_version())
+        | (AIExtractionCache.last_used_at < utc_now() - timedelta(days=CACHE_MAX_AGE_DAYS))
+    ).delete(synchronize_session=False)
+
+    overflow = query.count() - CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = [row.content_hash for row in query.with_entities(AIExtractionCache.content_hash)
+                  .order_by(AIExtractionCache.last_used_at).limit(overflow)]
+        deleted += query.filter(AIExtractionCache.content_hash.in_(oldest)).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def clear(db: Session) -> int:
+    """Drops every cached result, e.g. after the AI model was changed."""
+    deleted = db.query(AIExtractionCache).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def prune_cache():
+    """Scheduled entry point: prunes the cache in its own session."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = prune(db)
+        logger.info(f"Pruned {count} AI extraction cache entries.")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"AI extraction cache pruning failed: {e}")
+    finally:
+        db.close()
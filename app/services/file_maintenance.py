@@ -7,76 +7,88 @@ from app.db.models import Certificato, AuditLog
 from app.services import certificate_logic
 from app.core.config import settings, get_user_data_dir
 from app.utils.audit import log_security_action
-from app.services.sync_service import clean_all_empty_folders, archive_certificate_file
-from app.services.document_locator import find_document
+from app.services.sync_service import clean_all_empty_folders, plan_archive_moves, execute_archive_moves, resume_archive_moves
+from app.services.document_locator import document_search
+from app.services.document_index import document_index
 from datetime import date, timedelta
 from desktop_app.constants import DATE_FORMAT_FILE, DATE_FORMAT_DISPLAY
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def _gather_known_files(db, database_path):
-    known_files = set()
-    certs = db.query(Certificato).options(selectinload(Certificato.dipendente), selectinload(Certificato.corso)).all()
+ORPHAN_SKIPPED_DIRS = ("ORFANI", "ERRORI ANALISI", "CESTINO")
 
+def _expected_documents(db):
+    """cert_data of every certificate whose file the database expects."""
+    certs = db.query(Certificato).options(selectinload(Certificato.dipendente), selectinload(Certificato.corso)).all()
+    expected = []
     for cert in certs:
+        if not cert.corso or not cert.corso.categoria_corso:
+            continue
         # S1192: Use constant
-        cert_data = {
+        expected.append({
             'nome': f"{cert.dipendente.cognome} {cert.dipendente.nome}" if cert.dipendente else cert.nome_dipendente_raw,
             'matricola': cert.dipendente.matricola if cert.dipendente else None,
-            'categoria': cert.corso.categoria_corso if cert.corso else None,
+            'categoria': cert.corso.categoria_corso,
             'data_scadenza': cert.data_scadenza_calcolata.strftime(DATE_FORMAT_DISPLAY) if cert.data_scadenza_calcolata else None
-        }
-
-        if cert_data['categoria']:
-            found_path = find_document(database_path, cert_data)
-            if found_path:
-                known_files.add(os.path.normpath(found_path))
-    return known_files
-
-def _process_potential_orphan(file, root, known_files, docs_path, orphan_dest_base):
-    if not file.lower().endswith('.pdf'):
-        return False
+        })
+    return expected
 
-    full_path = os.path.normpath(os.path.join(root, file))
+def _find_orphans(snapshot, database_path, expected):
+    """
+    The indexed PDFs of DOCUMENTI DIPENDENTI minus the ones matched by a
+    certificate, in scan order. Certificates are resolved in memory with the
+    same strategies as find_document(), so renamed copies still count as known.
+    """
+    docs_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI")
+    known = set()
+    for cert_data in expected:
+        found = document_search(database_path, cert_data)(snapshot)
+        if found:
+            known.add(os.path.normcase(os.path.normpath(found)))
+
+    orphans = []
+    for key, entry in snapshot.entries.items():
+        if not entry.in_docs or key in known:
+            continue
+        rel_dir = os.path.relpath(os.path.dirname(entry.path), docs_path)
+        if any(skipped in rel_dir for skipped in ORPHAN_SKIPPED_DIRS):
+            continue
+        orphans.append(entry)
+    return [entry.path for entry in sorted(orphans, key=lambda e: e.order)]
 
-    if full_path not in known_files:
-        rel_path = os.path.relpath(full_path, docs_path)
-        dest_path = os.path.join(orphan_dest_base, rel_path)
+def _archive_orphan(full_path, docs_path, orphan_dest_base):
+    rel_path = os.path.relpath(full_path, docs_path)
+    dest_path = os.path.join(orphan_dest_base, rel_path)
 
-        try:
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            shutil.move(full_path, dest_path)
-            logging.warning(f"Orphan file detected and moved: {full_path} -> {dest_path}")
-            return True
-        except Exception as e:
-            logging.error(f"Failed to move orphan file {full_path}: {e}")
-            return False
-    return False
+    try:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.move(full_path, dest_path)
+        document_index.record_move(full_path, dest_path)
+        logging.warning(f"Orphan file detected and moved: {full_path} -> {dest_path}")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to move orphan file {full_path}: {e}")
+        return False
 
-def scan_and_archive_orphans(db: Session, database_path: str):
+def scan_and_archive_orphans(db: Session, database_path: str, reconcile: bool = True):
     """
     Bug 8 Fix: Identify files in 'DOCUMENTI DIPENDENTI' that are NOT in the database.
     Move them to 'DOCUMENTI DIPENDENTI/ORFANI' instead of deleting them.
     This helps in identifying data drift.
+    The orphans are the set difference between the document index (one scan of
+    the tree, re-listing only changed folders when `reconcile`) and the files the
+    certificates resolve to.
     """
-    # S3776: Refactored to reduce complexity
     logging.info("Starting orphan file scan...")
     docs_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI")
     if not os.path.exists(docs_path):
         return 0
 
-    known_files = _gather_known_files(db, database_path)
+    expected = _expected_documents(db)
+    orphans = document_index.query(database_path, lambda snapshot: _find_orphans(snapshot, database_path, expected), reconcile=reconcile)
 
-    orphans_moved = 0
     orphan_dest_base = os.path.join(docs_path, "ORFANI")
-
-    for root, dirs, files in os.walk(docs_path):
-        if "ORFANI" in root or "ERRORI ANALISI" in root or "CESTINO" in root:
-            continue
-
-        for file in files:
-            if _process_potential_orphan(file, root, known_files, docs_path, orphan_dest_base):
-                orphans_moved += 1
+    orphans_moved = sum(1 for path in orphans if _archive_orphan(path, docs_path, orphan_dest_base))
 
     if orphans_moved > 0:
         log_security_action(db, None, "ORPHAN_CLEANUP", f"Moved {orphans_moved} orphaned files to 'ORFANI' folder.", category="SYSTEM")
@@ -87,10 +99,14 @@ def organize_expired_files(db: Session):
     """
     Checks for expired certificates and moves their files to the 'STORICO' folder.
     This should be run on application startup if the database is writable.
+    The document index is reconciled once; archiving, the orphan scan and the
+    empty folder cleanup then all work from it. The archive moves run as one
+    journaled batch, which the next run completes if this one is interrupted.
     """
     logging.info("Starting file maintenance: organizing expired files...")
 
-    database_path = settings.DATABASE_PATH or str(get_user_data_dir())
+    # The same root as sync_service, so the journal, the scan and the index snapshot agree
+    database_path = settings.DOCUMENTS_FOLDER or str(get_user_data_dir())
     if not database_path or not os.path.exists(database_path):
         logging.warning(f"Database path not found or invalid: {database_path}. Skipping maintenance.")
         return
@@ -105,25 +121,28 @@ def organize_expired_files(db: Session):
         logging.info("Maintenance task already ran today. Skipping.")
         return
 
-    certificates = db.query(Certificato).filter(
+    moved_count = resume_archive_moves(database_path)
+
+    # The single pass over the tree (or the first scan) for the whole run
+    document_index.query(database_path, lambda snapshot: None, reconcile=True)
+
+    certificates = db.query(Certificato).options(selectinload(Certificato.dipendente), selectinload(Certificato.corso)).filter(
         Certificato.data_scadenza_calcolata.isnot(None),
         Certificato.data_scadenza_calcolata < today
     ).all()
 
-    moved_count = 0
-
-    for cert in certificates:
-        status = certificate_logic.get_certificate_status(db, cert)
+    status_map = certificate_logic.get_bulk_certificate_statuses(db, certificates)
+    moves = plan_archive_moves(certificates, database_path, status_map)
+    moved_count += execute_archive_moves(moves, database_path)
 
-        if status in ["scaduto", "archiviato"]:
-            if archive_certificate_file(db, cert):
-                moved_count += 1
+    orphans = scan_and_archive_orphans(db, database_path, reconcile=False)
 
     docs_path = os.path.join(database_path, "DOCUMENTI DIPENDENTI")
     if os.path.exists(docs_path):
-        clean_all_empty_folders(docs_path)
+        # After the orphan moves, so the folders they emptied go too
+        empty_folders = document_index.query(database_path, lambda snapshot: snapshot.empty_dirs(docs_path))
+        clean_all_empty_folders(docs_path, folders=empty_folders)
 
-    orphans = scan_and_archive_orphans(db, database_path)
     cleanup_audit_logs(db, retention_days=365)
 
     log_security_action(db, None, "SYSTEM_MAINTENANCE", f"File maintenance completed. Moved {moved_count} expired files. Archived {orphans} orphans.", category="SYSTEM")
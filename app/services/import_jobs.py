@@ -0,0 +1,322 @@
+"""
+Batch AI extraction jobs.
+Uploaded PDFs are staged next to the database and tracked in the import_jobs and
+import_job_items tables, so a job interrupted by a shutdown or crash resumes on
+the next start. A small worker pool runs the extractions; their AI calls are paced
+by the shared adaptive rate limiter of ai_extraction.
+"""
+import json
+import logging
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.db_security import db_security
+from app.db.models import Corso, ImportJob, ImportJobItem, User, utc_now
+from app.db.session import SessionLocal
+from app.services import ai_extraction, certificate_logic, extraction_cache
+from app.utils.audit import log_security_action
+from app.utils.date_parser import parse_date_flexible
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT_DMY = '%d/%m/%Y'
+STAGING_DIRNAME = "ImportJobs"
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_CANCELLED = "cancelled"
+
+ITEM_QUEUED = "queued"
+ITEM_RUNNING = "running"
+ITEM_DONE = "done"
+ITEM_REJECTED = "rejected"
+ITEM_ERROR = "error"
+ITEM_CANCELLED = "cancelled"
+PENDING_STATUSES = (ITEM_QUEUED, ITEM_RUNNING)
+
+MAX_ATTEMPTS = 3
+# Error of an item whose AI quota stayed exhausted: clients may resubmit it later
+QUOTA_EXHAUSTED_ERROR = "Quota AI esaurita: riprovare più tardi."
+JOB_RETENTION_DAYS = 30
+
+# Serializes staging writes with the cleanup of finished jobs
+_jobs_lock = threading.Lock()
+
+# --- Entity post-processing (shared with /upload-pdf/) ---
+
+def normalize_extracted_dates(extracted_data):
+    """Parses and normalizes dates in extracted data."""
+    for date_field in ["data_scadenza", "data_rilascio", "data_nascita"]:
+        if extracted_data.get(date_field):
+            parsed_date = parse_date_flexible(extracted_data[date_field])
+            if parsed_date:
+                extracted_data[date_field] = parsed_date.strftime(DATE_FORMAT_DMY)
+
+def infer_expiration_date(db, extracted_data):
+    """Calculates missing expiration date based on course category."""
+    if not extracted_data.get("data_scadenza") and extracted_data.get("data_rilascio"):
+        try:
+            issue_date = datetime.strptime(extracted_data["data_rilascio"], DATE_FORMAT_DMY).date()
+            category = extracted_data.get("categoria")
+            course = db.query(Corso).filter(Corso.categoria_corso.ilike(f"%{category}%")).first()
+            if course:
+                expiration_date = certificate_logic.calculate_expiration_date(issue_date, course.validita_mesi)
+                if expiration_date:
+                    extracted_data["data_scadenza"] = expiration_date.strftime(DATE_FORMAT_DMY)
+        except (ValueError, TypeError):
+            pass
+
+# --- Worker pool ---
+
+class JobRunner:
+    """Thread pool processing queued items, created on first use."""
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, item_id: int):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(settings.AI_EXTRACTION_WORKERS)),
+                    thread_name_prefix="import-job"
+                )
+            self._executor.submit(process_item, item_id)
+
+    def shutdown(self):
+        """Stops the pool; items left running are requeued by resume_pending_jobs()."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+runner = JobRunner()
+
+# --- Staging ---
+
+def get_staging_dir(job_id: str) -> Path:
+    return Path(db_security.data_dir) / STAGING_DIRNAME / job_id
+
+def _staged_path(item: ImportJobItem) -> Path:
+    return get_staging_dir(item.job_id) / f"{item.position:05d}.pdf"
+
+def _remove_staged_file(item: ImportJobItem):
+    try:
+        _staged_path(item).unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not remove staged file of import item {item.id}: {e}")
+
+# --- Jobs ---
+
+def create_job(db: Session, user: Optional[User], files: List[Tuple[str, bytes]]) -> Tuple[ImportJob, List[ImportJobItem]]:
+    """Creates a job for `files` [(filename, pdf_bytes)] and queues every file."""
+    job = ImportJob(id=uuid.uuid4().hex, user_id=user.id if user else None, status=JOB_RUNNING)
+    db.add(job)
+    items = _stage_files(db, job, files)
+    # Persist the new job now rather than at the next auto-save
+    db_security.save_to_disk_async()
+    _submit(items)
+    return job, items
+
+def add_files(db: Session, job: ImportJob, files: List[Tuple[str, bytes]]) -> List[ImportJobItem]:
+    """
+    Appends files to a job, reopening it if every earlier file was already done.
+    Raises ValueError if the job was cancelled.
+    Clients append files one request at a time: the saves they trigger are
+    coalesced into one background save.
+    """
+    if job.status == JOB_CANCELLED:
+        raise ValueError("Il job di importazione è stato annullato.")
+    items = _stage_files(db, job, files)
+    db_security.request_save()
+    _submit(items)
+    return items
+
+def _stage_files(db: Session, job: ImportJob, files: List[Tuple[str, bytes]]) -> List[ImportJobItem]:
+    """Writes the files to the job's staging folder and records them as queued items."""
+    with _jobs_lock:
+        staging_dir = get_staging_dir(job.id)
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        position = len(job.items)
+        items = []
+        for filename, pdf_bytes in files:
+            item = ImportJobItem(position=position, filename=filename, status=ITEM_QUEUED)
+            job.items.append(item)
+            (staging_dir / f"{position:05d}.pdf").write_bytes(pdf_bytes)
+            items.append(item)
+            position += 1
+        job.status = JOB_RUNNING
+        job.finished_at = None
+        db.commit()
+    return items
+
+def _submit(items: List[ImportJobItem]):
+    for item in items:
+        runner.submit(item.id)
+
+def cancel_job(db: Session, job: ImportJob):
+    """Cancels the queued items; the ones already running finish normally."""
+    with _jobs_lock:
+        for item in job.items:
+            if item.status == ITEM_QUEUED:
+                item.status = ITEM_CANCELLED
+                _remove_staged_file(item)
+        job.status = JOB_CANCELLED
+        job.finished_at = utc_now()
+        db.commit()
+        _cleanup_if_idle(db, job)
+
+def resume_pending_jobs() -> int:
+    """
+    Requeues the items left queued or running by the previous run and deletes
+    jobs finished more than JOB_RETENTION_DAYS ago. Returns the requeued count.
+    """
+    db = SessionLocal()
+    try:
+        cutoff = utc_now() - timedelta(days=JOB_RETENTION_DAYS)
+        for job in db.query(ImportJob).filter(ImportJob.status != JOB_RUNNING, ImportJob.finished_at < cutoff):
+            shutil.rmtree(get_staging_dir(job.id), ignore_errors=True)
+            db.delete(job)
+
+        pending = db.query(ImportJobItem).join(ImportJob).filter(ImportJobItem.status.in_(PENDING_STATUSES)).all()
+        requeued = []
+        for item in pending:
+            if item.job.status == JOB_RUNNING:
+                item.status = ITEM_QUEUED
+                requeued.append(item.id)
+            else:
+                item.status = ITEM_CANCELLED
+                _remove_staged_file(item)
+        db.commit()
+    finally:
+        db.close()
+
+    for item_id in requeued:
+        runner.submit(item_id)
+    if requeued:
+        logger.info(f"Resumed {len(requeued)} pending import items.")
+    return len(requeued)
+
+def process_item(item_id: int):
+    """Runs the AI extraction of one item. Executed by the worker pool."""
+    db = SessionLocal()
+    try:
+        item = db.get(ImportJobItem, item_id)
+        if item is None or item.status != ITEM_QUEUED:
+            return
+        if item.job.status == JOB_CANCELLED:
+            _finish_item(db, item, ITEM_CANCELLED)
+            return
+
+        item.status = ITEM_RUNNING
+        item.attempts = (item.attempts or 0) + 1
+        db.commit()
+
+        try:
+            pdf_bytes = _staged_path(item).read_bytes()
+        except OSError:
+            _finish_item(db, item, ITEM_ERROR, error="File non più disponibile.")
+            return
+
+        cache_key = extraction_cache.content_hash(pdf_bytes)
+        extracted_data = extraction_cache.lookup(db, cache_key)
+        if extracted_data is None:
+            extracted_data = ai_extraction.extract_entities_with_ai(pdf_bytes)
+            extraction_cache.store(db, cache_key, extracted_data)
+
+        if "error" not in extracted_data:
+            normalize_extracted_dates(extracted_data)
+            infer_expiration_date(db, extracted_data)
+            _finish_item(db, item, ITEM_DONE, result=json.dumps(extracted_data))
+        elif extracted_data.get("is_rejected"):
+            user = db.get(User, item.job.user_id) if item.job.user_id else None
+            log_security_action(db, user, "AI_REJECT", f"File rejected by AI: {item.filename}. Reason: {extracted_data['error']}", category="AI_ANALYSIS", severity="MEDIUM")
+            _finish_item(db, item, ITEM_REJECTED, error=extracted_data["error"])
+        elif extracted_data.get("status_code") == 429:
+            if item.attempts < MAX_ATTEMPTS:
+                # Quota still exhausted after the retries: requeue, the rate limiter
+                # has already slowed every Gemini call down
+                item.status = ITEM_QUEUED
+                db.commit()
+                runner.submit(item.id)
+            else:
+                _finish_item(db, item, ITEM_ERROR, error=QUOTA_EXHAUSTED_ERROR)
+        else:
+            _finish_item(db, item, ITEM_ERROR, error=extracted_data["error"])
+    except Exception as e:
+        logger.error(f"Import item {item_id} failed: {e}")
+        db.rollback()
+        item = db.get(ImportJobItem, item_id)
+        if item is not None and item.status in PENDING_STATUSES:
+            _finish_item(db, item, ITEM_ERROR, error=str(e))
+    finally:
+        db.close()
+
+def _finish_item(db: Session, item: ImportJobItem, status: str, result: str = None, error: str = None):
+    item.status = status
+    item.result = result
+    item.error = error
+    db.commit()
+    _remove_staged_file(item)
+
+    with _jobs_lock:
+        job = item.job
+        if job.status == JOB_RUNNING and not _has_pending_items(db, job):
+            job.status = JOB_COMPLETED
+            job.finished_at = utc_now()
+            db.commit()
+        _cleanup_if_idle(db, job)
+
+def _has_pending_items(db: Session, job: ImportJob) -> bool:
+    return db.query(ImportJobItem.id).filter(
+        ImportJobItem.job_id == job.id, ImportJobItem.status.in_(PENDING_STATUSES)
+    ).first() is not None
+
+def _cleanup_if_idle(db: Session, job: ImportJob):
+    # Caller holds _jobs_lock, so no file is being staged for this job
+    if not _has_pending_items(db, job):
+        shutil.rmtree(get_staging_dir(job.id), ignore_errors=True)
+
+# --- Serialization ---
+
+def job_summary(job: ImportJob) -> dict:
+    counts = {}
+    for item in job.items:
+        counts[item.status] = counts.get(item.status, 0) + 1
+    total = len(job.items)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "total": total,
+        "processed": total - sum(counts.get(s, 0) for s in PENDING_STATUSES),
+        "counts": counts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+def item_summary(item: ImportJobItem) -> dict:
+    return {
+        "id": item.id,
+        "position": item.position,
+        "filename": item.filename,
+        "status": item.status,
+        "attempts": item.attempts or 0,
+        "entities": json.loads(item.result) if item.result else None,
+        "error": item.error,
+        "retryable": item.status == ITEM_ERROR and item.error == QUOTA_EXHAUSTED_ERROR,
+    }
+
+def read_job_summary(job_id: str) -> Optional[dict]:
+    """Job summary read in a fresh session (used by the progress stream)."""
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        return job_summary(job) if job else None
+    finally:
+        db.close()
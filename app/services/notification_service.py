@@ -279,7 +279,7 @@ def send_security_alert_email(subject, body_html):
     except Exception as e:
         logging.error(f"Failed to send security alert: {e}")
 
-def _process_cert_for_report(cert, db, today, limits, results):
+def _process_cert_for_report(cert, status_map, today, limits, results):
     """Helper to process a single certificate for reporting."""
     if not cert.data_scadenza_calcolata or not cert.corso:
         return
@@ -301,8 +301,7 @@ def _process_cert_for_report(cert, db, today, limits, results):
 
     # Check for overdue and un-renewed certificates
     if cert.data_scadenza_calcolata < today:
-        status = certificate_logic.get_certificate_status(db, cert)
-        if status == "scaduto":
+        if status_map.get(cert.id) == "scaduto":
             overdue_certificates.append(cert)
 
 def get_report_data(db: Session):
@@ -319,9 +318,10 @@ def get_report_data(db: Session):
     results = (expiring_visite, expiring_corsi, overdue_certificates)
 
     all_certs = db.query(Certificato).all()
+    status_map = certificate_logic.get_stored_statuses(db, all_certs)
 
     for cert in all_certs:
-        _process_cert_for_report(cert, db, today, limits, results)
+        _process_cert_for_report(cert, status_map, today, limits, results)
 
     return expiring_visite, expiring_corsi, overdue_certificates
 
@@ -0,0 +1,93 @@
+"""
+Shrinks PDFs before they are sent to Gemini.
+A certificate with a text layer is sent as the text of its first pages; a scanned
+one as grayscale JPEG renderings of its first non-blank pages, which also leaves
+out embedded fonts, attachments and oversized scans. The original file is sent
+when PyMuPDF is not installed, AI_PDF_PREPROCESSING is off, the file cannot be
+read, or the reduced payload would not be smaller.
+"""
+import logging
+import threading
+from app.core.config import settings
+
+try:
+    # Optional: without PyMuPDF the whole PDF is sent, as before
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGES = 3  # Name, course and dates are on the first pages of a certificate
+MIN_PAGE_TEXT = 100  # Characters a page needs for its text layer to be trusted
+RENDER_DPI = 150
+JPEG_QUALITY = 75
+
+MODE_ORIGINAL = "original"
+MODE_TEXT = "text"
+MODE_RENDERED = "rendered"
+
+_stats = {"documents": 0, MODE_ORIGINAL: 0, MODE_TEXT: 0, MODE_RENDERED: 0, "bytes_in": 0, "bytes_out": 0}
+_stats_lock = threading.Lock()
+
+def prepare_parts(pdf_bytes: bytes) -> list:
+    """Returns the content parts to send to Gemini in place of the PDF."""
+    parts, mode = None, MODE_ORIGINAL
+    if pymupdf is not None and settings.AI_PDF_PREPROCESSING:
+        try:
+            parts, mode = _reduce(pdf_bytes)
+        except Exception as e:
+            logger.warning(f"PDF pre-processing failed, sending the original file: {e}")
+
+    size = _payload_size(parts) if parts else len(pdf_bytes)
+    if not parts or size >= len(pdf_bytes):
+        parts, mode, size = [{"mime_type": "application/pdf", "data": pdf_bytes}], MODE_ORIGINAL, len(pdf_bytes)
+    else:
+        logger.info(f"PDF pre-processed ({mode}): {len(pdf_bytes)} -> {size} bytes.")
+
+    with _stats_lock:
+        _stats["documents"] += 1
+        _stats[mode] += 1
+        _stats["bytes_in"] += len(pdf_bytes)
+        _stats["bytes_out"] += size
+    return parts
+
+def _reduce(pdf_bytes: bytes):
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if doc.needs_pass:
+            return None, MODE_ORIGINAL
+
+        pages = _relevant_pages(doc)
+        if not pages:
+            return None, MODE_ORIGINAL
+
+        if all(len(text) >= MIN_PAGE_TEXT for _, text in pages):
+            text = "\n\n".join(f"--- Pagina {page.number + 1} ---\n{text}" for page, text in pages)
+            return [text], MODE_TEXT
+
+        images = []
+        for page, _ in pages:
+            pixmap = page.get_pixmap(dpi=RENDER_DPI, colorspace=pymupdf.csGRAY)
+            images.append({"mime_type": "image/jpeg", "data": pixmap.tobytes("jpeg", jpg_quality=JPEG_QUALITY)})
+        return images, MODE_RENDERED
+
+def _relevant_pages(doc) -> list:
+    """First MAX_PAGES pages with text or images, with their text; blank pages are skipped."""
+    pages = []
+    for page in doc:
+        text = page.get_text("text").strip()
+        if text or page.get_images():
+            pages.append((page, text))
+            if len(pages) == MAX_PAGES:
+                break
+    return pages
+
+def _payload_size(parts: list) -> int:
+    return sum(len(part.encode("utf-8")) if isinstance(part, str) else len(part["data"]) for part in parts)
+
+def stats() -> dict:
+    with _stats_lock:
+        result = dict(_stats)
+    result["bytes_saved"] = result["bytes_in"] - result["bytes_out"]
+    result["available"] = pymupdf is not None
+    return result
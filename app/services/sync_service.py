@@ -1,16 +1,20 @@
 import os
+import json
 import shutil
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session, selectinload
 from app.db.models import Certificato, Dipendente
 from app.services import certificate_logic, matcher
-from app.services.document_locator import find_document, construct_certificate_path
+from app.services.document_locator import find_document, document_search, construct_certificate_path
+from app.services.document_index import document_index
 from app.core.config import settings, get_user_data_dir
 from app.utils.date_parser import parse_date_flexible
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 DATE_FORMAT_DMY = '%d/%m/%Y'
+ARCHIVE_JOURNAL_NAME = ".archive_journal.jsonl"
 
 def remove_empty_folders(path, root_path=None):
     """
@@ -32,9 +36,11 @@ def remove_empty_folders(path, root_path=None):
     except OSError:
         return
 
-def clean_all_empty_folders(root_path):
+def clean_all_empty_folders(root_path, folders=None):
     """
     Recursively scans the directory tree and removes empty directories.
+    `folders` (deepest first) restricts the pass to those candidates, e.g. the
+    ones the document index knows hold no PDF, so the tree is not walked again.
     """
     if not os.path.isdir(root_path):
         return
@@ -42,14 +48,16 @@ def clean_all_empty_folders(root_path):
     logging.info(f"Cleaning empty folders in {root_path}...")
     removed_count = 0
 
-    for dirpath, dirnames, filenames in os.walk(root_path, topdown=False):
-        try:
-            if not os.listdir(dirpath):
-                if os.path.normpath(dirpath) == os.path.normpath(root_path):
-                    continue
+    if folders is None:
+        folders = [dirpath for dirpath, dirnames, filenames in os.walk(root_path, topdown=False)]
 
-                os.rmdir(dirpath)
-                removed_count += 1
+    for dirpath in folders:
+        if os.path.normpath(dirpath) == os.path.normpath(root_path):
+            continue
+        try:
+            # Fails on a folder that is not empty
+            os.rmdir(dirpath)
+            removed_count += 1
         except OSError:
             pass
 
@@ -73,7 +81,7 @@ def get_unique_filename(directory, filename):
 
     return new_filename
 
-def _move_file_safely(current_path, expected_path, database_path):
+def _move_file_safely(current_path, expected_path, database_path, cleanup=True):
     """Helper to move file with overwrite protection and folder cleanup."""
     if os.path.normpath(current_path) == os.path.normpath(expected_path):
         return False
@@ -97,7 +105,9 @@ def _move_file_safely(current_path, expected_path, database_path):
              return False
 
         shutil.move(current_path, final_path)
-        remove_empty_folders(os.path.dirname(current_path), root_path=database_path)
+        document_index.record_move(current_path, final_path)
+        if cleanup:
+            remove_empty_folders(os.path.dirname(current_path), root_path=database_path)
         logging.info(f"Moved file to: {final_path}")
         return True
     except PermissionError as e:
@@ -192,32 +202,195 @@ def _link_and_move_orphan(db, cert, dipendente, database_path):
         except Exception as e:
             logging.error(f"Error moving linked orphan file: {e}")
 
-def _process_sync_cert(cert, database_path, status_map):
-    """Helper to process a single certificate sync to reduce complexity."""
-    if not cert.corso: return False, False
-
-    cert_data = {
+def _sync_cert_data(cert):
+    return {
         'nome': f"{cert.dipendente.cognome} {cert.dipendente.nome}" if cert.dipendente else cert.nome_dipendente_raw,
         'matricola': cert.dipendente.matricola if cert.dipendente else None,
         'categoria': cert.corso.categoria_corso,
         'data_scadenza': cert.data_scadenza_calcolata.strftime(DATE_FORMAT_DMY) if cert.data_scadenza_calcolata else None
     }
 
-    status = status_map.get(cert.id, "attivo")
-    target_status = "ATTIVO" if status in ["attivo", "in_scadenza"] else "STORICO"
+def _unique_planned_target(target, planned_targets):
+    """Like get_unique_filename, also avoiding the targets already taken by the plan."""
+    directory, filename = os.path.split(target)
+    name, ext = os.path.splitext(filename)
+    candidate, counter = target, 0
+    while os.path.normcase(candidate) in planned_targets or os.path.exists(candidate):
+        counter += 1
+        candidate = os.path.join(directory, f"{name}_{counter}{ext}")
+    return candidate
 
-    expected_path = construct_certificate_path(database_path, cert_data, status=target_status)
-    current_path = find_document(database_path, cert_data)
+def _resolve_documents(database_path, cert_data, reconcile=False):
+    """Current file of every certificate in `cert_data` (id -> data), resolved in one index pass."""
+    def resolve(snapshot):
+        return {cert_id: document_search(database_path, data)(snapshot) for cert_id, data in cert_data.items()}
 
-    if current_path and os.path.exists(current_path):
-        return _move_file_safely(current_path, expected_path, database_path), False
+    return document_index.query(database_path, resolve, reconcile=reconcile)
+
+def plan_file_sync(certs, database_path, status_map):
+    """
+    Matches every certificate to its file and returns (moves, missing): the moves as
+    dicts with certificato_id, source and target, and the ids of the certificates
+    without a file. All the files are resolved in one pass over the document index,
+    after re-listing the folders changed since the last one. A file matched by an
+    earlier certificate is not given to a second one, and two moves never share a
+    target.
+    """
+    to_sync = [cert for cert in certs if cert.corso]
+    cert_data = {cert.id: _sync_cert_data(cert) for cert in to_sync}
+    current_paths = _resolve_documents(database_path, cert_data, reconcile=True)
+
+    moves, missing = [], []
+    claimed, planned_targets = set(), set()
+
+    for cert in to_sync:
+        status = status_map.get(cert.id, "attivo")
+        target_status = "ATTIVO" if status in ["attivo", "in_scadenza"] else "STORICO"
+
+        current_path = current_paths.get(cert.id)
+        if not current_path or os.path.normcase(current_path) in claimed or not os.path.exists(current_path):
+            missing.append(cert.id)
+            continue
+        claimed.add(os.path.normcase(current_path))
+
+        expected_path = construct_certificate_path(database_path, cert_data[cert.id], status=target_status)
+        if os.path.normpath(current_path) == os.path.normpath(expected_path):
+            continue
+
+        target = _unique_planned_target(expected_path, planned_targets)
+        planned_targets.add(os.path.normcase(target))
+        moves.append({"certificato_id": cert.id, "source": current_path, "target": target})
+
+    return moves, missing
+
+def _employee_folder(path, database_path):
+    """Employee folder (first folder below DOCUMENTI DIPENDENTI) of a target path."""
+    relative = os.path.relpath(path, os.path.join(database_path, "DOCUMENTI DIPENDENTI"))
+    return relative.split(os.sep)[0]
+
+def execute_file_sync(moves, database_path, workers=1):
+    """
+    Runs the planned moves and returns how many succeeded. Moves into the same
+    employee folder run in order on one worker; different folders run in parallel
+    when `workers` > 1. Emptied folders are removed once every move is done.
+    """
+    groups = {}
+    for move in moves:
+        groups.setdefault(_employee_folder(move["target"], database_path), []).append(move)
+
+    def run_group(group):
+        return sum(1 for move in group if _move_file_safely(move["source"], move["target"], database_path, cleanup=False))
+
+    if workers > 1 and len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-sync") as executor:
+            moved = sum(executor.map(run_group, groups.values()))
+    else:
+        moved = sum(run_group(group) for group in groups.values())
+
+    for source_dir in {os.path.dirname(move["source"]) for move in moves}:
+        remove_empty_folders(source_dir, root_path=database_path)
+    return moved
+
+def plan_archive_moves(certs, database_path, status_map):
+    """
+    The moves to STORICO of the expired or superseded certificates in `certs`, as
+    dicts like plan_file_sync() returns. Their current files are resolved together
+    in one pass over the document index.
+    """
+    to_archive = [cert for cert in certs if cert.corso and status_map.get(cert.id) in ["scaduto", "archiviato"]]
+    cert_data = {cert.id: _sync_cert_data(cert) for cert in to_archive}
+    current_paths = _resolve_documents(database_path, cert_data)
+
+    moves = []
+    claimed, planned_targets = set(), set()
+    for cert in to_archive:
+        current_path = current_paths.get(cert.id)
+        if not current_path or os.path.normcase(current_path) in claimed or not os.path.isfile(current_path):
+            continue
+        claimed.add(os.path.normcase(current_path))
+
+        expected_path = construct_certificate_path(database_path, cert_data[cert.id], status="STORICO")
+        if os.path.normpath(current_path) == os.path.normpath(expected_path):
+            continue
 
-    return False, True # Missing
+        target = _unique_planned_target(expected_path, planned_targets)
+        planned_targets.add(os.path.normcase(target))
+        moves.append({"certificato_id": cert.id, "source": current_path, "target": target})
+    return moves
 
-def synchronize_all_files(db: Session):
+def _archive_journal_path(database_path):
+    return os.path.join(database_path, ARCHIVE_JOURNAL_NAME)
+
+def execute_archive_moves(moves, database_path):
+    """
+    Runs the planned archive moves as one batch and returns how many succeeded.
+    The plan is written first to a journal next to the documents, followed by a
+    line per finished move; the journal is deleted when the batch completes, and
+    resume_archive_moves() finishes a batch interrupted before that.
+    """
+    if not moves:
+        return 0
+    journal = _archive_journal_path(database_path)
+    with open(journal, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"moves": moves}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return _run_archive_journal(journal, moves, set(), database_path)
+
+def _run_archive_journal(journal, moves, done, database_path):
+    moved = 0
+    with open(journal, "a", encoding="utf-8") as f:
+        for index, move in enumerate(moves):
+            if index in done:
+                continue
+            if _move_file_safely(move["source"], move["target"], database_path, cleanup=False):
+                moved += 1
+            f.write(json.dumps({"done": index}) + "\n")
+            f.flush()
+
+    for source_dir in {os.path.dirname(move["source"]) for move in moves}:
+        remove_empty_folders(source_dir, root_path=database_path)
+    os.remove(journal)
+    return moved
+
+def resume_archive_moves(database_path):
+    """
+    Finishes the archive batch left by an interrupted run, if any. Returns how
+    many of its remaining moves succeeded.
+    """
+    journal = _archive_journal_path(database_path)
+    if not os.path.isfile(journal):
+        return 0
+
+    try:
+        with open(journal, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        moves = json.loads(lines[0])["moves"]
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        logging.error(f"Discarding unreadable archive journal {journal}: {e}")
+        os.remove(journal)
+        return 0
+
+    done = set()
+    for line in lines[1:]:
+        try:
+            done.add(json.loads(line)["done"])
+        except (ValueError, KeyError):
+            break  # Last line cut short by the interruption
+    for index, move in enumerate(moves):
+        # Moved, but interrupted before the journal line was written
+        if index not in done and not os.path.exists(move["source"]) and os.path.exists(move["target"]):
+            done.add(index)
+
+    logging.info(f"Resuming interrupted archive batch: {len(moves) - len(done)} of {len(moves)} moves left.")
+    return _run_archive_journal(journal, moves, done, database_path)
+
+def synchronize_all_files(db: Session, dry_run: bool = False, workers: int = 1):
     """
     Scans all certificates and ensures their PDF files are located in the correct
     path according to current naming conventions and status.
+    The full move plan is computed first; with `dry_run` it is returned without
+    touching any file.
     """
     # S3776: Refactored
     logging.info("Starting Mass File Synchronization...")
@@ -229,13 +402,13 @@ def synchronize_all_files(db: Session):
     certs = db.query(Certificato).options(selectinload(Certificato.dipendente), selectinload(Certificato.corso)).all()
     status_map = certificate_logic.get_bulk_certificate_statuses(db, certs)
 
-    moved = 0
-    missing = 0
-
-    for cert in certs:
-        was_moved, was_missing = _process_sync_cert(cert, database_path, status_map)
-        if was_moved: moved += 1
-        if was_missing: missing += 1
+    moves, missing = plan_file_sync(certs, database_path, status_map)
+    report = {"planned": len(moves), "missing": len(missing), "dry_run": dry_run}
+    if dry_run:
+        report["moves"] = moves
+        logging.info(f"Sync plan: {len(moves)} moves, Missing: {len(missing)}")
+        return report
 
-    logging.info(f"Sync complete. Moved: {moved}, Missing: {missing}")
-    return {"moved": moved, "missing": missing}
+    report["moved"] = execute_file_sync(moves, database_path, workers)
+    logging.info(f"Sync complete. Planned: {len(moves)}, Moved: {report['moved']}, Missing: {len(missing)}")
+    return report
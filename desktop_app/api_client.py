@@ -1,12 +1,113 @@
 import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
 from desktop_app.utils import get_device_id
 
+logger = logging.getLogger(__name__)
+
 class APIClient:
-    def __init__(self):
+    """
+    Client for the backend REST API.
+    All calls share one pooled keep-alive session, so repeated requests reuse
+    the same TCP connections instead of opening a new one each time.
+    """
+
+    POOL_SIZE = 10
+    # Idempotent requests are retried on connection errors and gateway failures.
+    # POST is never retried automatically.
+    RETRIES = Retry(
+        total=3, connect=3, read=1, status=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+        raise_on_status=False
+    )
+
+    ETAG_CACHE_SIZE = 64  # Cached GET bodies, reused when the server answers 304
+
+    def __init__(self, compression=None):
         self.base_url = os.environ.get("API_URL", "http://localhost:8000/api/v1")
         self.access_token = None
         self.user_info = None
+        self._device_id = None
+        self._etag_cache = OrderedDict()  # request key -> (etag, body, headers)
+        self._etag_lock = threading.Lock()
+
+        # Per-endpoint timeout overrides: {"/path/prefix": seconds}, longest prefix wins.
+        # API_TIMEOUTS="/certificati/=60,/chat/=90" extends them from the environment.
+        self.timeouts = self._parse_timeouts(os.environ.get("API_TIMEOUTS", ""))
+
+        if compression is None:
+            compression = os.environ.get("API_COMPRESSION", "1") != "0"
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.POOL_SIZE, pool_maxsize=self.POOL_SIZE,
+                              max_retries=self.RETRIES)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if compression else "identity"
+
+    @staticmethod
+    def _parse_timeouts(spec):
+        timeouts = {}
+        for entry in spec.split(","):
+            prefix, _, seconds = entry.partition("=")
+            try:
+                timeouts[prefix.strip()] = float(seconds)
+            except ValueError:
+                continue
+        return timeouts
+
+    def _timeout(self, url, default):
+        """Returns the configured timeout for `url`, or `default`."""
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        best = None
+        for prefix in self.timeouts:
+            if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.timeouts[best] if best is not None else default
+
+    def _conditional_get(self, url, params=None, timeout=10):
+        """
+        GET with If-None-Match: when the server answers 304 the cached body is
+        parsed again (callers never share objects). Returns (data, headers).
+        """
+        key = url + "?" + urlencode(sorted((params or {}).items()), doseq=True)
+        headers = self._get_headers()
+        with self._etag_lock:
+            cached = self._etag_cache.get(key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            with self._etag_lock:
+                if key in self._etag_cache:
+                    self._etag_cache.move_to_end(key)
+            return json.loads(cached[1]), cached[2]
+
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        with self._etag_lock:
+            if etag:
+                self._etag_cache[key] = (etag, response.content, CaseInsensitiveDict(response.headers))
+                self._etag_cache.move_to_end(key)
+                while len(self._etag_cache) > self.ETAG_CACHE_SIZE:
+                    self._etag_cache.popitem(last=False)
+            else:
+                self._etag_cache.pop(key, None)
+        return response.json(), response.headers
+
+    def _clear_etag_cache(self):
+        with self._etag_lock:
+            self._etag_cache.clear()
 
     def set_token(self, token_data):
         """
@@ -14,6 +115,8 @@ class APIClient:
         token_data should be the dict returned by /auth/login.
         """
         self.access_token = token_data.get("access_token")
+        self.session.headers["Authorization"] = f"Bearer {self.access_token}"
+        self._clear_etag_cache()
         self.user_info = {
             "id": token_data.get("user_id"),
             "username": token_data.get("username"),
@@ -29,6 +132,8 @@ class APIClient:
     def clear_token(self):
         self.access_token = None
         self.user_info = None
+        self.session.headers.pop("Authorization", None)
+        self._clear_etag_cache()
 
     def logout(self):
         """
@@ -37,11 +142,10 @@ class APIClient:
         if self.access_token:
             try:
                 url = f"{self.base_url}/auth/logout"
-                requests.post(url, headers=self._get_headers(), timeout=5)
+                self.session.post(url, headers=self._get_headers(), timeout=self._timeout(url, 5))
             except requests.exceptions.RequestException as e:
                 # Log network errors but don't block logout - user must be able to exit
-                import logging
-                logging.getLogger(__name__).warning(f"Logout request failed (non-blocking): {e}")
+                logger.warning(f"Logout request failed (non-blocking): {e}")
         self.clear_token()
 
     def _get_headers(self):
@@ -49,12 +153,17 @@ class APIClient:
         if self.access_token:
             headers["Authorization"] = f"Bearer {self.access_token}"
 
-        try:
-            headers["X-Device-ID"] = get_device_id()
-        except Exception as e:
-            # Device ID is optional - log but don't fail
-            import logging
-            logging.getLogger(__name__).debug(f"Could not get device ID (non-critical): {e}")
+        # The device ID comes from the license file: read it once, not per request
+        if self._device_id is None:
+            try:
+                self._device_id = get_device_id()
+                self.session.headers["X-Device-ID"] = self._device_id
+            except Exception as e:
+                # Device ID is optional - log but don't fail
+                logger.debug(f"Could not get device ID (non-critical): {e}")
+                self._device_id = ""
+        if self._device_id:
+            headers["X-Device-ID"] = self._device_id
 
         return headers
 
@@ -71,9 +180,8 @@ class APIClient:
         try:
             # Note: For public endpoints, _get_headers might be empty, which is fine.
             # S112: Increased timeout to 30s for better stability on slow networks
-            response = requests.get(url, params=params, headers=self._get_headers(), timeout=30)
-            response.raise_for_status()
-            return response.json()
+            data, _ = self._conditional_get(url, params=params, timeout=self._timeout(url, 30))
+            return data
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             # S112: Replaced generic Exception/return with specific exception handling
             raise ConnectionError(f"Offline: {e}")
@@ -83,7 +191,7 @@ class APIClient:
         data = {"username": username, "password": password}
         try:
             # Using data=data sends as application/x-www-form-urlencoded which OAuth2PasswordRequestForm expects
-            response = requests.post(url, data=data, timeout=30)
+            response = self.session.post(url, data=data, timeout=self._timeout(url, 30))
             response.raise_for_status()
             return response.json()
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
@@ -93,7 +201,7 @@ class APIClient:
     def change_password(self, old_password, new_password):
         url = f"{self.base_url}/auth/change-password"
         payload = {"old_password": old_password, "new_password": new_password}
-        response = requests.post(url, json=payload, headers=self._get_headers(), timeout=10)
+        response = self.session.post(url, json=payload, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
@@ -108,7 +216,7 @@ class APIClient:
             "message": message,
             "history": history or []
         }
-        response = requests.post(url, json=payload, headers=self._get_headers(), timeout=30)
+        response = self.session.post(url, json=payload, headers=self._get_headers(), timeout=self._timeout(url, 30))
         response.raise_for_status()
         return response.json()
 
@@ -117,49 +225,110 @@ class APIClient:
     def get_dipendenti_list(self):
         """Fetches the list of all employees."""
         url = f"{self.base_url}/dipendenti"
-        response = requests.get(url, headers=self._get_headers(), timeout=10)
-        response.raise_for_status()
-        return response.json()
+        data, _ = self._conditional_get(url, timeout=self._timeout(url, 10))
+        return data
 
     def get_dipendente_detail(self, dipendente_id):
         """Fetches detailed info for a specific employee, including certificates."""
         url = f"{self.base_url}/dipendenti/{dipendente_id}"
-        response = requests.get(url, headers=self._get_headers(), timeout=10)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def create_dipendente(self, data):
         """Creates a new employee manually."""
         url = f"{self.base_url}/dipendenti/"
-        response = requests.post(url, json=data, headers=self._get_headers(), timeout=10)
+        response = self.session.post(url, json=data, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def update_dipendente(self, dipendente_id, data):
         """Updates an existing employee."""
         url = f"{self.base_url}/dipendenti/{dipendente_id}"
-        response = requests.put(url, json=data, headers=self._get_headers(), timeout=10)
+        response = self.session.put(url, json=data, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def delete_dipendente(self, dipendente_id):
         """Deletes an employee."""
         url = f"{self.base_url}/dipendenti/{dipendente_id}"
-        response = requests.delete(url, headers=self._get_headers(), timeout=10)
+        response = self.session.delete(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     # --- Certificates ---
 
+    def get_certificati_page(self, limit=200, cursor=None, **filters):
+        """
+        Fetches one page of certificates filtered and sorted server-side.
+        Filters: validated, assegnato, search, categoria, stato (list), scadenza_da, scadenza_a, sort, order.
+        Returns {"items": [...], "total": int, "next_cursor": str or None}.
+        """
+        url = f"{self.base_url}/certificati/"
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        for key, value in filters.items():
+            if value is None or value == "" or value == []:
+                continue
+            if isinstance(value, bool):
+                value = "true" if value else "false"
+            elif hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            params[key] = value
+
+        items, headers = self._conditional_get(url, params=params, timeout=self._timeout(url, 30))
+        return {
+            "items": items,
+            "total": int(headers.get("X-Total-Count", len(items))),
+            "next_cursor": headers.get("X-Next-Cursor")
+        }
+
     def update_certificato(self, cert_id, data):
         url = f"{self.base_url}/certificati/{cert_id}"
-        response = requests.put(url, json=data, headers=self._get_headers(), timeout=10)
+        response = self.session.put(url, json=data, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def delete_certificato(self, cert_id):
         url = f"{self.base_url}/certificati/{cert_id}"
-        response = requests.delete(url, headers=self._get_headers(), timeout=10)
+        response = self.session.delete(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
+        response.raise_for_status()
+        return response.json()
+
+    # --- Import Jobs ---
+
+    def submit_import_files(self, file_paths, job_id=None):
+        """
+        Queues PDFs for server-side AI extraction, in a new job or in `job_id`.
+        Returns the job summary plus the new items ("items").
+        """
+        url = f"{self.base_url}/import-jobs/{job_id}/files" if job_id else f"{self.base_url}/import-jobs/"
+        handles = [open(path, 'rb') for path in file_paths]
+        try:
+            files = [('files', (os.path.basename(path), f, 'application/pdf')) for path, f in zip(file_paths, handles)]
+            response = self.session.post(url, files=files, headers=self._get_headers(), timeout=self._timeout(url, 120))
+        finally:
+            for f in handles:
+                f.close()
+        response.raise_for_status()
+        return response.json()
+
+    def get_import_job(self, job_id):
+        url = f"{self.base_url}/import-jobs/{job_id}"
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
+        response.raise_for_status()
+        return response.json()
+
+    def get_import_item(self, job_id, item_id):
+        url = f"{self.base_url}/import-jobs/{job_id}/items/{item_id}"
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
+        response.raise_for_status()
+        return response.json()
+
+    def cancel_import_job(self, job_id):
+        url = f"{self.base_url}/import-jobs/{job_id}"
+        response = self.session.delete(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
@@ -168,14 +337,14 @@ class APIClient:
     def trigger_maintenance(self):
         """Triggers the background file maintenance task."""
         url = f"{self.base_url}/system/maintenance/background"
-        response = requests.post(url, headers=self._get_headers(), timeout=10)
+        response = self.session.post(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def get_lock_status(self):
         """Checks if the backend is in Read-Only mode."""
         url = f"{self.base_url}/system/lock-status"
-        response = requests.get(url, headers=self._get_headers(), timeout=5)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 5))
         response.raise_for_status()
         return response.json()
 
@@ -194,7 +363,7 @@ class APIClient:
         # Increased timeout to 300s (5 min) for large files
         with open(file_path, 'rb') as f:
             files = {'file': (os.path.basename(file_path), f, 'text/csv')}
-            response = requests.post(url, files=files, headers=self._get_headers(), timeout=300)
+            response = self.session.post(url, files=files, headers=self._get_headers(), timeout=self._timeout(url, 300))
         response.raise_for_status()
         return response.json()
 
@@ -202,7 +371,7 @@ class APIClient:
 
     def get_users(self):
         url = f"{self.base_url}/users/"
-        response = requests.get(url, headers=self._get_headers(), timeout=10)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
@@ -215,7 +384,7 @@ class APIClient:
             "is_admin": is_admin,
             "gender": gender
         }
-        response = requests.post(url, json=payload, headers=self._get_headers(), timeout=10)
+        response = self.session.post(url, json=payload, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
@@ -224,21 +393,21 @@ class APIClient:
     def get_paths(self):
         """Retrieves the configured database path."""
         url = f"{self.base_url}/app_config/config/paths"
-        response = requests.get(url, headers=self._get_headers(), timeout=5)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 5))
         response.raise_for_status()
         return response.json()
 
     def get_mutable_config(self):
         """Retrieves user-configurable settings from the backend."""
         url = f"{self.base_url}/app_config/config"
-        response = requests.get(url, headers=self._get_headers(), timeout=10)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def update_mutable_config(self, settings_data: dict):
         """Updates user-configurable settings on the backend."""
         url = f"{self.base_url}/app_config/config"
-        response = requests.put(url, json=settings_data, headers=self._get_headers(), timeout=10)
+        response = self.session.put(url, json=settings_data, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         # This endpoint returns 204 No Content, so we don't expect a body
         return True
@@ -247,19 +416,19 @@ class APIClient:
         """Moves the database file via the API."""
         url = f"{self.base_url}/config/move-database"
         payload = {"new_path": new_path}
-        response = requests.post(url, json=payload, headers=self._get_headers(), timeout=120)
+        response = self.session.post(url, json=payload, headers=self._get_headers(), timeout=self._timeout(url, 120))
         response.raise_for_status()
         return response.json()
 
     def update_user(self, user_id, data):
         url = f"{self.base_url}/users/{user_id}"
-        response = requests.put(url, json=data, headers=self._get_headers(), timeout=10)
+        response = self.session.put(url, json=data, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
     def delete_user(self, user_id):
         url = f"{self.base_url}/users/{user_id}"
-        response = requests.delete(url, headers=self._get_headers(), timeout=10)
+        response = self.session.delete(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
@@ -267,7 +436,7 @@ class APIClient:
 
     def get_audit_categories(self):
         url = f"{self.base_url}/audit/categories"
-        response = requests.get(url, headers=self._get_headers(), timeout=10)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 10))
         response.raise_for_status()
         return response.json()
 
@@ -286,9 +455,8 @@ class APIClient:
         if end_date:
             params["end_date"] = end_date.isoformat() if hasattr(end_date, 'isoformat') else end_date
 
-        response = requests.get(url, params=params, headers=self._get_headers(), timeout=10)
-        response.raise_for_status()
-        return response.json()
+        data, _ = self._conditional_get(url, params=params, timeout=self._timeout(url, 10))
+        return data
 
     def create_audit_log(self, action, details=None, category=None, changes=None, severity="LOW"):
         url = f"{self.base_url}/audit/"
@@ -300,7 +468,7 @@ class APIClient:
             "severity": severity
         }
         # Short timeout for audit logs as they are fire-and-forget-ish from UI perspective
-        response = requests.post(url, json=payload, headers=self._get_headers(), timeout=5)
+        response = self.session.post(url, json=payload, headers=self._get_headers(), timeout=self._timeout(url, 5))
         # We don't necessarily crash if audit fails, but logging it is good
         # response.raise_for_status()
         # Allow caller to handle or ignore
@@ -310,13 +478,13 @@ class APIClient:
 
     def get_db_security_status(self):
         url = f"{self.base_url}/config/db-security/status"
-        response = requests.get(url, headers=self._get_headers(), timeout=5)
+        response = self.session.get(url, headers=self._get_headers(), timeout=self._timeout(url, 5))
         response.raise_for_status()
         return response.json()
 
     def toggle_db_security(self, locked: bool):
         url = f"{self.base_url}/config/db-security/toggle"
         payload = {"locked": locked}
-        response = requests.post(url, json=payload, headers=self._get_headers(), timeout=120) # Encryption might take time
+        response = self.session.post(url, json=payload, headers=self._get_headers(), timeout=self._timeout(url, 120)) # Encryption might take time
         response.raise_for_status()
         return response.json()
@@ -5,6 +5,7 @@ import re
 import threading
 import queue
 import time
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk
 from desktop_app.services.license_manager import LicenseManager
@@ -210,6 +211,83 @@ class ProgressTaskRunner:
             except Exception as e:
                 self.queue.put(("error", e))
 
+        return self._run_in_background(thread_target)
+
+    def run_pipeline(self, stages, items):
+        """
+        Runs each item through a sequence of stages, each with its own worker pool,
+        so a slow stage (e.g. AI extraction) can work on several items at once while
+        the others stay serial.
+        stages: List of (target, workers). The first target receives the item, each
+                following one the result of the previous stage.
+        items: List of items to process
+        Returns the same payload as run(); results keep the order of `items`.
+        On cancel no new item is started, but the ones already in flight go through
+        every stage, so no item is left half-processed.
+        """
+        self.total = len(items)
+        if self.total == 0:
+            return []
+
+        self._create_dialog()
+        self.start_time = time.time()
+
+        def thread_target():
+            executors = [
+                ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"pipeline-{n}")
+                for n, (_, workers) in enumerate(stages)
+            ]
+            # Bounds the items in flight, so a cancel only has to drain a few of them
+            slots = threading.Semaphore(max(1, stages[0][1]) * 2)
+            done = threading.Condition()
+            outcomes = {}
+
+            def finish(index, outcome):
+                with done:
+                    outcomes[index] = outcome
+                    completed = len(outcomes)
+                    done.notify_all()
+                slots.release()
+                self.progress_queue.put((completed, self.total, f"Elaborati {completed}/{self.total}..."))
+
+            def advance(index, item, stage, value):
+                def on_done(future):
+                    try:
+                        if stage + 1 < len(stages):
+                            advance(index, item, stage + 1, future.result())
+                        else:
+                            finish(index, {"success": True, "result": future.result(), "item": item})
+                    except Exception as e:
+                        finish(index, {"success": False, "error": str(e), "item": item})
+
+                executors[stage].submit(stages[stage][0], value).add_done_callback(on_done)
+
+            try:
+                submitted = 0
+                for i, item in enumerate(items):
+                    while not self.cancelled and not slots.acquire(timeout=0.2):
+                        pass
+                    if self.cancelled:
+                        break
+                    advance(i, item, 0, item)
+                    submitted += 1
+
+                # Drain the items already in flight
+                with done:
+                    done.wait_for(lambda: len(outcomes) == submitted)
+                for executor in executors:
+                    executor.shutdown(wait=True)
+
+                results = [outcomes[i] for i in range(submitted)]
+                errors = [r["error"] for r in results if not r["success"]]
+                self.progress_queue.put((self.total, self.total, "Completato!"))
+                self.queue.put(("success", {"results": results, "errors": errors}))
+            except Exception as e:
+                self.queue.put(("error", e))
+
+        return self._run_in_background(thread_target)
+
+    def _run_in_background(self, thread_target):
         thread = threading.Thread(target=thread_target, daemon=True)
         thread.start()
 
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+from desktop_app.widgets.column_sorter import ColumnSorter
+from desktop_app.widgets.search_index import SearchIndex, text_key
 
 
 class AuditView(tk.Frame):
@@ -9,6 +12,7 @@ class AuditView(tk.Frame):
         self.controller = controller
         self.configure(bg="#F3F4F6")
         self.data = []
+        self.index = SearchIndex([])
 
         self.setup_ui()
 
@@ -31,14 +35,16 @@ class AuditView(tk.Frame):
 
         # Treeview
         columns = ("timestamp", "utente", "azione", "dettagli", "ip", "severita")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended")
+        self.tree = VirtualTreeview(self, columns=columns, show="headings", selectmode="extended")
 
-        self.tree.heading("timestamp", text="Data/Ora")
-        self.tree.heading("utente", text="Utente")
-        self.tree.heading("azione", text="Azione")
-        self.tree.heading("dettagli", text="Dettagli")
-        self.tree.heading("ip", text="IP Address")
-        self.tree.heading("severita", text="Severita")
+        self.sorter = ColumnSorter(self.tree, {
+            "timestamp": "Data/Ora",
+            "utente": "Utente",
+            "azione": "Azione",
+            "dettagli": "Dettagli",
+            "ip": "IP Address",
+            "severita": "Severita"
+        }, self.filter_data)
 
         self.tree.column("timestamp", width=130, anchor="center")
         self.tree.column("utente", width=100)
@@ -81,30 +87,41 @@ class AuditView(tk.Frame):
 
     def _update_data(self, data):
         self.data = data
+        self.index = SearchIndex(data, facets={"category": lambda log: log.get("category")},
+                                 display=self._row, sort_keys=self.SORT_FIELDS)
         self.filter_data()
 
+    SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+
+    # Treeview column -> typed key on the log dict (ISO timestamps sort as text)
+    SORT_FIELDS = {
+        "timestamp": lambda log: text_key(log.get("timestamp")),
+        "utente": lambda log: text_key(log.get("username") or "SYSTEM"),
+        "azione": lambda log: text_key(log.get("action")),
+        "dettagli": lambda log: text_key(log.get("details")),
+        "ip": lambda log: text_key(log.get("ip_address")),
+        "severita": lambda log: AuditView.SEVERITY_RANK.get(log.get("severity", "LOW"), 0),
+    }
+
+    @staticmethod
+    def _row(log):
+        severity = log.get("severity", "LOW")
+        values = (
+            log.get("timestamp"),
+            log.get("username") or "SYSTEM",
+            log.get("action"),
+            log.get("details"),
+            log.get("ip_address"),
+            severity
+        )
+        tag = severity if severity in ["CRITICAL", "MEDIUM"] else ""
+        return log.get("id"), values, (tag,)
+
     def filter_data(self):
         cat = self.combo_cat.get()
+        matches = self.index.search(order_by=self.sorter.column, descending=self.sorter.reverse,
+                                    category=None if cat == "TUTTI" else cat)
+        rows = [self.index.display[i] for i in matches]
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        count = 0
-        for log in self.data:
-            if cat != "TUTTI" and log.get("category") != cat:
-                continue
-
-            severity = log.get("severity", "LOW")
-            values = (
-                log.get("timestamp"),
-                log.get("username") or "SYSTEM",
-                log.get("action"),
-                log.get("details"),
-                log.get("ip_address"),
-                severity
-            )
-            tag = severity if severity in ["CRITICAL", "MEDIUM"] else ""
-            self.tree.insert("", "end", values=values, tags=(tag,))
-            count += 1
-
-        self.lbl_count.config(text=f"{count} log")
+        self.tree.set_rows(rows)
+        self.lbl_count.config(text=f"{len(rows)} log")
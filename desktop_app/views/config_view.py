@@ -3,7 +3,6 @@ from tkinter import ttk, messagebox
 from desktop_app.utils import TaskRunner
 from app.core.config import settings as local_settings
 from desktop_app.views.audit_view import AuditView
-import requests
 import threading
 
 
@@ -244,7 +243,7 @@ class SettingsTab(tk.Frame):
     def test_email(self):
         try:
             url = f"{self.controller.api_client.base_url}/notifications/test-email"
-            requests.post(url, json={"email": self.entry_email.get()}, headers=self.controller.api_client._get_headers())
+            self.controller.api_client.session.post(url, json={"email": self.entry_email.get()}, headers=self.controller.api_client._get_headers())
             messagebox.showinfo("Inviata", "Email di prova inviata.")
         except Exception as e:
             messagebox.showerror("Errore", str(e))
@@ -4,6 +4,10 @@ import threading
 import os
 from desktop_app.utils import TaskRunner, ProgressTaskRunner, open_file
 from desktop_app.widgets.advanced_filter import setup_filterable_treeview
+from desktop_app.widgets.paged_loader import PagedLoader
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+from desktop_app.widgets.column_sorter import ColumnSorter
+from desktop_app.widgets.search_index import SearchIndex, int_key, text_key, date_key
 from app.services.document_locator import find_document
 from app.core.config import settings
 from desktop_app.views.edit_certificato_dialog import EditCertificatoDialog
@@ -14,6 +18,10 @@ class DatabaseView(tk.Frame):
         super().__init__(parent)
         self.controller = controller
         self.data = []
+        self.index = SearchIndex([])
+        self._search_job = None
+        self.loader = PagedLoader(self, controller.api_client, self._on_page,
+                                  on_error=lambda e: messagebox.showerror("Errore", f"Errore: {e}"))
 
         self.setup_ui()
         self.setup_keyboard_shortcuts()
@@ -28,21 +36,21 @@ class DatabaseView(tk.Frame):
         tk.Label(toolbar, text="Cerca:", bg="#F3F4F6").pack(side="left", padx=5)
         self.entry_search = ttk.Entry(toolbar, width=25)
         self.entry_search.pack(side="left", padx=5)
-        self.entry_search.bind("<KeyRelease>", lambda e: self.filter_data())
+        self.entry_search.bind("<KeyRelease>", lambda e: self._schedule_reload())
 
         # Category Filter (populated dynamically from data) - increased width
         tk.Label(toolbar, text="Categoria:", bg="#F3F4F6").pack(side="left", padx=(15, 5))
         self.combo_categoria = ttk.Combobox(toolbar, values=["Tutte"], state="readonly", width=28)
         self.combo_categoria.set("Tutte")
         self.combo_categoria.pack(side="left", padx=5)
-        self.combo_categoria.bind("<<ComboboxSelected>>", lambda e: self.filter_data())
+        self.combo_categoria.bind("<<ComboboxSelected>>", lambda e: self.reload_data())
 
         # Status Filter - increased width
         tk.Label(toolbar, text="Stato:", bg="#F3F4F6").pack(side="left", padx=(15, 5))
         self.combo_status = ttk.Combobox(toolbar, values=["Tutti", "Attivo", "In Scadenza", "Scaduto"], state="readonly", width=15)
         self.combo_status.set("Tutti")
         self.combo_status.pack(side="left", padx=5)
-        self.combo_status.bind("<<ComboboxSelected>>", lambda e: self.filter_data())
+        self.combo_status.bind("<<ComboboxSelected>>", lambda e: self.reload_data())
 
         tk.Button(toolbar, text="Aggiorna", command=self.refresh_data).pack(side="left", padx=10)
 
@@ -52,7 +60,7 @@ class DatabaseView(tk.Frame):
 
         # Treeview
         columns = ("id", "dipendente", "corso", "categoria", "emissione", "scadenza", "stato")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended")
+        self.tree = VirtualTreeview(self, columns=columns, show="headings", selectmode="extended")
 
         self.tree.heading("id", text="ID")
         self.tree.heading("dipendente", text="Dipendente")
@@ -78,7 +86,8 @@ class DatabaseView(tk.Frame):
 
         # Scrollbar
         scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
+        # Next page is fetched when scrolling near the bottom
+        self.loader.attach_scroll(self.tree, scrollbar)
 
         scrollbar.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
@@ -94,12 +103,6 @@ class DatabaseView(tk.Frame):
         self.tree.bind("<Button-3>", self.show_context_menu)
         self.tree.bind("<Double-1>", self.open_file)
 
-        # Column sorting
-        self.sort_column = None
-        self.sort_reverse = False
-        for col in columns:
-            self.tree.heading(col, command=lambda c=col: self.sort_by_column(c))
-
         # Setup advanced column filters (right-click on headers)
         column_names = {
             "id": "ID",
@@ -111,6 +114,7 @@ class DatabaseView(tk.Frame):
             "stato": "Stato"
         }
         setup_filterable_treeview(self.tree, column_names)
+        self.sorter = ColumnSorter(self.tree, column_names, self._on_sort)
         self.tree.bind("<<FilterChanged>>", lambda e: self.filter_data())
 
     def setup_keyboard_shortcuts(self):
@@ -122,38 +126,27 @@ class DatabaseView(tk.Frame):
         self.tree.bind("<Control-a>", self.select_all)  # Ctrl+A select all
         self.tree.bind("<Control-f>", lambda e: self.entry_search.focus_set())  # Ctrl+F focus search
 
-    def sort_by_column(self, col):
-        """Sort treeview by column."""
-        if self.sort_column == col:
-            self.sort_reverse = not self.sort_reverse
+    # Treeview column -> server-side sort key
+    SORT_KEYS = {"id": "id", "dipendente": "nome", "corso": "corso", "categoria": "categoria",
+                 "emissione": "data_rilascio", "scadenza": "data_scadenza", "stato": "stato"}
+
+    # Treeview column -> typed key on the certificate dict, for local sorting
+    SORT_FIELDS = {
+        "id": lambda c: int_key(c.get("id")),
+        "dipendente": lambda c: text_key(c.get("nome")),
+        "corso": lambda c: text_key(c.get("corso")),
+        "categoria": lambda c: text_key(c.get("categoria")),
+        "emissione": lambda c: date_key(c.get("data_rilascio")),
+        "scadenza": lambda c: date_key(c.get("data_scadenza")),
+        "stato": lambda c: text_key(c.get("stato_certificato")),
+    }
+
+    def _on_sort(self):
+        """Sorts locally once every row is loaded, otherwise reloads sorted by the server."""
+        if self.loader.has_more:
+            self.reload_data()
         else:
-            self.sort_column = col
-            self.sort_reverse = False
-
-        # Get all items with values
-        items = [(self.tree.item(item)["values"], item) for item in self.tree.get_children()]
-
-        # Get column index
-        col_idx = list(self.tree["columns"]).index(col)
-
-        # Sort
-        items.sort(key=lambda x: str(x[0][col_idx]).lower() if x[0][col_idx] else "", reverse=self.sort_reverse)
-
-        # Rearrange items
-        for idx, (vals, item) in enumerate(items):
-            self.tree.move(item, "", idx)
-
-        # Update heading to show sort direction
-        arrow = " ▼" if self.sort_reverse else " ▲"
-        headings = {"id": "ID", "dipendente": "Dipendente", "corso": "Documento",
-                   "categoria": "Categoria", "emissione": "Data Rilascio",
-                   "scadenza": "Data Scadenza", "stato": "Stato"}
-        for c in self.tree["columns"]:
-            heading_text = headings.get(c, c)
-            if c == col:
-                self.tree.heading(c, text=heading_text + arrow)
-            else:
-                self.tree.heading(c, text=heading_text)
+            self.filter_data()
 
     def select_all(self, event=None):
         """Select all items in the tree."""
@@ -176,33 +169,52 @@ class DatabaseView(tk.Frame):
     def refresh_data(self):
         def fetch():
             try:
-                new_data = self.controller.api_client.get("certificati", params={"validated": "true"})
-                if self.winfo_exists():
-                    self.after(0, lambda: self._update_data(new_data))
-            except Exception as e:
+                corsi = self.controller.api_client.get("corsi")
                 if self.winfo_exists():
-                    self.after(0, lambda: messagebox.showerror("Errore", f"Errore: {e}"))
+                    self.after(0, lambda: self._update_filter_options(corsi))
+            except Exception:
+                pass  # Category list is a convenience; the grid still loads
 
         threading.Thread(target=fetch, daemon=True).start()
+        self.reload_data()
+
+    def _schedule_reload(self):
+        """Debounces typing in the search box: one server query per pause."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(300, self.reload_data)
 
-    def _update_data(self, new_data):
-        self.data = new_data
-        self._update_filter_options()
-        self.filter_data()
-
-    def _update_filter_options(self):
-        """Update filter dropdowns to show only available options in current data."""
-        # Get unique categories from data
-        categories = set()
-        statuses = set()
-
-        for item in self.data:
-            cat = item.get("categoria")
-            if cat:
-                categories.add(cat.upper())
-            status = item.get("stato_certificato")
-            if status:
-                statuses.add(status.lower())
+    def reload_data(self):
+        self._search_job = None
+        self.loader.reload(**self._server_filters())
+
+    def _server_filters(self):
+        status_map = {"attivo": ["attivo"], "in scadenza": ["in_scadenza"], "scaduto": ["scaduto"]}
+        cat_filter = self.combo_categoria.get()
+        filters = {
+            "validated": True,
+            "search": self.entry_search.get().strip(),
+            "categoria": cat_filter if cat_filter != "Tutte" else None,
+            "stato": status_map.get(self.combo_status.get().lower()),
+        }
+        if self.sorter.column:
+            filters["sort"] = self.SORT_KEYS[self.sorter.column]
+            filters["order"] = "desc" if self.sorter.reverse else "asc"
+        return filters
+
+    def _on_page(self, rows, total, replace):
+        self.data = self.loader.rows
+        if replace:
+            self.index = SearchIndex(self.data, display=self._row, sort_keys=self.SORT_FIELDS)
+            self.tree.yview_moveto(0)
+        else:
+            self.index.extend(rows)  # Only the new page is prepared
+        self.tree.set_rows(self._build_rows())
+        self._update_count()
+
+    def _update_filter_options(self, corsi):
+        """Update the category dropdown with every category known to the server."""
+        categories = {c.get("categoria_corso").upper() for c in corsi if c.get("categoria_corso")}
 
         # Update category combobox
         current_cat = self.combo_categoria.get()
@@ -211,79 +223,59 @@ class DatabaseView(tk.Frame):
         if current_cat not in cat_values:
             self.combo_categoria.set("Tutte")
 
-        # Update status combobox
-        current_status = self.combo_status.get()
-        status_map = {"attivo": "Attivo", "in_scadenza": "In Scadenza", "scaduto": "Scaduto"}
-        status_values = ["Tutti"] + [status_map.get(s, s.title()) for s in sorted(statuses)]
-        self.combo_status["values"] = status_values
-        if current_status not in status_values:
-            self.combo_status.set("Tutti")
-
     def filter_data(self):
-        query = self.entry_search.get().lower()
-        status_filter = self.combo_status.get().lower()
-        cat_filter = self.combo_categoria.get()
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        count = 0
-        for item in self.data:
-            nome = str(item.get("nome") or "").lower()
-            corso = str(item.get("corso") or "").lower()
-            categoria = str(item.get("categoria") or "").lower()
-            stato = str(item.get("stato_certificato") or "").lower()
-
-            # Apply Category Filter
-            if cat_filter != "Tutte" and (item.get("categoria") or "").upper() != cat_filter.upper():
-                continue
+        """Re-applies the advanced column filters and the sort to the rows loaded so far."""
+        self.tree.set_rows(self._build_rows())
+        self._update_count()
+
+    def _update_count(self):
+        count = self.tree.row_count
+        if self.loader.has_more:
+            self.lbl_count.config(text=f"{count} di {self.loader.total} certificati")
+        else:
+            self.lbl_count.config(text=f"{count} certificati")
+
+    @staticmethod
+    def _row(item):
+        stato = str(item.get("stato_certificato") or "").lower()
+
+        scad = item.get("data_scadenza")
+        if not scad or scad.lower() == "none":
+            scad = "NESSUNA"
+
+        # Prepare values
+        values = (
+            item.get("id"),
+            item.get("nome") or "N/D",
+            item.get("corso") or "N/D",
+            item.get("categoria") or "ALTRO",
+            item.get("data_rilascio") or "",
+            scad,
+            stato.replace("_", " ").upper()
+        )
+
+        # Determine row tag for coloring
+        tag = stato.replace(" ", "_") if stato in ["attivo", "in_scadenza", "scaduto"] else ""
+        return item.get("id"), values, (tag,)
+
+    def _row_order(self):
+        # Partially loaded data keeps the server order, so later pages append correctly
+        if self.sorter.column and not self.loader.has_more:
+            return self.index.search(order_by=self.sorter.column, descending=self.sorter.reverse)
+        return range(len(self.index))
+
+    def _build_rows(self):
+        """Yields (item_id, values, tags) for the loaded rows that pass the column filters."""
+        columns = self.tree["columns"]
+        check_filter = getattr(self.tree, "check_filter", None)
+        for i in self._row_order():
+            iid, values, tags = self.index.display[i]
 
-            # Apply Status Filter
-            if status_filter != "tutti":
-                if status_filter == "in scadenza" and stato != "in_scadenza":
-                    continue
-                if status_filter == "scaduto" and stato != "scaduto":
-                    continue
-                if status_filter == "attivo" and stato != "attivo":
-                    continue
-
-            # Apply Search Filter
-            if query and query not in nome and query not in corso and query not in categoria:
+            # Check advanced column filters
+            if check_filter and not all(check_filter(col, values[col_idx]) for col_idx, col in enumerate(columns)):
                 continue
 
-            scad = item.get("data_scadenza")
-            if not scad or scad.lower() == "none":
-                scad = "NESSUNA"
-
-            # Prepare values
-            values = (
-                item.get("id"),
-                item.get("nome") or "N/D",
-                item.get("corso") or "N/D",
-                item.get("categoria") or "ALTRO",
-                item.get("data_rilascio") or "",
-                scad,
-                stato.replace("_", " ").upper()
-            )
-
-            # Check advanced column filters
-            if hasattr(self.tree, 'check_filter'):
-                columns = ["id", "dipendente", "corso", "categoria", "emissione", "scadenza", "stato"]
-                skip = False
-                for col_idx, col in enumerate(columns):
-                    if not self.tree.check_filter(col, values[col_idx]):
-                        skip = True
-                        break
-                if skip:
-                    continue
-
-            # Determine row tag for coloring
-            tag = stato.replace(" ", "_") if stato in ["attivo", "in_scadenza", "scaduto"] else ""
-
-            self.tree.insert("", "end", values=values, tags=(tag,))
-            count += 1
-
-        self.lbl_count.config(text=f"{count} certificati")
+            yield iid, values, tags
 
     def open_file(self, event=None):
         selected = self.tree.selection()
@@ -3,6 +3,9 @@ from tkinter import ttk, messagebox, Menu
 import threading
 import os
 from desktop_app.utils import open_file, format_date_to_ui
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+from desktop_app.widgets.column_sorter import ColumnSorter
+from desktop_app.widgets.search_index import SearchIndex, int_key, text_key, date_key
 from app.services.document_locator import find_document
 from app.core.config import settings
 
@@ -11,6 +14,8 @@ class DipendentiView(tk.Frame):
         super().__init__(parent)
         self.controller = controller
         self.data = []
+        self.index = SearchIndex([])
+        self._search_job = None
 
         self.setup_ui()
 
@@ -32,7 +37,7 @@ class DipendentiView(tk.Frame):
         tk.Label(toolbar, text="Cerca:", bg="#F3F4F6").pack(side="left", padx=10)
         self.entry_search = tk.Entry(toolbar, width=25)
         self.entry_search.pack(side="left")
-        self.entry_search.bind("<KeyRelease>", lambda e: self.filter_data())
+        self.entry_search.bind("<KeyRelease>", lambda e: self._schedule_filter())
 
         # Selection count
         self.lbl_selection = tk.Label(toolbar, text="", bg="#F3F4F6", font=("Segoe UI", 9))
@@ -40,14 +45,16 @@ class DipendentiView(tk.Frame):
 
         # Treeview with extended selection for bulk operations
         columns = ("id", "matricola", "nome", "data_nascita", "mansione", "reparto")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended")
+        self.tree = VirtualTreeview(self, columns=columns, show="headings", selectmode="extended")
 
-        self.tree.heading("id", text="ID")
-        self.tree.heading("matricola", text="Matricola")
-        self.tree.heading("nome", text="Cognome e Nome")
-        self.tree.heading("data_nascita", text="Data Nascita")
-        self.tree.heading("mansione", text="Mansione")
-        self.tree.heading("reparto", text="Reparto")
+        self.sorter = ColumnSorter(self.tree, {
+            "id": "ID",
+            "matricola": "Matricola",
+            "nome": "Cognome e Nome",
+            "data_nascita": "Data Nascita",
+            "mansione": "Mansione",
+            "reparto": "Reparto"
+        }, self.filter_data)
 
         self.tree.column("id", width=50)
         self.tree.column("matricola", width=80)
@@ -132,33 +139,53 @@ class DipendentiView(tk.Frame):
 
     def _update_data(self, new_data):
         self.data = new_data
+        self.index = SearchIndex(
+            new_data,
+            text=(self._display_name, lambda d: d.get("matricola"), lambda d: d.get("categoria_reparto")),
+            display=self._row_values,
+            sort_keys=self.SORT_FIELDS
+        )
         self.filter_data()
 
-    def filter_data(self):
-        query = self.entry_search.get().lower()
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for d in self.data:
-            cognome = (d.get("cognome") or "").upper()
-            nome = (d.get("nome") or "").upper()
-            display_name = f"{cognome} {nome}".strip()
-            matricola = (d.get("matricola") or "").lower()
-            reparto = (d.get("categoria_reparto") or "").upper()
-
-            dob = format_date_to_ui(d.get("data_nascita"))
+    # Treeview column -> typed key on the employee dict
+    SORT_FIELDS = {
+        "id": lambda d: int_key(d.get("id")),
+        "matricola": lambda d: text_key(d.get("matricola")),
+        "nome": lambda d: text_key(f"{d.get('cognome') or ''} {d.get('nome') or ''}"),
+        "data_nascita": lambda d: date_key(d.get("data_nascita")),
+        "mansione": lambda d: text_key(d.get("mansione")),
+        "reparto": lambda d: text_key(d.get("categoria_reparto")),
+    }
+
+    @staticmethod
+    def _display_name(d):
+        cognome = (d.get("cognome") or "").upper()
+        nome = (d.get("nome") or "").upper()
+        return f"{cognome} {nome}".strip()
+
+    def _row_values(self, d):
+        return (
+            d.get("id"),
+            d.get("matricola") or "",
+            self._display_name(d),
+            format_date_to_ui(d.get("data_nascita")),
+            d.get("mansione") or "",
+            (d.get("categoria_reparto") or "").upper()
+        )
+
+    def _schedule_filter(self):
+        """Debounces typing in the search box: one filter pass per pause."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self.filter_data)
 
-            if query in display_name.lower() or query in matricola or query in reparto.lower():
-                values = (
-                    d.get("id"),
-                    d.get("matricola") or "",
-                    display_name,
-                    dob,
-                    d.get("mansione") or "",
-                    reparto
-                )
-                self.tree.insert("", "end", values=values)
+    def filter_data(self):
+        self._search_job = None
+        matches = self.index.search(self.entry_search.get(),
+                                    order_by=self.sorter.column, descending=self.sorter.reverse)
+        self.tree.set_rows(
+            (self.index.rows[i].get("id"), self.index.display[i], ()) for i in matches
+        )
 
     def show_storico(self):
         selected = self.tree.selection()
@@ -2,18 +2,39 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
 import shutil
+import threading
+import time
 import requests
 from desktop_app.utils import TaskRunner, ProgressTaskRunner
 from app.core.config import settings
 from app.services.document_locator import construct_certificate_path
+from app.services.document_index import document_index
 from app.services.sync_service import get_unique_filename
 
+class _QuotaExhausted(Exception):
+    """The server could not extract a file because the AI quota ran out."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 class ImportView(tk.Frame):
+    DEFAULT_WORKERS = 4
+    MAX_WORKERS = 8  # Stays below the API client's connection pool
+    POLL_INTERVAL = 1.0  # Seconds between checks of a queued file
+    AI_RETRIES = 3
+    AI_BACKOFF = 10  # Seconds, doubled on every consecutive quota failure
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         self.configure(bg="#F3F4F6")
         self.log_text = None
+        self._job_lock = threading.Lock()
+        self._job_id = None
+        self._runner = None
+        self._ai_lock = threading.Lock()
+        self._ai_resume_at = 0.0
+        self._matricole = None
         
         self.setup_ui()
 
@@ -101,7 +122,8 @@ class ImportView(tk.Frame):
 
     def run_analysis(self, path):
         """
-        Runs the analysis using ProgressTaskRunner with ETA.
+        Runs the analysis through a ProgressTaskRunner pipeline with ETA.
+        Files are extracted by a server-side import job (see /import-jobs/).
         """
         self.log(f"Avvio analisi su: {path}")
 
@@ -126,9 +148,17 @@ class ImportView(tk.Frame):
             "Analisi AI in corso",
             f"Analisi di {len(files)} documenti..."
         )
+        self._runner = runner
+        self._job_id = None
+        self._ai_resume_at = 0.0
+        self._matricole = None
 
         try:
-            result = runner.run(self._process_single_file, files)
+            result = runner.run_pipeline([
+                (self._extract_stage, self._worker_count()),
+                (self._save_stage, 1),
+                (self._organize_stage, 1),
+            ], files)
 
             # Count results
             success = sum(1 for r in result.get("results", []) if r.get("success"))
@@ -146,48 +176,117 @@ class ImportView(tk.Frame):
             self.log(f"Errore critico: {e}")
             messagebox.showerror("Errore", str(e))
 
-    def _process_single_file(self, file_path):
-        """Process a single PDF file."""
+    def _worker_count(self):
+        """Files in flight at once, from IMPORT_WORKERS (1 restores the sequential import)."""
         try:
-            # 1. Upload & Analyze
-            url = f"{self.controller.api_client.base_url}/upload-pdf/"
-            with open(file_path, 'rb') as f:
-                files_dict = {'file': (os.path.basename(file_path), f, 'application/pdf')}
-                res = requests.post(url, files=files_dict, headers=self.controller.api_client._get_headers(), timeout=120)
-                res.raise_for_status()
-
-            data = res.json()
-            entities = data.get("entities", {})
-
-            # 2. Save Certificate to DB
-            payload = {
-                "nome": entities.get("nome"),
-                "corso": entities.get("corso"),
-                "categoria": entities.get("categoria"),
-                "data_rilascio": entities.get("data_rilascio"),
-                "data_scadenza": entities.get("data_scadenza")
-            }
+            workers = int(os.environ.get("IMPORT_WORKERS", self.DEFAULT_WORKERS))
+        except ValueError:
+            workers = self.DEFAULT_WORKERS
+        return max(1, min(workers, self.MAX_WORKERS))
+
+    # --- Pipeline stages ---
+    # Extraction runs on several workers; saving and organizing run on one
+    # worker each, so the copies never race on get_unique_filename().
 
+    def _extract_stage(self, file_path):
+        """
+        Queues the PDF in the server's import job and waits for its extraction.
+        The server paces the AI calls with its rate limiter and retries a file a
+        few times on quota errors. If the quota stays exhausted (the item comes
+        back "retryable", or the server answers 429) every worker pauses on a
+        shared back-off before the file is resubmitted.
+        """
+        try:
+            for attempt in range(self.AI_RETRIES + 1):
+                self._wait_for_ai_quota()
+                try:
+                    item = self._submit_to_job(file_path)
+                    return file_path, self._wait_for_item(item["id"])
+                except _QuotaExhausted as e:
+                    if attempt == self.AI_RETRIES:
+                        raise
+                    delay = e.retry_after or self.AI_BACKOFF * (2 ** attempt)
+                    with self._ai_lock:
+                        self._ai_resume_at = max(self._ai_resume_at, time.monotonic() + delay)
+                    self.log(f"Avviso: limite AI raggiunto, nuovo tentativo tra {int(delay)}s ({os.path.basename(file_path)})")
+        except Exception as e:
+            self._report_failure(file_path, e)
+
+    def _save_stage(self, extracted):
+        file_path, entities = extracted
+        payload = {
+            "nome": entities.get("nome"),
+            "corso": entities.get("corso"),
+            "categoria": entities.get("categoria"),
+            "data_rilascio": entities.get("data_rilascio"),
+            "data_scadenza": entities.get("data_scadenza")
+        }
+        try:
             create_url = f"{self.controller.api_client.base_url}/certificati/"
-            create_res = requests.post(create_url, json=payload, headers=self.controller.api_client._get_headers())
+            create_res = self.controller.api_client.session.post(create_url, json=payload, headers=self.controller.api_client._get_headers())
             create_res.raise_for_status()
+        except Exception as e:
+            self._report_failure(file_path, e)
+        return extracted
 
-            # Copy file to database structure
-            self._organize_pdf_file(file_path, entities)
+    def _organize_stage(self, extracted):
+        file_path, entities = extracted
+        # Copy file to database structure
+        self._organize_pdf_file(file_path, entities)
 
-            self.log(f"OK: {os.path.basename(file_path)} -> {entities.get('nome')}")
-            return {"file": file_path, "nome": entities.get("nome")}
+        self.log(f"OK: {os.path.basename(file_path)} -> {entities.get('nome')}")
+        return {"file": file_path, "nome": entities.get("nome")}
 
+    def _submit_to_job(self, file_path):
+        api_client = self.controller.api_client
+        try:
+            with self._job_lock:
+                # The first file creates the job, the others join it
+                if self._job_id is None:
+                    job = api_client.submit_import_files([file_path])
+                    self._job_id = job["id"]
+                    return job["items"][0]
+            return api_client.submit_import_files([file_path], self._job_id)["items"][0]
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 409:
+            if e.response is None or e.response.status_code != 429:
+                raise
+            try:
+                retry_after = float(e.response.headers.get("Retry-After", ""))
+            except ValueError:
+                retry_after = None
+            raise _QuotaExhausted(str(e), retry_after) from e
+
+    def _wait_for_item(self, item_id):
+        while True:
+            item = self.controller.api_client.get_import_item(self._job_id, item_id)
+            if item["status"] == "done":
+                return item["entities"] or {}
+            if item.get("retryable"):
+                raise _QuotaExhausted(item.get("error") or item["status"])
+            if item["status"] not in ("queued", "running"):
+                raise Exception(item.get("error") or item["status"])
+            time.sleep(self.POLL_INTERVAL)
+
+    def _wait_for_ai_quota(self):
+        while True:
+            with self._ai_lock:
+                remaining = self._ai_resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            if self._runner.cancelled:
+                raise Exception("Operazione annullata")
+            time.sleep(min(remaining, 0.5))
+
+    def _report_failure(self, file_path, error):
+        """Logs a failed file and re-raises, so the pipeline records it."""
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            if error.response.status_code == 409:
                 self.log(f"SKIP: {os.path.basename(file_path)} -> Già presente.")
                 raise Exception(f"409: Già presente")
-            else:
-                self.log(f"ERRORE HTTP: {os.path.basename(file_path)} -> {e}")
-                raise
-        except Exception as e:
-            self.log(f"ERRORE: {os.path.basename(file_path)} -> {e}")
-            raise
+            self.log(f"ERRORE HTTP: {os.path.basename(file_path)} -> {error}")
+        else:
+            self.log(f"ERRORE: {os.path.basename(file_path)} -> {error}")
+        raise error
 
     def _organize_pdf_file(self, source_path, entities):
         """
@@ -206,16 +305,7 @@ class ImportView(tk.Frame):
             data_scadenza = entities.get('data_scadenza')
 
             # Try to find the employee in DB to get matricola
-            matricola = None
-            try:
-                dipendenti = self.controller.api_client.get_dipendenti_list()
-                for dip in dipendenti:
-                    dip_nome = f"{dip.get('cognome', '')} {dip.get('nome', '')}".strip().upper()
-                    if nome.upper() == dip_nome:
-                        matricola = dip.get('matricola')
-                        break
-            except Exception:
-                pass  # If we can't fetch, use None
+            matricola = self._get_matricole().get(nome.upper())
 
             # Determine correct status based on expiry date
             status = "ATTIVO"
@@ -259,18 +349,30 @@ class ImportView(tk.Frame):
 
             # Copy file (don't move, keep original)
             shutil.copy2(source_path, final_path)
+            document_index.record_added(final_path)
 
         except Exception as e:
             self.log(f"Avviso: impossibile organizzare file - {e}")
 
+    def _get_matricole(self):
+        """Employee name -> matricola, fetched once per import instead of once per file."""
+        if self._matricole is None:
+            self._matricole = {}
+            try:
+                for dip in self.controller.api_client.get_dipendenti_list():
+                    dip_nome = f"{dip.get('cognome', '')} {dip.get('nome', '')}".strip().upper()
+                    self._matricole.setdefault(dip_nome, dip.get('matricola'))
+            except Exception:
+                pass  # If we can't fetch, use None
+        return self._matricole
+
     def _run_sync_with_notification(self):
         """Run sync in background and notify when complete."""
-        import threading
 
         def sync_task():
             try:
                 sync_url = f"{self.controller.api_client.base_url}/system/maintenance/background"
-                sync_res = requests.post(sync_url, headers=self.controller.api_client._get_headers(), timeout=300)
+                sync_res = self.controller.api_client.session.post(sync_url, headers=self.controller.api_client._get_headers(), timeout=300)
 
                 # Schedule UI update on main thread
                 if sync_res.ok:
@@ -2,8 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from desktop_app.utils import TaskRunner, open_file
 from desktop_app.widgets.advanced_filter import setup_filterable_treeview
+from desktop_app.widgets.paged_loader import PagedLoader
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+from desktop_app.widgets.column_sorter import ColumnSorter
+from desktop_app.widgets.search_index import SearchIndex, text_key, date_key
 import os
 import threading
+from datetime import datetime
 
 
 class ScadenzarioView(tk.Frame):
@@ -11,6 +16,10 @@ class ScadenzarioView(tk.Frame):
         super().__init__(parent)
         self.controller = controller
         self.data = []
+        self.index = SearchIndex([])
+        self._search_job = None
+        self.loader = PagedLoader(self, controller.api_client, self._on_page,
+                                  on_error=lambda e: messagebox.showerror("Errore", str(e)))
 
         self.setup_ui()
         self.setup_keyboard_shortcuts()
@@ -30,21 +39,21 @@ class ScadenzarioView(tk.Frame):
         tk.Label(toolbar, text="Cerca:", bg="#F3F4F6").pack(side="left", padx=(20, 5))
         self.entry_search = ttk.Entry(toolbar, width=25)
         self.entry_search.pack(side="left", padx=5)
-        self.entry_search.bind("<KeyRelease>", lambda e: self.filter_data())
+        self.entry_search.bind("<KeyRelease>", lambda e: self._schedule_reload())
 
         # Category Filter (populated dynamically from data) - increased width
         tk.Label(toolbar, text="Categoria:", bg="#F3F4F6").pack(side="left", padx=(15, 5))
         self.combo_categoria = ttk.Combobox(toolbar, values=["Tutte"], state="readonly", width=28)
         self.combo_categoria.set("Tutte")
         self.combo_categoria.pack(side="left", padx=5)
-        self.combo_categoria.bind("<<ComboboxSelected>>", lambda e: self.filter_data())
+        self.combo_categoria.bind("<<ComboboxSelected>>", lambda e: self.reload_data())
 
-        # Status Filter (populated dynamically from data) - increased width
+        # Status Filter - increased width
         tk.Label(toolbar, text="Stato:", bg="#F3F4F6").pack(side="left", padx=(15, 5))
-        self.combo_status = ttk.Combobox(toolbar, values=["Tutti"], state="readonly", width=15)
+        self.combo_status = ttk.Combobox(toolbar, values=["Tutti", "Valido", "In Scadenza", "Scaduto"], state="readonly", width=15)
         self.combo_status.set("Tutti")
         self.combo_status.pack(side="left", padx=5)
-        self.combo_status.bind("<<ComboboxSelected>>", lambda e: self.filter_data())
+        self.combo_status.bind("<<ComboboxSelected>>", lambda e: self.reload_data())
 
         # Reset filters button
         self.btn_reset = tk.Button(toolbar, text="Reset Filtri", bg="#6B7280", fg="white",
@@ -64,7 +73,7 @@ class ScadenzarioView(tk.Frame):
 
         # Treeview
         columns = ("dipendente", "corso", "categoria", "scadenza", "giorni_rimanenti")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended")
+        self.tree = VirtualTreeview(self, columns=columns, show="headings", selectmode="extended")
 
         self.tree.heading("dipendente", text="Dipendente")
         self.tree.heading("corso", text="Documento")
@@ -85,17 +94,12 @@ class ScadenzarioView(tk.Frame):
         self.tree.tag_configure("valido", background="#BBF7D0")  # Green-200
 
         scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
+        # Next page is fetched when scrolling near the bottom
+        self.loader.attach_scroll(self.tree, scrollbar)
 
         scrollbar.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
 
-        # Column sorting
-        self.sort_column = None
-        self.sort_reverse = False
-        for col in columns:
-            self.tree.heading(col, command=lambda c=col: self.sort_by_column(c))
-
         # Setup advanced column filters (right-click on headers)
         column_names = {
             "dipendente": "Dipendente",
@@ -105,6 +109,7 @@ class ScadenzarioView(tk.Frame):
             "giorni_rimanenti": "Giorni Rimanenti"
         }
         setup_filterable_treeview(self.tree, column_names)
+        self.sorter = ColumnSorter(self.tree, {**column_names, "scadenza": "Scadenza"}, self._on_sort)
         self.tree.bind("<<FilterChanged>>", lambda e: self._on_filter_changed())
 
     def setup_keyboard_shortcuts(self):
@@ -157,80 +162,82 @@ class ScadenzarioView(tk.Frame):
             self.tree.clear_filters()
 
         # Refresh display
-        self.filter_data()
-        self._update_filter_indicator()
+        self.reload_data()
 
     def select_all(self, event=None):
         """Select all items in the tree."""
         self.tree.selection_set(self.tree.get_children())
         return "break"
 
-    def sort_by_column(self, col):
-        """Sort treeview by column."""
-        if self.sort_column == col:
-            self.sort_reverse = not self.sort_reverse
-        else:
-            self.sort_column = col
-            self.sort_reverse = False
-
-        items = [(self.tree.item(item)["values"], item) for item in self.tree.get_children()]
-        col_idx = list(self.tree["columns"]).index(col)
-
-        # Special sorting for numeric days column
-        if col == "giorni_rimanenti":
-            def sort_key(x):
-                val = x[0][col_idx]
-                try:
-                    return int(val) if val != "N/D" else 99999
-                except:
-                    return 99999
-            items.sort(key=sort_key, reverse=self.sort_reverse)
+    # Treeview column -> server-side sort key (remaining days follow the expiry date)
+    SORT_KEYS = {"dipendente": "nome", "corso": "corso", "categoria": "categoria",
+                 "scadenza": "data_scadenza", "giorni_rimanenti": "data_scadenza"}
+
+    # Treeview column -> typed key on the certificate dict, for local sorting
+    SORT_FIELDS = {
+        "dipendente": lambda c: text_key(c.get("nome")),
+        "corso": lambda c: text_key(c.get("corso")),
+        "categoria": lambda c: text_key(c.get("categoria")),
+        "scadenza": lambda c: date_key(c.get("data_scadenza")),
+        "giorni_rimanenti": lambda c: date_key(c.get("data_scadenza")),
+    }
+
+    def _on_sort(self):
+        """Sorts locally once every row is loaded, otherwise reloads sorted by the server."""
+        if self.loader.has_more:
+            self.reload_data()
         else:
-            items.sort(key=lambda x: str(x[0][col_idx]).lower() if x[0][col_idx] else "", reverse=self.sort_reverse)
-
-        for idx, (vals, item) in enumerate(items):
-            self.tree.move(item, "", idx)
-
-        # Update heading to show sort direction
-        arrow = " ▼" if self.sort_reverse else " ▲"
-        headings = {"dipendente": "Dipendente", "corso": "Documento",
-                   "categoria": "Categoria", "scadenza": "Scadenza", "giorni_rimanenti": "Giorni Rimanenti"}
-        for c in self.tree["columns"]:
-            heading_text = headings.get(c, c)
-            if c == col:
-                self.tree.heading(c, text=heading_text + arrow)
-            else:
-                self.tree.heading(c, text=heading_text)
+            self.filter_data()
 
     def refresh_data(self):
         def fetch():
             try:
-                new_data = self.controller.api_client.get("certificati", params={"validated": "true"})
+                corsi = self.controller.api_client.get("corsi")
                 if self.winfo_exists():
-                    self.after(0, lambda: self._update_data(new_data))
-            except Exception as e:
-                if self.winfo_exists():
-                    self.after(0, lambda: messagebox.showerror("Errore", str(e)))
+                    self.after(0, lambda: self._update_filter_options(corsi))
+            except Exception:
+                pass  # Category list is a convenience; the grid still loads
 
         threading.Thread(target=fetch, daemon=True).start()
+        self.reload_data()
 
-    def _update_data(self, new_data):
-        self.data = new_data
-        self._update_filter_options()
-        self.filter_data()
+    def _schedule_reload(self):
+        """Debounces typing in the search box: one server query per pause."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(300, self.reload_data)
 
-    def _update_filter_options(self):
-        """Update filter dropdowns to show only available options in current data."""
-        categories = set()
-        statuses = set()
+    def reload_data(self):
+        self._search_job = None
+        self.loader.reload(**self._server_filters())
+        self._update_filter_indicator()
+
+    def _server_filters(self):
+        # "Valido" covers everything that is neither expired nor expiring
+        status_map = {"valido": ["attivo", "archiviato"], "in scadenza": ["in_scadenza"], "scaduto": ["scaduto"]}
+        cat_filter = self.combo_categoria.get()
+        return {
+            "validated": True,
+            "search": self.entry_search.get().strip(),
+            "categoria": cat_filter if cat_filter != "Tutte" else None,
+            "stato": status_map.get(self.combo_status.get().lower()),
+            "sort": self.SORT_KEYS.get(self.sorter.column, "data_scadenza"),
+            "order": "desc" if self.sorter.reverse else "asc",
+        }
+
+    def _on_page(self, rows, total, replace):
+        self.data = self.loader.rows
+        if replace:
+            self.index = SearchIndex(self.data, display=self._row, sort_keys=self.SORT_FIELDS)
+            self.tree.yview_moveto(0)
+        else:
+            self.index.extend(rows)  # Only the new page is prepared
+        self.tree.set_rows(self._build_rows())
+        self._update_count()
 
-        for item in self.data:
-            cat = item.get("categoria")
-            if cat:
-                categories.add(cat.upper())
-            status = item.get("stato_certificato")
-            if status:
-                statuses.add(status.lower())
+    def _update_filter_options(self, corsi):
+        """Update the category dropdown with every category known to the server."""
+        categories = {c.get("categoria_corso").upper() for c in corsi if c.get("categoria_corso")}
 
         # Update category combobox
         current_cat = self.combo_categoria.get()
@@ -239,87 +246,69 @@ class ScadenzarioView(tk.Frame):
         if current_cat not in cat_values:
             self.combo_categoria.set("Tutte")
 
-        # Update status combobox
-        current_status = self.combo_status.get()
-        status_map = {"attivo": "Valido", "in_scadenza": "In Scadenza", "scaduto": "Scaduto"}
-        status_values = ["Tutti"] + [status_map.get(s, s.title()) for s in sorted(statuses)]
-        self.combo_status["values"] = status_values
-        if current_status not in status_values:
-            self.combo_status.set("Tutti")
-
     def filter_data(self):
-        query = self.entry_search.get().lower()
-        cat_filter = self.combo_categoria.get()
-        status_filter = self.combo_status.get().lower()
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        def get_date_key(d):
-            val = d.get("data_scadenza")
-            return val if val else "9999-99-99"
-
-        sorted_data = sorted(self.data, key=get_date_key)
-
-        from datetime import datetime
-        today = datetime.now().date()
-
-        count = 0
-        for item in sorted_data:
-            nome = str(item.get("nome") or "").lower()
-            corso = str(item.get("corso") or "").lower()
-            categoria = str(item.get("categoria") or "").lower()
-
-            # Apply Category Filter
-            if cat_filter != "Tutte" and (item.get("categoria") or "").upper() != cat_filter.upper():
-                continue
-
-            scadenza_str = item.get("data_scadenza")
-            status = item.get("stato_certificato")
-
-            # Simple color logic
-            tag = "valido"
-            if status == "scaduto":
-                tag = "scaduto"
-            elif status == "in_scadenza":
-                tag = "in_scadenza"
-
-            # Apply Status Filter
-            if status_filter != "tutti":
-                if status_filter == "in scadenza" and tag != "in_scadenza":
-                    continue
-                if status_filter == "scaduto" and tag != "scaduto":
-                    continue
-                if status_filter == "valido" and tag != "valido":
-                    continue
-
-            # Apply Search Filter
-            if query and query not in nome and query not in corso and query not in categoria:
+        """Re-applies the advanced column filters and the sort to the rows loaded so far."""
+        self.tree.set_rows(self._build_rows())
+        self._update_count()
+
+    def _update_count(self):
+        count = self.tree.row_count
+        if self.loader.has_more:
+            self.lbl_count.config(text=f"{count} di {self.loader.total} certificati")
+        else:
+            self.lbl_count.config(text=f"{count} certificati")
+
+    @staticmethod
+    def _row(item):
+        scadenza_str = item.get("data_scadenza")
+        status = item.get("stato_certificato")
+
+        # Simple color logic
+        tag = "valido"
+        if status == "scaduto":
+            tag = "scaduto"
+        elif status == "in_scadenza":
+            tag = "in_scadenza"
+
+        # Calc days remaining - show empty for certificates without expiry (like NOMINA)
+        days_str = ""
+        if scadenza_str and scadenza_str.lower() != "none":
+            try:
+                dt = datetime.strptime(scadenza_str, "%d/%m/%Y").date()
+                delta = (dt - datetime.now().date()).days
+                days_str = str(delta)
+            except:
+                pass
+        else:
+            scadenza_str = ""  # Empty cell instead of "NESSUNA"
+
+        values = (
+            item.get("nome"),
+            item.get("corso"),
+            item.get("categoria") or "ALTRO",
+            scadenza_str,
+            days_str
+        )
+        return item.get("id"), values, (tag,)
+
+    def _row_order(self):
+        # Partially loaded data keeps the server order, so later pages append correctly
+        if self.sorter.column and not self.loader.has_more:
+            return self.index.search(order_by=self.sorter.column, descending=self.sorter.reverse)
+        return range(len(self.index))
+
+    def _build_rows(self):
+        """Yields (item_id, values, tags) for the loaded rows that pass the column filters."""
+        columns = self.tree["columns"]
+        check_filter = getattr(self.tree, "check_filter", None)
+        for i in self._row_order():
+            iid, values, tags = self.index.display[i]
+
+            # Check advanced column filters
+            if check_filter and not all(check_filter(col, values[col_idx]) for col_idx, col in enumerate(columns)):
                 continue
 
-            # Calc days remaining - show empty for certificates without expiry (like NOMINA)
-            days_str = ""
-            if scadenza_str and scadenza_str.lower() != "none":
-                try:
-                    dt = datetime.strptime(scadenza_str, "%d/%m/%Y").date()
-                    delta = (dt - today).days
-                    days_str = str(delta)
-                except:
-                    pass
-            else:
-                scadenza_str = ""  # Empty cell instead of "NESSUNA"
-
-            values = (
-                item.get("nome"),
-                item.get("corso"),
-                item.get("categoria") or "ALTRO",
-                scadenza_str,
-                days_str
-            )
-            self.tree.insert("", "end", values=values, tags=(tag,))
-            count += 1
-
-        self.lbl_count.config(text=f"{count} certificati")
+            yield iid, values, tags
 
     def export_pdf(self):
         file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Files", "*.pdf")])
@@ -329,9 +318,8 @@ class ScadenzarioView(tk.Frame):
         runner = TaskRunner(self, "Esportazione", "Generazione PDF in corso...")
         try:
             def task():
-                import requests
                 url = f"{self.controller.api_client.base_url}/notifications/export-report"
-                res = requests.get(url, headers=self.controller.api_client._get_headers())
+                res = self.controller.api_client.session.get(url, headers=self.controller.api_client._get_headers())
                 res.raise_for_status()
                 with open(file_path, "wb") as f:
                     f.write(res.content)
@@ -348,9 +336,8 @@ class ScadenzarioView(tk.Frame):
             runner = TaskRunner(self, "Invio Email", "Invio in corso...")
             try:
                 def task():
-                    import requests
                     url = f"{self.controller.api_client.base_url}/notifications/send-manual-alert"
-                    res = requests.post(url, headers=self.controller.api_client._get_headers())
+                    res = self.controller.api_client.session.post(url, headers=self.controller.api_client._get_headers())
                     res.raise_for_status()
 
                 runner.run(task)
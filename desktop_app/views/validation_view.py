@@ -2,7 +2,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox, Menu
 from desktop_app.utils import TaskRunner, ProgressTaskRunner, open_file
 from desktop_app.widgets.advanced_filter import setup_filterable_treeview
-import requests
+from desktop_app.widgets.paged_loader import PagedLoader
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+from desktop_app.widgets.column_sorter import ColumnSorter
+from desktop_app.widgets.search_index import SearchIndex, int_key, text_key, date_key
 import os
 import threading
 from app.services.document_locator import find_document
@@ -16,6 +19,12 @@ class ValidationView(tk.Frame):
         self.controller = controller
         self.data = []
         self.orphan_data = []
+        self.index = SearchIndex([])
+        self._search_job = None
+
+        on_error = lambda e: messagebox.showerror("Errore", str(e))
+        self.loader = PagedLoader(self, controller.api_client, self._on_page, on_error=on_error)
+        self.orphan_loader = PagedLoader(self, controller.api_client, self._on_orphan_page, on_error=on_error)
 
         self.setup_ui()
         self.setup_keyboard_shortcuts()
@@ -52,14 +61,14 @@ class ValidationView(tk.Frame):
         tk.Label(toolbar, text="Cerca:", bg="#F3F4F6").pack(side="left", padx=(20, 5))
         self.entry_search = ttk.Entry(toolbar, width=25)
         self.entry_search.pack(side="left", padx=5)
-        self.entry_search.bind("<KeyRelease>", lambda e: self.filter_data())
+        self.entry_search.bind("<KeyRelease>", lambda e: self._schedule_reload())
 
         # Category Filter (populated dynamically from data)
         tk.Label(toolbar, text="Categoria:", bg="#F3F4F6").pack(side="left", padx=(15, 5))
         self.combo_categoria = ttk.Combobox(toolbar, values=["Tutte"], state="readonly", width=25)
         self.combo_categoria.set("Tutte")
         self.combo_categoria.pack(side="left", padx=5)
-        self.combo_categoria.bind("<<ComboboxSelected>>", lambda e: self.filter_data())
+        self.combo_categoria.bind("<<ComboboxSelected>>", lambda e: self.reload_data())
 
         # Results count
         self.lbl_count = tk.Label(toolbar, text="", bg="#F3F4F6", font=("Segoe UI", 9))
@@ -67,7 +76,7 @@ class ValidationView(tk.Frame):
 
         # Treeview
         columns = ("id", "dipendente", "corso", "categoria", "emissione", "scadenza")
-        self.tree = ttk.Treeview(self.tab_validate, columns=columns, show="headings", selectmode="extended")
+        self.tree = VirtualTreeview(self.tab_validate, columns=columns, show="headings", selectmode="extended")
 
         self.tree.heading("id", text="ID")
         self.tree.heading("dipendente", text="Dipendente")
@@ -89,7 +98,8 @@ class ValidationView(tk.Frame):
         self.tree.tag_configure("even", background="#FFFFFF")
 
         scrollbar = ttk.Scrollbar(self.tab_validate, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
+        # Next page is fetched when scrolling near the bottom
+        self.loader.attach_scroll(self.tree, scrollbar)
 
         scrollbar.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
@@ -106,12 +116,6 @@ class ValidationView(tk.Frame):
         self.tree.bind("<Button-3>", self.show_context_menu)
         self.tree.bind("<Double-1>", self.on_double_click)
 
-        # Column sorting
-        self.sort_column = None
-        self.sort_reverse = False
-        for col in columns:
-            self.tree.heading(col, command=lambda c=col: self.sort_by_column(c))
-
         # Setup advanced column filters (right-click on headers)
         column_names = {
             "id": "ID",
@@ -122,6 +126,7 @@ class ValidationView(tk.Frame):
             "scadenza": "Data Scadenza"
         }
         setup_filterable_treeview(self.tree, column_names)
+        self.sorter = ColumnSorter(self.tree, column_names, self._on_sort)
         self.tree.bind("<<FilterChanged>>", lambda e: self.filter_data())
 
     def _setup_orphans_tab(self):
@@ -148,7 +153,7 @@ class ValidationView(tk.Frame):
 
         # Treeview for orphans
         columns = ("id", "nome_raw", "corso", "categoria", "emissione", "scadenza")
-        self.tree_orphans = ttk.Treeview(self.tab_orphans, columns=columns, show="headings", selectmode="extended")
+        self.tree_orphans = VirtualTreeview(self.tab_orphans, columns=columns, show="headings", selectmode="extended")
 
         self.tree_orphans.heading("id", text="ID")
         self.tree_orphans.heading("nome_raw", text="Nome Rilevato (PDF)")
@@ -168,7 +173,7 @@ class ValidationView(tk.Frame):
         self.tree_orphans.tag_configure("orphan", background="#FEF3C7")
 
         scrollbar = ttk.Scrollbar(self.tab_orphans, orient="vertical", command=self.tree_orphans.yview)
-        self.tree_orphans.configure(yscroll=scrollbar.set)
+        self.orphan_loader.attach_scroll(self.tree_orphans, scrollbar)
 
         scrollbar.pack(side="right", fill="y")
         self.tree_orphans.pack(fill="both", expand=True)
@@ -231,36 +236,26 @@ class ValidationView(tk.Frame):
         self.tree.bind("<Control-a>", self.select_all)
         self.tree.bind("<Control-f>", lambda e: self.entry_search.focus_set())
 
-    def sort_by_column(self, col):
-        """Sort treeview by column."""
-        if self.sort_column == col:
-            self.sort_reverse = not self.sort_reverse
+    # Treeview column -> server-side sort key
+    SORT_KEYS = {"id": "id", "dipendente": "nome", "corso": "corso", "categoria": "categoria",
+                 "emissione": "data_rilascio", "scadenza": "data_scadenza"}
+
+    # Treeview column -> typed key on the certificate dict, for local sorting
+    SORT_FIELDS = {
+        "id": lambda c: int_key(c.get("id")),
+        "dipendente": lambda c: text_key(c.get("nome")),
+        "corso": lambda c: text_key(c.get("corso")),
+        "categoria": lambda c: text_key(c.get("categoria")),
+        "emissione": lambda c: date_key(c.get("data_rilascio")),
+        "scadenza": lambda c: date_key(c.get("data_scadenza")),
+    }
+
+    def _on_sort(self):
+        """Sorts locally once every row is loaded, otherwise reloads sorted by the server."""
+        if self.loader.has_more:
+            self.reload_data()
         else:
-            self.sort_column = col
-            self.sort_reverse = False
-
-        # Get all items with values
-        items = [(self.tree.item(item)["values"], item) for item in self.tree.get_children()]
-
-        # Get column index
-        col_idx = list(self.tree["columns"]).index(col)
-
-        # Sort
-        items.sort(key=lambda x: str(x[0][col_idx]).lower() if x[0][col_idx] else "", reverse=self.sort_reverse)
-
-        # Rearrange items
-        for idx, (vals, item) in enumerate(items):
-            self.tree.move(item, "", idx)
-
-        # Update heading to show sort direction
-        arrow = " ▼" if self.sort_reverse else " ▲"
-        for c in self.tree["columns"]:
-            heading_text = {"id": "ID", "dipendente": "Dipendente", "corso": "Documento",
-                           "categoria": "Categoria", "emissione": "Data Rilascio", "scadenza": "Data Scadenza"}.get(c, c)
-            if c == col:
-                self.tree.heading(c, text=heading_text + arrow)
-            else:
-                self.tree.heading(c, text=heading_text)
+            self.filter_data()
 
     def select_all(self, event=None):
         """Select all items in the tree."""
@@ -418,33 +413,54 @@ class ValidationView(tk.Frame):
     def refresh_data(self):
         def fetch():
             try:
-                new_data = self.controller.api_client.get("certificati", params={"validated": "false"})
+                corsi = self.controller.api_client.get("corsi")
                 if self.winfo_exists():
-                    self.after(0, lambda: self._update_data(new_data))
-            except Exception as e:
-                if self.winfo_exists():
-                    self.after(0, lambda: messagebox.showerror("Errore", str(e)))
+                    self.after(0, lambda: self._update_filter_options(corsi))
+            except Exception:
+                pass  # Category list is a convenience; the grid still loads
 
         threading.Thread(target=fetch, daemon=True).start()
+        self.reload_data()
+        # Orphans: pending certificates not linked to any employee
+        self.orphan_loader.reload(validated=False, assegnato=False)
+
+    def _schedule_reload(self):
+        """Debounces typing in the search box: one server query per pause."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(300, self.reload_data)
+
+    def reload_data(self):
+        self._search_job = None
+        cat_filter = self.combo_categoria.get()
+        filters = {
+            "validated": False,
+            "assegnato": True,
+            "search": self.entry_search.get().strip(),
+            "categoria": cat_filter if cat_filter != "Tutte" else None,
+        }
+        if self.sorter.column:
+            filters["sort"] = self.SORT_KEYS[self.sorter.column]
+            filters["order"] = "desc" if self.sorter.reverse else "asc"
+        self.loader.reload(**filters)
+
+    def _on_page(self, rows, total, replace):
+        self.data = self.loader.rows
+        if replace:
+            self.index = SearchIndex(self.data, display=self._row, sort_keys=self.SORT_FIELDS)
+            self.tree.yview_moveto(0)
+        else:
+            self.index.extend(rows)  # Only the new page is prepared
+        self.tree.set_rows(self._build_rows())
+        self._update_count()
 
-    def _update_data(self, new_data):
-        # Separate orphans from regular pending certificates
-        self.data = [c for c in new_data if c.get("dipendente_id") or c.get("matricola")]
-        self.orphan_data = [c for c in new_data if not c.get("dipendente_id") and not c.get("matricola")]
-
-        self._update_filter_options()
-        self.filter_data()
+    def _on_orphan_page(self, rows, total, replace):
+        self.orphan_data = self.orphan_loader.rows
         self._filter_orphans()
 
-    def _update_filter_options(self):
-        """Update filter dropdown to show only available options in current data."""
-        # Get unique categories from data
-        categories = set()
-
-        for item in self.data:
-            cat = item.get("categoria")
-            if cat:
-                categories.add(cat.upper())
+    def _update_filter_options(self, corsi):
+        """Update the category dropdown with every category known to the server."""
+        categories = {c.get("categoria_corso").upper() for c in corsi if c.get("categoria_corso")}
 
         # Update category combobox
         current_cat = self.combo_categoria.get()
@@ -454,66 +470,59 @@ class ValidationView(tk.Frame):
             self.combo_categoria.set("Tutte")
 
     def filter_data(self):
-        query = self.entry_search.get().lower()
-        cat_filter = self.combo_categoria.get()
+        """Re-applies the advanced column filters and the sort to the rows loaded so far."""
+        self.tree.set_rows(self._build_rows())
+        self._update_count()
+
+    def _update_count(self):
+        count = self.tree.row_count
+        if self.loader.has_more:
+            self.lbl_count.config(text=f"{count} di {self.loader.total} da convalidare")
+        else:
+            self.lbl_count.config(text=f"{count} da convalidare")
+
+    @staticmethod
+    def _row(item):
+        scad = item.get("data_scadenza")
+        if not scad or scad.lower() == "none":
+            scad = "NESSUNA"
+
+        return (
+            item.get("id"),
+            item.get("nome") or "N/D",
+            item.get("corso") or "N/D",
+            item.get("categoria") or "ALTRO",
+            item.get("data_rilascio") or "",
+            scad
+        )
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def _row_order(self):
+        # Partially loaded data keeps the server order, so later pages append correctly
+        if self.sorter.column and not self.loader.has_more:
+            return self.index.search(order_by=self.sorter.column, descending=self.sorter.reverse)
+        return range(len(self.index))
 
+    def _build_rows(self):
+        """Yields (item_id, values, tags) for the loaded rows that pass the column filters."""
+        columns = self.tree["columns"]
+        check_filter = getattr(self.tree, "check_filter", None)
         count = 0
-        for idx, item in enumerate(self.data):
-            nome = str(item.get("nome") or "").lower()
-            corso = str(item.get("corso") or "").lower()
-            categoria = str(item.get("categoria") or "").lower()
-
-            # Apply Category Filter
-            if cat_filter != "Tutte" and (item.get("categoria") or "").upper() != cat_filter.upper():
-                continue
-
-            # Apply Search Filter
-            if query and query not in nome and query not in corso and query not in categoria:
-                continue
-
-            scad = item.get("data_scadenza")
-            if not scad or scad.lower() == "none":
-                scad = "NESSUNA"
-
-            # Apply advanced column filters
-            values = (
-                item.get("id"),
-                item.get("nome") or "N/D",
-                item.get("corso") or "N/D",
-                item.get("categoria") or "ALTRO",
-                item.get("data_rilascio") or "",
-                scad
-            )
+        for i in self._row_order():
+            values = self.index.display[i]
 
             # Check column filters
-            if hasattr(self.tree, 'check_filter'):
-                columns = ["id", "dipendente", "corso", "categoria", "emissione", "scadenza"]
-                skip = False
-                for col_idx, col in enumerate(columns):
-                    if not self.tree.check_filter(col, values[col_idx]):
-                        skip = True
-                        break
-                if skip:
-                    continue
+            if check_filter and not all(check_filter(col, values[col_idx]) for col_idx, col in enumerate(columns)):
+                continue
 
             # Alternating row colors
             tag = "odd" if count % 2 == 0 else "even"
 
-            self.tree.insert("", "end", values=values, tags=(tag,))
+            yield values[0], values, (tag,)
             count += 1
 
-        self.lbl_count.config(text=f"{count} da convalidare")
-
     def _filter_orphans(self):
         """Update the orphan certificates tree."""
-        # Clear existing items
-        for item in self.tree_orphans.get_children():
-            self.tree_orphans.delete(item)
-
-        count = 0
+        rows = []
         for item in self.orphan_data:
             scad = item.get("data_scadenza")
             if not scad or scad.lower() == "none":
@@ -527,9 +536,10 @@ class ValidationView(tk.Frame):
                 item.get("data_rilascio") or "",
                 scad
             )
-            self.tree_orphans.insert("", "end", values=values, tags=("orphan",))
-            count += 1
+            rows.append((item.get("id"), values, ("orphan",)))
+        self.tree_orphans.set_rows(rows)
 
+        count = max(len(rows), self.orphan_loader.total)
         self.lbl_orphan_count.config(text=f"{count} orfani")
 
         # Update tab label with count
@@ -591,7 +601,7 @@ class ValidationView(tk.Frame):
     def _validate_single_cert(self, cert_id):
         """Validate a single certificate."""
         url_val = f"{self.controller.api_client.base_url}/certificati/{cert_id}/valida"
-        res = requests.put(url_val, headers=self.controller.api_client._get_headers())
+        res = self.controller.api_client.session.put(url_val, headers=self.controller.api_client._get_headers())
         res.raise_for_status()
         return cert_id
 
@@ -688,7 +698,7 @@ class ValidationDialog(tk.Toplevel):
 
             # 2. Validate Endpoint (Using PUT as per backend)
             url_val = f"{self.controller.api_client.base_url}/certificati/{self.cert['id']}/valida"
-            requests.put(url_val, headers=self.controller.api_client._get_headers())
+            self.controller.api_client.session.put(url_val, headers=self.controller.api_client._get_headers())
 
             messagebox.showinfo("Successo", "Certificato convalidato.")
             self.parent_view.refresh_data()
@@ -718,6 +728,8 @@ class AssignOrphanDialog(tk.Toplevel):
         self.selected_items = selected_items
         self.orphan_data = orphan_data
         self.dipendenti = dipendenti
+        self.index = SearchIndex(dipendenti, text=(self._employee_label,), display=self._employee_label)
+        self._search_job = None
 
         self.title(f"Assegna {len(selected_items)} Certificato/i Orfano/i")
         self.geometry("550x450")
@@ -792,30 +804,29 @@ class AssignOrphanDialog(tk.Toplevel):
                   font=("Segoe UI", 10, "bold"), width=15,
                   command=self._assign).pack(side="right")
 
+    @staticmethod
+    def _employee_label(dip):
+        display = f"{dip.get('cognome', '')} {dip.get('nome', '')}".strip()
+        if dip.get("matricola"):
+            display += f" ({dip['matricola']})"
+        return display
+
     def _populate_employees(self, filter_text=""):
         """Populate employee listbox."""
+        self._search_job = None
         self.employee_listbox.delete(0, tk.END)
-        self.filtered_dipendenti = []
-
-        filter_text = filter_text.lower()
-
-        for dip in self.dipendenti:
-            cognome = dip.get("cognome", "")
-            nome = dip.get("nome", "")
-            matricola = dip.get("matricola", "")
-            display = f"{cognome} {nome}".strip()
-            if matricola:
-                display += f" ({matricola})"
-
-            if filter_text and filter_text not in display.lower():
-                continue
 
-            self.employee_listbox.insert(tk.END, display)
-            self.filtered_dipendenti.append(dip)
+        matches = self.index.search(filter_text)
+        self.filtered_dipendenti = [self.index.rows[i] for i in matches]
+        labels = [self.index.display[i] for i in matches]
+        if labels:
+            self.employee_listbox.insert(tk.END, *labels)
 
     def _filter_employees(self, *args):
-        """Filter employees based on search."""
-        self._populate_employees(self.search_var.get())
+        """Filter employees based on search, once typing pauses."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, lambda: self._populate_employees(self.search_var.get()))
 
     def _assign(self):
         """Assign selected certificates to selected employee."""
@@ -6,9 +6,18 @@ from desktop_app.widgets.advanced_filter import (
     FilterableTreeview,
     setup_filterable_treeview
 )
+from desktop_app.widgets.paged_loader import PagedLoader
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+from desktop_app.widgets.search_index import SearchIndex, parse_date_key
+from desktop_app.widgets.column_sorter import ColumnSorter
 
 __all__ = [
     'AdvancedFilterPopup',
     'FilterableTreeview',
-    'setup_filterable_treeview'
+    'setup_filterable_treeview',
+    'PagedLoader',
+    'VirtualTreeview',
+    'SearchIndex',
+    'parse_date_key',
+    'ColumnSorter'
 ]
@@ -4,8 +4,40 @@ Provides Excel-like filtering with multi-select, search, and date tree grouping.
 """
 import tkinter as tk
 from tkinter import ttk
-from datetime import datetime
 from collections import defaultdict
+from desktop_app.widgets.search_index import parse_date_key
+
+EMPTY_LABEL = "(Vuoto)"
+
+
+class DateKeyCache(dict):
+    """
+    Maps a raw cell value to its date filter key, parsing each distinct value once:
+    a (year, month, day) tuple, EMPTY_LABEL for blanks, or the text itself if it
+    is not a date. Shared by the popup and the row predicate of a tree, so
+    evaluating a date filter costs one dict lookup per row.
+    """
+
+    MAX_SIZE = 100000
+
+    def __missing__(self, value):
+        if len(self) >= self.MAX_SIZE:
+            self.clear()
+        text = str(value).strip() if value is not None else ""
+        if not text or text.lower() in ("none", "nessuna"):
+            key = EMPTY_LABEL
+        else:
+            key = parse_date_key(text) or text
+        self[value] = key
+        return key
+
+
+def get_date_keys(tree):
+    """Returns the DateKeyCache attached to `tree`, creating it on first use."""
+    cache = getattr(tree, "_date_keys", None)
+    if cache is None:
+        cache = tree._date_keys = DateKeyCache()
+    return cache
 
 
 class AdvancedFilterPopup(tk.Toplevel):
@@ -139,12 +171,12 @@ class AdvancedFilterPopup(tk.Toplevel):
         for item in self.tree.get_children():
             val = self.tree.item(item)["values"][col_idx]
             if val is not None:
-                values.append(str(val))
+                values.append(val)
 
         if self.is_date_column:
             self._load_date_tree(values)
         else:
-            self._load_flat_list(values)
+            self._load_flat_list([str(v) for v in values])
 
     def _load_flat_list(self, values):
         """Load values as flat checkbox list."""
@@ -153,7 +185,7 @@ class AdvancedFilterPopup(tk.Toplevel):
 
         # Include empty/none option
         if any(not v or v.lower() == "none" for v in values):
-            unique_values = ["(Vuoto)"] + list(unique_values)
+            unique_values = [EMPTY_LABEL] + list(unique_values)
 
         self.checkboxes = {}
         for value in unique_values:
@@ -166,21 +198,17 @@ class AdvancedFilterPopup(tk.Toplevel):
 
     def _load_date_tree(self, values):
         """Load date values as hierarchical tree (Year > Month > Day)."""
-        # Parse dates and group by year/month
+        # Group the distinct date keys by year/month
         date_tree = defaultdict(lambda: defaultdict(set))
         unparsed = set()
 
-        for val in values:
-            if not val or val.lower() == "none" or val == "NESSUNA":
-                unparsed.add("(Vuoto)")
-                continue
-
-            parsed = self._parse_date(val)
-            if parsed:
-                year, month, day = parsed
+        date_keys = get_date_keys(self.tree)
+        for key in {date_keys[val] for val in values}:
+            if isinstance(key, tuple):
+                year, month, day = key
                 date_tree[year][month].add(day)
             else:
-                unparsed.add(val)
+                unparsed.add(key)
 
         self.checkboxes = {}
         self.year_vars = {}
@@ -246,17 +274,6 @@ class AdvancedFilterPopup(tk.Toplevel):
                 cb.pack(anchor="w", pady=1, padx=5)
                 self.checkboxes[val] = var
 
-    def _parse_date(self, val):
-        """Parse date string and return (year, month, day) tuple."""
-        formats = ["%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y"]
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(str(val).strip(), fmt)
-                return (dt.year, dt.month, dt.day)
-            except:
-                continue
-        return None
-
     def _get_month_name(self, month):
         """Get Italian month name."""
         months = ["", "Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno",
@@ -380,6 +397,7 @@ class FilterableTreeview(ttk.Treeview):
         self.column_filters = {}  # column -> (filter_type, filter_data)
         self.original_data = []  # Store original data for filtering
         self.column_display_names = {}  # column id -> display name
+        self._date_keys = DateKeyCache()
 
         # Bind right-click on headings
         self.bind("<Button-3>", self._on_header_right_click)
@@ -442,35 +460,16 @@ class FilterableTreeview(ttk.Treeview):
         filter_type, filter_data = self.column_filters[column]
 
         if filter_type == "values":
-            str_val = str(value) if value else "(Vuoto)"
+            str_val = str(value) if value else EMPTY_LABEL
             if not value or str(value).lower() == "none":
-                str_val = "(Vuoto)"
+                str_val = EMPTY_LABEL
             return str_val in filter_data
 
         elif filter_type == "date":
-            if not value or str(value).lower() in ["none", "nessuna", ""]:
-                return "(Vuoto)" in filter_data
-
-            # Parse the date
-            parsed = self._parse_date_value(value)
-            if parsed:
-                return parsed in filter_data
-            else:
-                return str(value) in filter_data
+            return self._date_keys[value] in filter_data
 
         return True
 
-    def _parse_date_value(self, val):
-        """Parse date value to tuple."""
-        formats = ["%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y"]
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(str(val).strip(), fmt)
-                return (dt.year, dt.month, dt.day)
-            except:
-                continue
-        return None
-
     def has_active_filters(self):
         """Check if any filters are active."""
         return len(self.column_filters) > 0
@@ -493,6 +492,7 @@ def setup_filterable_treeview(tree, column_names):
     # Store column filters
     tree._column_filters = {}
     tree._column_display_names = column_names
+    date_keys = get_date_keys(tree)
 
     def on_header_right_click(event):
         region = tree.identify_region(event.x, event.y)
@@ -534,23 +534,13 @@ def setup_filterable_treeview(tree, column_names):
         ftype, fdata = tree._column_filters[column]
 
         if ftype == "values":
-            str_val = str(value) if value else "(Vuoto)"
+            str_val = str(value) if value else EMPTY_LABEL
             if not value or str(value).lower() in ["none", "nessuna"]:
-                str_val = "(Vuoto)"
+                str_val = EMPTY_LABEL
             return str_val in fdata
 
         elif ftype == "date":
-            if not value or str(value).lower() in ["none", "nessuna", ""]:
-                return "(Vuoto)" in fdata
-
-            # Parse date
-            for fmt in ["%d/%m/%Y", "%Y-%m-%d"]:
-                try:
-                    dt = datetime.strptime(str(value).strip(), fmt)
-                    return (dt.year, dt.month, dt.day) in fdata
-                except:
-                    continue
-            return str(value) in fdata
+            return date_keys[value] in fdata
 
         return True
 
@@ -0,0 +1,42 @@
+"""
+Click-to-sort column headings shared by the grid views.
+Holds the sort state and the heading arrows; the view decides how to sort
+(typed keys on its SearchIndex, or a server reload when only part of the
+data is loaded).
+"""
+
+
+class ColumnSorter:
+    """
+    Binds every heading of `tree` so a click sorts by that column and a second
+    click reverses the direction. on_sort() runs after every change.
+    """
+
+    ARROW_ASC = " ▲"
+    ARROW_DESC = " ▼"
+
+    def __init__(self, tree, headings, on_sort, column=None, reverse=False):
+        self.tree = tree
+        self.headings = headings
+        self.on_sort = on_sort
+        self.column = column
+        self.reverse = reverse
+
+        for col in tree["columns"]:
+            tree.heading(col, command=lambda c=col: self.toggle(c))
+        self._update_headings()
+
+    def toggle(self, column):
+        if self.column == column:
+            self.reverse = not self.reverse
+        else:
+            self.column = column
+            self.reverse = False
+        self._update_headings()
+        self.on_sort()
+
+    def _update_headings(self):
+        arrow = self.ARROW_DESC if self.reverse else self.ARROW_ASC
+        for col in self.tree["columns"]:
+            text = self.headings.get(col, col)
+            self.tree.heading(col, text=text + arrow if col == self.column else text)
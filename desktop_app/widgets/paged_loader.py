@@ -0,0 +1,99 @@
+"""
+Paged loading for grids backed by GET /certificati/.
+Fetches pages in a background thread and asks for the next one when the
+user scrolls near the bottom of the Treeview.
+"""
+import threading
+
+
+class PagedLoader:
+    """
+    Keeps the server-side filters, the keyset cursor and the loaded rows of a view.
+    - reload(filters) restarts from the first page (e.g. a filter changed).
+    - load_more() fetches the next page, if any.
+    on_page(rows, total, replace) runs on the Tk thread after every page.
+    Responses for superseded filters are discarded.
+    """
+
+    PAGE_SIZE = 200
+    SCROLL_THRESHOLD = 0.9  # Fraction of the scroll range that triggers the next page
+
+    def __init__(self, widget, api_client, on_page, on_error=None, page_size=None):
+        self.widget = widget
+        self.api_client = api_client
+        self.on_page = on_page
+        self.on_error = on_error
+        self.page_size = page_size or self.PAGE_SIZE
+
+        self.filters = {}
+        self.rows = []
+        self.total = 0
+        self.next_cursor = None
+        self._generation = 0
+        self._loading = False
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def reload(self, **filters):
+        self.filters = filters
+        self._generation += 1
+        self.rows = []
+        self.total = 0
+        self.next_cursor = None
+        self._fetch(cursor=None, replace=True)
+
+    def load_more(self):
+        if self._loading or not self.has_more:
+            return
+        self._fetch(cursor=self.next_cursor, replace=False)
+
+    def _fetch(self, cursor, replace):
+        generation = self._generation
+        self._loading = True
+
+        def task():
+            try:
+                page = self.api_client.get_certificati_page(limit=self.page_size, cursor=cursor, **self.filters)
+            except Exception as e:
+                self._schedule(lambda error=e: self._fail(generation, error))  # `e` is unbound after the except block
+                return
+            self._schedule(lambda: self._apply(generation, page, replace))
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def _schedule(self, callback):
+        try:
+            if self.widget.winfo_exists():
+                self.widget.after(0, callback)
+        except Exception:
+            pass  # Widget destroyed while the request was running
+
+    def _apply(self, generation, page, replace):
+        if generation != self._generation:
+            return  # Filters changed meanwhile
+        self._loading = False
+        if replace:
+            self.rows = list(page["items"])
+        else:
+            self.rows.extend(page["items"])
+        self.total = page["total"]
+        self.next_cursor = page["next_cursor"]
+        self.on_page(page["items"], self.total, replace)
+
+    def _fail(self, generation, error):
+        if generation != self._generation:
+            return
+        self._loading = False
+        if self.on_error:
+            self.on_error(error)
+
+    def attach_scroll(self, tree, scrollbar):
+        """Routes the Treeview's scroll updates through the loader to fetch pages on demand."""
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            if float(last) >= self.SCROLL_THRESHOLD:
+                self.load_more()
+
+        tree.configure(yscrollcommand=on_scroll)
@@ -0,0 +1,158 @@
+"""
+Columnar search index for client-side filtering.
+Built once per data refresh (and extended page by page) so each keystroke
+only intersects bitsets and scans pre-lowercased strings.
+"""
+import re
+from datetime import date
+
+_DATE_RE = re.compile(r"^\s*(\d{1,4})[/\-.](\d{1,2})[/\-.](\d{1,4})")
+
+
+def parse_date_key(value):
+    """
+    Parses DD/MM/YYYY or ISO YYYY-MM-DD (with optional time) into a sortable
+    (year, month, day) tuple. Returns None for empty or unparseable values.
+    """
+    if not value:
+        return None
+    match = _DATE_RE.match(str(value))
+    if not match:
+        return None
+    first, month, last = match.groups()
+    if len(first) == 4:
+        year, day = first, last
+    elif len(last) == 4:
+        year, day = last, first
+    else:
+        return None
+    try:
+        parsed = date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    return parsed.year, parsed.month, parsed.day
+
+
+# Typed sort keys. Each returns (is_missing, value) so blanks sort last and
+# values of different types are never compared with each other.
+
+def int_key(value):
+    try:
+        return 0, int(value)
+    except (TypeError, ValueError):
+        return 1, 0
+
+
+def text_key(value):
+    text = str(value).strip() if value is not None else ""
+    return (0, text.casefold()) if text else (1, "")
+
+
+def date_key(value):
+    parsed = parse_date_key(value)
+    return (0, parsed) if parsed else (1, ())
+
+
+class SearchIndex:
+    """
+    Prepared view of a list of row dicts.
+    - text: callables whose results are lowercased and joined into one
+      searchable string per row.
+    - facets: {name: callable}; each distinct value maps to a bitset of rows.
+    - display: optional callable building the Treeview values of a row, so
+      views don't re-format rows on every filter pass.
+    - sort_keys: {column: callable} returning typed keys (see int_key, text_key,
+      date_key); each column's sort permutation is computed once.
+    """
+
+    _SEPARATOR = "\x1f"  # Keeps a query from matching across two fields
+
+    def __init__(self, rows, text=(), facets=None, display=None, sort_keys=None):
+        self.rows = []
+        self.haystacks = []
+        self.facets = {name: {} for name in (facets or {})}
+        self.display = [] if display else None
+        self.sort_keys = dict(sort_keys or {})
+        self._orders = {}
+        self._text = tuple(text)
+        self._facet_fields = dict(facets or {})
+        self._display = display
+        self.extend(rows)
+
+    def extend(self, rows):
+        """
+        Appends `rows` to the index, preparing only the new ones (e.g. the next
+        page of a paged grid). Cached sort orders are dropped.
+        """
+        start = len(self.rows)
+        new_rows = list(rows)
+        self.rows.extend(new_rows)
+        self.haystacks.extend(
+            self._SEPARATOR.join(str(field(row) or "").lower() for field in self._text)
+            for row in new_rows
+        )
+        for name, field in self._facet_fields.items():
+            bitsets = self.facets[name]
+            for i, row in enumerate(new_rows, start):
+                value = field(row)
+                bitsets[value] = bitsets.get(value, 0) | (1 << i)
+        if self._display:
+            self.display.extend(self._display(row) for row in new_rows)
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def facet_values(self, name):
+        return [value for value in self.facets[name] if value is not None]
+
+    def order(self, column, descending=False):
+        """Row positions sorted by `column`, cached per column and direction."""
+        cache_key = (column, descending)
+        if cache_key not in self._orders:
+            field = self.sort_keys[column]
+            keys = [field(row) for row in self.rows]
+            self._orders[cache_key] = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+        return self._orders[cache_key]
+
+    def search(self, query="", order_by=None, descending=False, **facets):
+        """
+        Returns the positions of the rows whose text contains `query` and whose
+        facet values are among the given ones (None means no constraint),
+        sorted by the `order_by` column if given, otherwise in data order.
+        """
+        matches = self._match(query, facets)
+        if order_by is None:
+            return matches
+        order = self.order(order_by, descending)
+        if len(matches) == len(order):
+            return list(order)
+        wanted = set(matches)
+        return [i for i in order if i in wanted]
+
+    def _match(self, query, facets):
+        candidates = range(len(self.rows))
+        mask = None
+        for name, values in facets.items():
+            if values is None:
+                continue
+            if isinstance(values, (str, int)):
+                values = (values,)
+            bitsets = self.facets[name]
+            selected = 0
+            for value in values:
+                selected |= bitsets.get(value, 0)
+            mask = selected if mask is None else mask & selected
+        if mask is not None:
+            bits = bin(mask)[:1:-1]  # Least significant bit first
+            candidates = [i for i, bit in enumerate(bits) if bit == "1"]
+
+        query = (query or "").strip().lower()
+        if not query:
+            return list(candidates)
+        haystacks = self.haystacks
+        return [i for i in candidates if query in haystacks[i]]
+
+    def select(self, query="", order_by=None, descending=False, **facets):
+        """Like search(), but returns the rows themselves."""
+        return [self.rows[i] for i in self.search(query, order_by, descending, **facets)]
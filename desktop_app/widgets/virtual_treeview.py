@@ -0,0 +1,337 @@
+"""
+Virtualized Treeview for large flat grids.
+Rows live in a Python list; only the rows that fit in the viewport exist as Tk items.
+"""
+import tkinter as tk
+from tkinter import ttk
+from itertools import count
+
+
+class VirtualTreeview(ttk.Treeview):
+    """
+    Drop-in replacement for a flat, headings-only ttk.Treeview.
+    - set_rows() replaces the whole model in one call (no per-row Tk round-trips).
+    - insert/delete/get_children/item/selection keep the ttk semantics but operate on
+      the model, so item IDs stay valid for rows that are scrolled out of view.
+    - The scrollbar and mouse wheel map to an offset into the model; only the
+      visible slice is materialized, so rendering cost is independent of row count.
+    """
+
+    DEFAULT_ROW_HEIGHT = 20
+    WHEEL_ROWS = 3
+
+    def __init__(self, master=None, **kw):
+        self._yscrollcommand = kw.pop("yscrollcommand", None) or kw.pop("yscroll", None)
+        super().__init__(master, **kw)
+
+        self._keys = []          # Row order (item IDs)
+        self._rows = {}          # item ID -> (values, tags)
+        self._selected = set()
+        self._offset = 0
+        self._visible = 0
+        self._render_job = None
+        self._replace_selection = False
+        self._auto_ids = count(1)
+
+        self.bind("<Configure>", lambda e: self._schedule_render(), add="+")
+        self.bind("<<TreeviewSelect>>", self._on_tk_select, add="+")
+        self.bind("<ButtonPress-1>", self._on_click, add="+")
+        self.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind("<Button-4>", lambda e: self._scroll_rows(-self.WHEEL_ROWS), add="+")
+        self.bind("<Button-5>", lambda e: self._scroll_rows(self.WHEEL_ROWS), add="+")
+        for key, delta in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page")):
+            self.bind(key, lambda e, d=delta: self._on_key_scroll(d), add="+")
+        self.bind("<Home>", lambda e: self._jump(0), add="+")
+        self.bind("<End>", lambda e: self._jump(len(self._keys)), add="+")
+
+    # --- Model API ---
+
+    def set_rows(self, rows):
+        """
+        Replaces every row. `rows` yields (item_id, values, tags); item_id may be None.
+        Selection is kept for rows that are still present.
+        """
+        self._keys = []
+        self._rows = {}
+        for iid, values, tags in rows:
+            iid = str(iid) if iid is not None else self._next_id()
+            if iid in self._rows:
+                iid = self._next_id()
+            self._keys.append(iid)
+            self._rows[iid] = (tuple(values), tuple(tags or ()))
+        self._selected &= self._rows.keys()
+        self._offset = min(self._offset, self._max_offset())
+        self._render()
+
+    def clear(self):
+        self.set_rows(())
+
+    @property
+    def row_count(self):
+        return len(self._keys)
+
+    # --- ttk.Treeview overrides ---
+
+    def insert(self, parent, index, iid=None, **kw):
+        iid = str(iid) if iid is not None else self._next_id()
+        values = tuple(kw.get("values", ()))
+        tags = kw.get("tags", ())
+        tags = (tags,) if isinstance(tags, str) else tuple(tags)
+        position = self._position(index)
+        if position is None:
+            self._keys.append(iid)
+        else:
+            self._keys.insert(position, iid)
+        self._rows[iid] = (values, tags)
+        self._schedule_render()
+        return iid
+
+    def delete(self, *items):
+        doomed = {str(i) for i in self._flatten(items)}
+        if not doomed:
+            return
+        if doomed >= self._rows.keys():
+            self._keys = []
+            self._rows = {}
+        else:
+            self._keys = [k for k in self._keys if k not in doomed]
+            for iid in doomed:
+                self._rows.pop(iid, None)
+        self._selected -= doomed
+        self._schedule_render()
+
+    def get_children(self, item=None):
+        return tuple(self._keys) if not item else ()
+
+    def exists(self, item):
+        return str(item) in self._rows
+
+    def index(self, item):
+        return self._keys.index(str(item))
+
+    def item(self, item, option=None, **kw):
+        if isinstance(item, (tuple, list)):
+            item = item[0]
+        iid = str(item)
+        if iid not in self._rows:
+            return super().item(item, option, **kw)
+
+        values, tags = self._rows[iid]
+        if kw:
+            values = tuple(kw.get("values", values))
+            tags = kw.get("tags", tags)
+            tags = (tags,) if isinstance(tags, str) else tuple(tags)
+            self._rows[iid] = (values, tags)
+            self._schedule_render()
+            return None
+
+        info = {"text": "", "image": "", "values": list(values), "open": 0, "tags": list(tags)}
+        return info[option] if option else info
+
+    def set(self, item, column=None, value=None):
+        values, tags = self._rows[str(item)]
+        columns = list(self["columns"])
+        if column is None:
+            return dict(zip(columns, values))
+        idx = columns.index(column) if not isinstance(column, int) else column
+        if value is None:
+            return values[idx]
+        values = list(values) + [""] * (len(columns) - len(values))
+        values[idx] = value
+        self._rows[str(item)] = (tuple(values), tags)
+        self._schedule_render()
+
+    def selection(self):
+        return tuple(k for k in self._keys if k in self._selected)
+
+    def selection_set(self, *items):
+        self._selected = {str(i) for i in self._flatten(items)} & self._rows.keys()
+        self._sync_tk_selection()
+
+    def selection_add(self, *items):
+        self._selected |= {str(i) for i in self._flatten(items)} & self._rows.keys()
+        self._sync_tk_selection()
+
+    def selection_remove(self, *items):
+        self._selected -= {str(i) for i in self._flatten(items)}
+        self._sync_tk_selection()
+
+    def see(self, item):
+        pos = self._keys.index(str(item))
+        if pos < self._offset:
+            self._offset = pos
+        elif pos >= self._offset + self._visible:
+            self._offset = pos - self._visible + 1
+        self._render()
+
+    def yview(self, *args):
+        if not args:
+            return self._fractions()
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * len(self._keys))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            step = max(1, self._visible - 1) if args[2] == "pages" else 1
+            self._offset += amount * step
+        self._render()
+
+    def yview_moveto(self, fraction):
+        self.yview("moveto", fraction)
+
+    def yview_scroll(self, number, what):
+        self.yview("scroll", number, what)
+
+    def configure(self, cnf=None, **kw):
+        if isinstance(cnf, dict):
+            kw = {**cnf, **kw}
+            cnf = None
+        intercepted = False
+        for key in ("yscrollcommand", "yscroll"):
+            if key in kw:
+                self._yscrollcommand = kw.pop(key)
+                intercepted = True
+        if intercepted:
+            self._notify_scroll()
+            if not kw:
+                return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    # --- Rendering ---
+
+    def _next_id(self):
+        return f"V{next(self._auto_ids)}"
+
+    def _position(self, index):
+        """
+        Model position for an insert() index, as ttk reads it: "end" or past the
+        last row appends (None), ints and numeric strings are clamped at 0.
+        """
+        if index == "end":
+            return None
+        try:
+            position = int(index)
+        except (TypeError, ValueError):
+            raise tk.TclError(f'expected integer but got "{index}"') from None
+        return None if position >= len(self._keys) else max(position, 0)
+
+    @staticmethod
+    def _flatten(items):
+        flat = []
+        for item in items:
+            if isinstance(item, (tuple, list)):
+                flat.extend(item)
+            else:
+                flat.append(item)
+        return flat
+
+    def _row_height(self):
+        style = ttk.Style(self)
+        height = style.lookup(self.cget("style") or "Treeview", "rowheight")
+        try:
+            return int(height) or self.DEFAULT_ROW_HEIGHT
+        except (TypeError, ValueError):
+            return self.DEFAULT_ROW_HEIGHT
+
+    def _visible_rows(self):
+        row_height = self._row_height()
+        # One row's worth of space is reserved for the headings
+        height = self.winfo_height() - row_height - 4
+        if height <= 0:
+            return int(self.cget("height") or 10)
+        return max(1, height // row_height)
+
+    def _max_offset(self):
+        return max(0, len(self._keys) - max(self._visible, 1))
+
+    def _schedule_render(self):
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self):
+        if self._render_job is not None:
+            try:
+                self.after_cancel(self._render_job)
+            except tk.TclError:
+                pass
+            self._render_job = None
+
+        self._visible = self._visible_rows()
+        self._offset = max(0, min(self._offset, self._max_offset()))
+
+        window = self._keys[self._offset:self._offset + self._visible]
+        super().delete(*super().get_children())
+        for iid in window:
+            values, tags = self._rows[iid]
+            super().insert("", "end", iid=iid, values=values, tags=tags)
+
+        self._sync_tk_selection()
+        self._notify_scroll()
+
+    def _sync_tk_selection(self):
+        visible_selected = [k for k in super().get_children() if k in self._selected]
+        super().selection_set(visible_selected)
+
+    def _fractions(self):
+        total = len(self._keys)
+        if not total:
+            return 0.0, 1.0
+        first = self._offset / total
+        last = min(1.0, (self._offset + self._visible) / total)
+        return first, last
+
+    def _notify_scroll(self):
+        if self._yscrollcommand:
+            self._yscrollcommand(*self._fractions())
+
+    # --- Events ---
+
+    def _on_click(self, event):
+        # Plain clicks replace the selection, including rows scrolled out of view;
+        # Shift/Control clicks extend it
+        self._replace_selection = not (event.state & 0x0005)
+
+    def _on_tk_select(self, event):
+        visible = set(super().get_children())
+        tk_selected = {str(i) for i in super().selection()}
+        if self._replace_selection:
+            self._selected = tk_selected
+        else:
+            self._selected = (self._selected - visible) | tk_selected
+        self._replace_selection = False
+
+    def _on_mousewheel(self, event):
+        self._scroll_rows(-self.WHEEL_ROWS if event.delta > 0 else self.WHEEL_ROWS)
+        return "break"
+
+    def _scroll_rows(self, rows):
+        self._offset += rows
+        self._render()
+        return "break"
+
+    def _on_key_scroll(self, delta):
+        focus = super().focus()
+        visible = super().get_children()
+        if delta == "page" or delta == "-page":
+            step = max(1, self._visible - 1)
+            self._scroll_rows(step if delta == "page" else -step)
+            return "break"
+        # Only scroll the window when the focus is about to leave it
+        if focus and visible and ((delta < 0 and focus == visible[0]) or (delta > 0 and focus == visible[-1])):
+            pos = self._keys.index(focus) + delta
+            if 0 <= pos < len(self._keys):
+                self._offset += delta
+                self._render()
+                target = self._keys[pos]
+                super().focus(target)
+                self._selected = {target}
+                self._sync_tk_selection()
+            return "break"
+        self._replace_selection = True
+        return None
+
+    def _jump(self, pos):
+        self._offset = pos
+        self._render()
+        return "break"
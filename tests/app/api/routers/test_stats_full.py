@@ -82,3 +82,40 @@ def test_get_compliance_by_category_logic(test_client, db_session, admin_token_h
     assert "active" in cat  # New field
     assert "expiring" in cat  # New field
     assert cat["compliance"] >= 0
+
+def create_status_edge_cases(db):
+    d1 = Dipendente(nome="D1", cognome="C1", matricola="1")
+    corso = Corso(nome_corso="C1", categoria_corso="CAT1", validita_mesi=12)
+    visita = Corso(nome_corso="VISITA MEDICA", categoria_corso="VISITA MEDICA", validita_mesi=12)
+    db.add_all([d1, corso, visita])
+    db.commit()
+
+    today = date.today()
+    between_thresholds = today + timedelta(days=(settings.ALERT_THRESHOLD_DAYS + settings.ALERT_THRESHOLD_DAYS_VISITE) // 2)
+    db.add_all([
+        # No expiry date
+        Certificato(dipendente_id=d1.id, corso_id=corso.id, data_rilascio=date(2023, 1, 1),
+                    data_scadenza_calcolata=None, stato_validazione=ValidationStatus.MANUAL),
+        # Older CAT1 certificate: archived by the one above
+        Certificato(dipendente_id=d1.id, corso_id=corso.id, data_rilascio=date(2020, 1, 1),
+                    data_scadenza_calcolata=today - timedelta(days=1), stato_validazione=ValidationStatus.MANUAL),
+        # Beyond the medical threshold, within the standard one
+        Certificato(dipendente_id=d1.id, corso_id=visita.id, data_rilascio=date(2024, 1, 1),
+                    data_scadenza_calcolata=between_thresholds, stato_validazione=ValidationStatus.MANUAL),
+        # Within the medical threshold
+        Certificato(dipendente_id=d1.id, corso_id=visita.id, data_rilascio=date(2023, 1, 1),
+                    data_scadenza_calcolata=today + timedelta(days=1), stato_validazione=ValidationStatus.MANUAL),
+    ])
+    db.commit()
+
+def test_stats_buckets_follow_certificate_statuses(test_client, db_session, admin_token_headers):
+    assert settings.ALERT_THRESHOLD_DAYS_VISITE < settings.ALERT_THRESHOLD_DAYS
+    create_status_edge_cases(db_session)
+
+    summary = test_client.get("/stats/summary", headers=admin_token_headers).json()
+    assert (summary["total_certificati"], summary["validi"], summary["in_scadenza"], summary["scaduti"]) == (4, 2, 1, 1)
+    assert summary["compliance_percent"] == 75
+
+    by_category = {row["category"]: row for row in test_client.get("/stats/compliance", headers=admin_token_headers).json()}
+    assert by_category["CAT1"] == {"category": "CAT1", "total": 2, "active": 1, "expiring": 0, "expired": 1, "compliance": 50}
+    assert by_category["VISITA MEDICA"] == {"category": "VISITA MEDICA", "total": 2, "active": 1, "expiring": 1, "expired": 0, "compliance": 50}
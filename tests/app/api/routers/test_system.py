@@ -26,3 +26,20 @@ def test_optimize_endpoint_async():
          
          # Verify status
          assert result["status"] == "background_task_started"
+
+def test_save_metrics_endpoint():
+    with patch("app.core.db_security.db_security") as mock_security:
+        mock_security.get_save_metrics.return_value = {"mode": "full", "bytes_written": 10}
+
+        result = system.get_save_metrics()
+
+        assert result["bytes_written"] == 10
+
+def test_backups_endpoints():
+    mock_bg_tasks = MagicMock()
+    with patch("app.core.db_security.db_security") as mock_security:
+        mock_security.list_backups.return_value = [{"name": "a.bak", "integrity": "ok"}]
+
+        assert system.list_backups()[0]["name"] == "a.bak"
+        assert system.verify_backups(background_tasks=mock_bg_tasks, force=True) == {"status": "started"}
+        mock_bg_tasks.add_task.assert_called_once_with(mock_security.verify_backups, True)
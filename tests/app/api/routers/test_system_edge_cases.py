@@ -26,3 +26,13 @@ def test_open_action_generic_exception(test_client):
 
         assert res.status_code == 500
         assert "Bridge Broken" in res.json()["detail"]
+
+def test_sync_files_dry_run_returns_plan(test_client):
+    with patch("app.api.routers.system.synchronize_all_files", return_value={"planned": 0, "missing": 0, "dry_run": True, "moves": []}) as mock_sync, \
+         patch("app.api.routers.system.run_file_sync_task") as mock_task:
+        res = test_client.post("/system/sync-files?dry_run=true")
+
+        assert res.status_code == 200
+        assert res.json()["dry_run"] is True
+        assert mock_sync.call_args.kwargs == {"dry_run": True}
+        mock_task.assert_not_called()
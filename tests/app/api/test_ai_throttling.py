@@ -0,0 +1,50 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+
+def _blocking(started, release, result):
+    def call(*args, **kwargs):
+        started.set()
+        release.wait(10)
+        return result
+    return call
+
+
+@pytest.mark.parametrize("target, request_args, result", [
+    (
+        "app.services.ai_extraction.extract_entities_with_ai",
+        ("/upload-pdf/", {"files": {"file": ("a.pdf", b"%PDF-1.4 lento", "application/pdf")}}),
+        {"error": "Quota esaurita"},
+    ),
+    (
+        "app.api.routers.chat.chat_service.chat_with_intelleo",
+        ("/chat/", {"json": {"message": "Ciao"}}),
+        "Risposta",
+    ),
+])
+def test_throttled_ai_call_does_not_block_other_requests(test_client, target, request_args, result):
+    """A call held by the AI rate limiter must not stall the event loop."""
+    started, release = threading.Event(), threading.Event()
+    responses = {}
+    path, kwargs = request_args
+
+    with patch(target, side_effect=_blocking(started, release, result)), \
+         patch("app.api.routers.chat.chat_service.get_rag_context", return_value=""):
+        slow = threading.Thread(target=lambda: responses.update(slow=test_client.post(path, **kwargs)))
+        fast = threading.Thread(target=lambda: responses.update(fast=test_client.get("/health")))
+        slow.start()
+        try:
+            assert started.wait(5)
+            fast.start()
+            fast.join(5)
+            assert responses["fast"].status_code == 200
+            assert "slow" not in responses
+        finally:
+            release.set()
+            slow.join(5)
+            if fast.is_alive():
+                fast.join(5)
+
+    assert "slow" in responses
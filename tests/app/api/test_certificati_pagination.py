@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.db.models import Certificato, Corso, Dipendente, StatoCertificato, ValidationStatus
+
+def _populate(db_session: Session):
+    antincendio = Corso(nome_corso="ANTINCENDIO BASE", categoria_corso="ANTINCENDIO", validita_mesi=60)
+    visita = Corso(nome_corso="IDONEITA", categoria_corso="VISITA MEDICA", validita_mesi=12)
+    rossi = Dipendente(nome="Mario", cognome="Rossi", matricola="001")
+    bianchi = Dipendente(nome="Luca", cognome="Bianchi", matricola="002")
+    db_session.add_all([antincendio, visita, rossi, bianchi])
+    db_session.commit()
+
+    today = date.today()
+    certs = []
+    for i in range(10):
+        certs.append(Certificato(
+            dipendente_id=rossi.id if i % 2 else bianchi.id,
+            corso_id=antincendio.id if i < 6 else visita.id,
+            data_rilascio=date(2020, 1, 1) + timedelta(days=i),
+            data_scadenza_calcolata=today + timedelta(days=400 - i * 60) if i != 9 else None,
+            stato_validazione=ValidationStatus.MANUAL
+        ))
+    certs.append(Certificato(
+        dipendente_id=None, nome_dipendente_raw="Verdi Anna", corso_id=antincendio.id,
+        data_rilascio=date(2021, 1, 1), data_scadenza_calcolata=today - timedelta(days=5),
+        stato_validazione=ValidationStatus.AUTOMATIC
+    ))
+    db_session.add_all(certs)
+    db_session.commit()
+    return certs
+
+def _collect_pages(test_client, **params):
+    ids, cursor, totals = [], None, set()
+    while True:
+        query = dict(params, limit=3)
+        if cursor:
+            query["cursor"] = cursor
+        response = test_client.get("/certificati/", params=query)
+        assert response.status_code == 200
+        ids.extend(c["id"] for c in response.json())
+        totals.add(response.headers["X-Total-Count"])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids, totals
+
+def test_unpaged_listing_is_unchanged(test_client: TestClient, db_session: Session):
+    _populate(db_session)
+    response = test_client.get("/certificati/")
+    assert response.status_code == 200
+    assert len(response.json()) == 11
+    assert "X-Next-Cursor" not in response.headers
+
+def test_keyset_pages_cover_every_row_once(test_client: TestClient, db_session: Session):
+    _populate(db_session)
+    expected = [c["id"] for c in test_client.get("/certificati/", params={"sort": "data_scadenza"}).json()]
+
+    ids, totals = _collect_pages(test_client, sort="data_scadenza")
+    assert ids == expected
+    assert totals == {"11"}
+
+    ids_desc, _ = _collect_pages(test_client, sort="nome", order="desc")
+    assert sorted(ids_desc) == sorted(expected)
+    assert len(set(ids_desc)) == len(ids_desc)
+
+def test_server_side_filters(test_client: TestClient, db_session: Session):
+    _populate(db_session)
+
+    response = test_client.get("/certificati/", params={"search": "rossi", "limit": 50})
+    assert response.headers["X-Total-Count"] == "5"
+    assert all(c["nome"] == "Rossi Mario" for c in response.json())
+
+    response = test_client.get("/certificati/", params={"categoria": "visita medica"})
+    assert {c["categoria"] for c in response.json()} == {"VISITA MEDICA"}
+    assert len(response.json()) == 4
+
+    # Rossi's expired visita was renewed (archiviato); Bianchi's was not
+    response = test_client.get("/certificati/", params={"stato": "scaduto"})
+    assert sorted(c["nome"] for c in response.json()) == ["Bianchi Luca", "Verdi Anna"]
+
+    response = test_client.get("/certificati/", params={"validated": "false", "assegnato": "false"})
+    assert [c["nome"] for c in response.json()] == ["Verdi Anna"]
+
+    today = date.today()
+    response = test_client.get("/certificati/", params={
+        "scadenza_da": today.isoformat(), "scadenza_a": (today + timedelta(days=300)).isoformat()
+    })
+    assert len(response.json()) == 5
+
+def test_invalid_sort_and_cursor_are_rejected(test_client: TestClient, db_session: Session):
+    assert test_client.get("/certificati/", params={"sort": "file_path"}).status_code == 400
+    assert test_client.get("/certificati/", params={"limit": 5, "cursor": "not-a-cursor"}).status_code == 400
+
+def test_status_filter_without_current_rows_pages_fully(test_client: TestClient, db_session: Session):
+    _populate(db_session)
+    # As before the daily refresh: no status row is current
+    db_session.query(StatoCertificato).delete()
+    db_session.commit()
+
+    expected = sorted(c["id"] for c in test_client.get("/certificati/").json() if c["stato_certificato"] in ("scaduto", "archiviato"))
+    response = test_client.get("/certificati/", params={"stato": ["scaduto", "archiviato"], "limit": 2})
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == str(len(expected))
+
+    ids, totals = _collect_pages(test_client, stato=["scaduto", "archiviato"])
+    assert sorted(ids) == expected
+    assert totals == {str(len(expected))}
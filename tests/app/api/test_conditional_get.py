@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from datetime import timedelta
+from app.core.security import create_access_token
+from app.db.models import BlacklistedToken, Dipendente, User
+
+def test_unchanged_list_returns_304(test_client: TestClient, db_session: Session):
+    db_session.add(Dipendente(nome="Mario", cognome="Rossi", matricola="001"))
+    db_session.commit()
+
+    first = test_client.get("/dipendenti")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    second = test_client.get("/dipendenti", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+def test_304_requires_a_valid_token(test_client: TestClient, db_session: Session):
+    db_session.add(User(username="etag_user", hashed_password="x"))
+    db_session.commit()
+    valid = {"Authorization": f"Bearer {create_access_token({'sub': 'etag_user'})}"}
+    expired = {"Authorization": f"Bearer {create_access_token({'sub': 'etag_user'}, timedelta(minutes=-1))}"}
+
+    for headers in (valid, expired):
+        etag = test_client.get("/dipendenti", headers=headers).headers["ETag"]
+        response = test_client.get("/dipendenti", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == (304 if headers is valid else 200)
+
+    etag = test_client.get("/dipendenti", headers=valid).headers["ETag"]
+    db_session.add(BlacklistedToken(token=valid["Authorization"].split()[1]))
+    db_session.commit()
+    # The logout wrote to the database: the ETag moved on as well, so reuse the new one
+    etag = test_client.get("/dipendenti", headers=valid).headers["ETag"]
+    response = test_client.get("/dipendenti", headers={**valid, "If-None-Match": etag})
+    assert response.status_code != 304
+
+def test_etag_changes_after_a_write(test_client: TestClient, db_session: Session):
+    etag = test_client.get("/dipendenti").headers["ETag"]
+
+    db_session.add(Dipendente(nome="Luca", cognome="Bianchi", matricola="002"))
+    db_session.commit()
+
+    response = test_client.get("/dipendenti", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [d["cognome"] for d in response.json()] == ["Bianchi"]
+
+def test_etag_depends_on_query(test_client: TestClient):
+    all_certs = test_client.get("/certificati/").headers["ETag"]
+    filtered = test_client.get("/certificati/", params={"search": "rossi"}).headers["ETag"]
+    assert all_certs != filtered
+
+    response = test_client.get("/certificati/", params={"search": "rossi"}, headers={"If-None-Match": all_certs})
+    assert response.status_code == 200
+
+def test_large_responses_are_compressed(test_client: TestClient, db_session: Session):
+    db_session.add_all([
+        Dipendente(nome=f"Nome{i}", cognome=f"Cognome{i}", matricola=f"{i:04d}") for i in range(50)
+    ])
+    db_session.commit()
+
+    response = test_client.get("/dipendenti", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 50
+
+def test_threshold_change_invalidates_the_etag(test_client: TestClient, monkeypatch):
+    from app.api import deps
+    from app.core.config import settings
+    from app.main import app
+
+    app.dependency_overrides[deps.get_current_active_admin] = lambda: User(id=1, username="admin", is_admin=True)
+    monkeypatch.setattr(settings, "save_mutable_settings", lambda data: monkeypatch.setitem(settings.mutable._data, "ALERT_THRESHOLD_DAYS", data["ALERT_THRESHOLD_DAYS"]))
+
+    for path in ("/certificati/", "/stats/summary"):
+        etag = test_client.get(path).headers["ETag"]
+        assert test_client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+        days = settings.ALERT_THRESHOLD_DAYS + 1
+        assert test_client.put("/app_config/config", json={"ALERT_THRESHOLD_DAYS": days}).status_code == 204
+
+        response = test_client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
@@ -0,0 +1,105 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.db.models import ImportJobItem
+from app.services import import_jobs
+
+PDF = b"%PDF-1.4 fake"
+
+@pytest.fixture
+def queued(mocker):
+    """Records submitted items instead of running them on the worker pool."""
+    mocker.patch("app.services.import_jobs.db_security.save_to_disk_async")
+    mocker.patch("app.services.import_jobs.db_security.request_save")
+    submitted = []
+    mocker.patch.object(import_jobs.runner, "submit", side_effect=submitted.append)
+    return submitted
+
+def _create(test_client, *names):
+    files = [("files", (name, PDF, "application/pdf")) for name in names]
+    response = test_client.post("/import-jobs/", files=files)
+    assert response.status_code == 202
+    return response.json()
+
+def test_job_extracts_every_file(test_client: TestClient, db_session: Session, queued, mock_ai_service):
+    mock_ai_service.return_value = {"nome": "ROSSI MARIO", "corso": "ANTINCENDIO", "categoria": "ANTINCENDIO",
+                                    "data_rilascio": "2024-01-10", "data_scadenza": "10-01-2029"}
+    job = _create(test_client, "a.pdf", "b.pdf")
+    assert job["total"] == 2 and job["counts"] == {"queued": 2}
+    assert queued == [item["id"] for item in job["items"]]
+    assert len(list(import_jobs.get_staging_dir(job["id"]).iterdir())) == 2
+
+    for item_id in queued:
+        import_jobs.process_item(item_id)
+    db_session.expire_all()
+
+    summary = test_client.get(f"/import-jobs/{job['id']}").json()
+    assert summary["status"] == "completed"
+    assert summary["processed"] == 2
+    items = test_client.get(f"/import-jobs/{job['id']}/items").json()
+    assert [i["status"] for i in items] == ["done", "done"]
+    assert items[0]["entities"]["data_rilascio"] == "10/01/2024"
+    assert items[0]["entities"]["data_scadenza"] == "10/01/2029"
+    assert not import_jobs.get_staging_dir(job["id"]).exists()
+
+    events = test_client.get(f"/import-jobs/{job['id']}/events")
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert events.text.count("data: ") == 1 and '"status": "completed"' in events.text
+
+def test_quota_errors_are_retried_then_reported(test_client: TestClient, db_session: Session, queued, mock_ai_service):
+    mock_ai_service.return_value = {"error": "AI call failed (Quota/Limit)", "status_code": 429}
+    job = _create(test_client, "a.pdf")
+    item_id = queued[0]
+
+    while queued:
+        import_jobs.process_item(queued.pop(0))
+    db_session.expire_all()
+
+    item = test_client.get(f"/import-jobs/{job['id']}/items/{item_id}").json()
+    assert item["status"] == "error"
+    assert item["retryable"] is True
+    assert item["attempts"] == import_jobs.MAX_ATTEMPTS
+    assert mock_ai_service.call_count == import_jobs.MAX_ATTEMPTS
+
+def test_cancel_skips_queued_items(test_client: TestClient, db_session: Session, queued, mock_ai_service):
+    job = _create(test_client, "a.pdf", "b.pdf")
+    response = test_client.delete(f"/import-jobs/{job['id']}")
+    assert response.json()["status"] == "cancelled"
+    assert response.json()["counts"] == {"cancelled": 2}
+
+    for item_id in queued:
+        import_jobs.process_item(item_id)
+    mock_ai_service.assert_not_called()
+
+    files = [("files", ("c.pdf", PDF, "application/pdf"))]
+    assert test_client.post(f"/import-jobs/{job['id']}/files", files=files).status_code == 409
+
+def test_interrupted_items_are_resumed(test_client: TestClient, db_session: Session, queued):
+    job = _create(test_client, "a.pdf", "b.pdf")
+    first = db_session.get(ImportJobItem, job["items"][0]["id"])
+    first.status = import_jobs.ITEM_RUNNING  # Left running by a crash
+    db_session.commit()
+    queued.clear()
+
+    assert import_jobs.resume_pending_jobs() == 2
+    assert sorted(queued) == sorted(item["id"] for item in job["items"])
+    db_session.expire_all()
+    assert db_session.get(ImportJobItem, first.id).status == import_jobs.ITEM_QUEUED
+
+def test_non_pdf_files_are_rejected(test_client: TestClient, queued):
+    files = [("files", ("a.pdf", PDF, "application/pdf")), ("files", ("b.pdf", b"not a pdf", "application/pdf"))]
+    response = test_client.post("/import-jobs/", files=files)
+    assert response.status_code == 400
+    assert queued == []
+
+def test_appended_files_share_a_deferred_save(test_client: TestClient, queued):
+    save_now = import_jobs.db_security.save_to_disk_async
+    save_later = import_jobs.db_security.request_save
+    job = _create(test_client, "a.pdf")
+    for name in ("b.pdf", "c.pdf"):
+        files = [("files", (name, PDF, "application/pdf"))]
+        assert test_client.post(f"/import-jobs/{job['id']}/files", files=files).status_code == 202
+
+    save_now.assert_called_once()
+    assert save_later.call_count == 2
+    assert len(queued) == 3
@@ -0,0 +1,43 @@
+from unittest.mock import MagicMock, patch
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+import pytest
+from app.core import ai_clients
+
+@pytest.fixture
+def fake_clients():
+    """One fake GenerativeServiceClient per API key."""
+    created = {}
+
+    def make_client(client_options):
+        client = MagicMock()
+        client.generate_content.return_value = glm.GenerateContentResponse(
+            candidates=[{"content": {"role": "model", "parts": [{"text": "ok"}]}, "finish_reason": 1}]
+        )
+        created[client_options["api_key"]] = client
+        return client
+
+    with patch("app.core.ai_clients.glm.GenerativeServiceClient", side_effect=make_client), \
+         patch.dict("app.core.ai_clients._clients", clear=True):
+        yield created
+
+def test_bound_model_calls_its_purpose_client(fake_clients):
+    analysis = ai_clients.bind(genai.GenerativeModel("models/gemini-2.5-flash"), ai_clients.ANALYSIS, "key-a")
+    chat = ai_clients.bind(genai.GenerativeModel("models/gemini-2.5-flash"), ai_clients.CHAT, "key-c")
+
+    with patch("google.generativeai.client.get_default_generative_client") as default_client:
+        assert analysis.generate_content("ciao").text == "ok"
+        assert chat.start_chat().send_message("ciao").text == "ok"
+        default_client.assert_not_called()
+
+    fake_clients["key-a"].generate_content.assert_called_once()
+    fake_clients["key-c"].generate_content.assert_called_once()
+
+def test_key_change_rebuilds_the_client(fake_clients):
+    first = ai_clients.get_client(ai_clients.ANALYSIS, "key-a")
+    assert ai_clients.get_client(ai_clients.ANALYSIS, "key-a") is first
+    assert ai_clients.get_client(ai_clients.ANALYSIS, "key-b") is not first
+
+def test_bind_rejects_models_without_a_client_slot():
+    with pytest.raises(RuntimeError):
+        ai_clients.bind(object(), ai_clients.ANALYSIS, "key-a")
@@ -4,6 +4,7 @@ from app.core.db_security import DBSecurityManager
 from pathlib import Path
 import time
 import shutil
+import os
 
 def test_backup_filename_format(tmp_path):
     # Setup paths
@@ -35,3 +36,148 @@ def test_backup_filename_format(tmp_path):
     assert "database_documenti_" in backup_name
     assert "_ore_" in backup_name
     assert backup_name.endswith(".bak")
+
+import sqlite3
+from app.core.backup_store import BackupStore
+
+@pytest.fixture
+def secure_manager(tmp_path):
+    with patch("app.core.db_security.settings") as mock_settings, \
+         patch("app.core.db_security.get_user_data_dir", return_value=tmp_path):
+        mock_settings.DATABASE_PATH = str(tmp_path)
+        manager = DBSecurityManager(db_name="test.db")
+    manager.load_memory_db()
+    conn = manager.get_connection()
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.executemany("INSERT INTO t (data) VALUES (?)", [("y" * 300,) for _ in range(3000)])
+    conn.commit()
+    manager.acquire_session_lock({"user": "tester"})
+    manager.save_to_disk()
+    yield manager
+    manager.release_lock()
+
+def _chunk_files(manager):
+    return list((manager.data_dir / "Backups" / "chunks").glob("*/*"))
+
+def test_backup_is_deduplicated_manifest(secure_manager):
+    secure_manager.create_backup()
+    backup_dir = secure_manager.data_dir / "Backups"
+    manifests = list(backup_dir.glob("*.bak"))
+    assert len(manifests) == 1
+    assert BackupStore.is_manifest(manifests[0])
+    first_chunks = len(_chunk_files(secure_manager))
+    assert first_chunks > 1
+
+    # Small change: the next restore point only adds the chunks that changed
+    secure_manager.active_connection.execute("UPDATE t SET data = 'z' WHERE id = 1")
+    secure_manager.active_connection.commit()
+    secure_manager.save_to_disk()
+    manifests[0].unlink()
+    secure_manager.create_backup()
+    assert len(_chunk_files(secure_manager)) - first_chunks <= 2
+
+def test_restore_from_manifest(secure_manager, tmp_path):
+    secure_manager.create_backup()
+    backup_path = next((secure_manager.data_dir / "Backups").glob("*.bak"))
+    assert secure_manager.verify_integrity(backup_path) is True
+
+    secure_manager.active_connection.execute("DELETE FROM t")
+    secure_manager.active_connection.commit()
+    secure_manager.save_to_disk()
+
+    with patch.object(secure_manager, "create_backup"):
+        secure_manager.restore_from_backup(backup_path)
+
+    secure_manager.active_connection = None
+    secure_manager.load_memory_db()
+    count = secure_manager.get_connection().execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    assert count == 3000
+
+def test_restore_waits_for_background_save(secure_manager):
+    secure_manager.create_backup()
+    backup_path = next((secure_manager.data_dir / "Backups").glob("*.bak"))
+    real_write = secure_manager._safe_write
+
+    def write_under_lock(data):
+        assert secure_manager._save_lock.locked()
+        return real_write(data)
+
+    with patch.object(secure_manager, "create_backup"), \
+         patch.object(secure_manager, "wait_for_pending_save") as mock_wait, \
+         patch.object(secure_manager, "_safe_write", side_effect=write_under_lock) as mock_write:
+        secure_manager.restore_from_backup(backup_path)
+
+    mock_wait.assert_called_once()
+    mock_write.assert_called_once()
+
+def test_corrupted_chunk_fails_verification(secure_manager):
+    secure_manager.create_backup()
+    backup_path = next((secure_manager.data_dir / "Backups").glob("*.bak"))
+    chunk = _chunk_files(secure_manager)[0]
+    chunk.write_bytes(b"tampered")
+
+    assert secure_manager.verify_integrity(backup_path) is False
+
+def test_rotation_removes_unreferenced_chunks(secure_manager):
+    backup_dir = secure_manager.data_dir / "Backups"
+    secure_manager.create_backup()
+    old_manifest = next(backup_dir.glob("*.bak"))
+    old_manifest.rename(backup_dir / "old_restore_point.bak")
+    os.utime(backup_dir / "old_restore_point.bak", (1, 1))
+
+    secure_manager.active_connection.execute("DELETE FROM t WHERE id > 10")
+    secure_manager.active_connection.commit()
+    secure_manager.active_connection.execute("VACUUM")
+    secure_manager.save_to_disk()
+    secure_manager.create_backup()
+    before = len(_chunk_files(secure_manager))
+
+    secure_manager.rotate_backups(backup_dir, keep=1)
+
+    assert not (backup_dir / "old_restore_point.bak").exists()
+    assert len(_chunk_files(secure_manager)) < before
+    assert secure_manager.verify_integrity(next(backup_dir.glob("*.bak"))) is True
+
+def test_catalog_tracks_created_and_rotated_backups(secure_manager):
+    backup_dir = secure_manager.data_dir / "Backups"
+    secure_manager.create_backup()
+    first = next(backup_dir.glob("*.bak"))
+    first.rename(backup_dir / "older.bak")
+    os.utime(backup_dir / "older.bak", (1, 1))
+    (backup_dir / "catalog.json").unlink()
+
+    # Missing catalogue is rebuilt from disk on first use
+    names = [b["name"] for b in secure_manager.list_backups()]
+    assert names == ["older.bak"]
+
+    secure_manager.create_backup()
+    entries = secure_manager.list_backups()
+    assert len(entries) == 2
+    assert entries[0]["kind"] == "image"
+    assert entries[0]["size"] > 0
+    assert entries[0]["integrity"] is None
+
+    secure_manager.rotate_backups(backup_dir, keep=1)
+    assert [b["name"] for b in secure_manager.list_backups()] == [first.name]
+
+def test_verify_backups_caches_results(secure_manager):
+    secure_manager.create_backup()
+    results = secure_manager.verify_backups()
+    assert list(results.values()) == [True]
+    assert secure_manager.list_backups()[0]["integrity"] == "ok"
+
+    with patch.object(secure_manager, "verify_integrity") as mock_verify:
+        assert secure_manager.verify_backups() == results
+        mock_verify.assert_not_called()
+
+def test_verify_backups_rechecks_changed_files(secure_manager):
+    backup_dir = secure_manager.data_dir / "Backups"
+    secure_manager.create_backup()
+    secure_manager.verify_backups()
+
+    manifest = next(backup_dir.glob("*.bak"))
+    manifest.write_bytes(manifest.read_bytes()[:-10])
+
+    results = secure_manager.verify_backups()
+    assert results[manifest.name] is False
+    assert secure_manager.list_backups()[0]["integrity"] == "failed"
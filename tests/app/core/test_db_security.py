@@ -62,8 +62,8 @@ def test_in_memory_lifecycle(temp_workspace, mock_user_data_dir):
     # 6. Check Disk Content
     # Disk should be encrypted (Header check)
     with open(db_path, "rb") as f:
-        header = f.read(len(manager._HEADER))
-        assert header == manager._HEADER
+        header = f.read(len(manager._HEADER_V2))
+        assert header == manager._HEADER_V2
 
     # Verify Disk is NOT valid sqlite
     try:
@@ -0,0 +1,73 @@
+import pytest
+import threading
+import time
+from unittest.mock import patch
+from app.core.db_security import DBSecurityManager
+
+@pytest.fixture
+def manager(tmp_path):
+    with patch("app.core.db_security.settings") as mock_settings, \
+         patch("app.core.db_security.get_user_data_dir", return_value=tmp_path):
+        mock_settings.DATABASE_PATH = str(tmp_path)
+        mgr = DBSecurityManager(db_name="test.db")
+        mgr.load_memory_db()
+        conn = mgr.get_connection()
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, data TEXT)")
+        conn.executemany("INSERT INTO t (data) VALUES (?)", [("x" * 200,) for _ in range(500)])
+        conn.commit()
+        mgr.acquire_session_lock({"user": "tester"})
+        yield mgr
+        mgr.release_lock()
+
+def test_async_save_writes_snapshot_and_metrics(manager):
+    assert manager.save_to_disk_async() is True
+    assert manager.wait_for_pending_save(timeout=10) is True
+
+    assert manager.verify_integrity() is True
+    metrics = manager.get_save_metrics()
+    assert metrics["mode"] == "full"
+    assert metrics["background"] is True
+    assert metrics["bytes_written"] == manager.db_path.stat().st_size
+    for key in ("snapshot_ms", "encrypt_ms", "write_ms", "total_ms"):
+        assert metrics[key] >= 0
+    assert metrics["pending"] is False
+
+def test_async_save_uses_snapshot_taken_at_call_time(manager):
+    with patch.object(manager, "_persist_snapshot", wraps=manager._persist_snapshot) as persist:
+        manager.save_to_disk_async()
+        # Changes after the snapshot are not part of this save
+        manager.active_connection.execute("DELETE FROM t")
+        manager.active_connection.commit()
+        manager.wait_for_pending_save(timeout=10)
+        serialized = persist.call_args[0][0]
+
+    manager.active_connection = None
+    manager.load_memory_db()
+    manager.get_connection()
+    assert len(serialized) > 0
+    assert manager.active_connection.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 500
+
+def test_async_save_discarded_if_lock_lost(manager):
+    manager.is_read_only = True
+    assert manager.save_to_disk_async() is False
+    assert not manager.db_path.exists()
+
+def test_sync_save_waits_for_background_save(manager):
+    manager.save_to_disk_async()
+    assert manager.save_to_disk() is True
+    assert manager._pending_save.done()
+    assert manager.get_save_metrics()["background"] is False
+
+def test_requested_saves_are_coalesced(manager):
+    saved = threading.Event()
+    with patch.object(manager, "save_to_disk_async", side_effect=lambda: saved.set()) as save:
+        for _ in range(5):
+            manager.request_save(delay=0.05)
+        assert saved.wait(timeout=5)
+        time.sleep(0.1)
+        assert save.call_count == 1
+
+        manager.request_save(delay=0.05)
+        manager.release_lock()  # Cancels the save still due
+        time.sleep(0.1)
+        assert save.call_count == 1
@@ -0,0 +1,70 @@
+import sqlite3
+import pytest
+from unittest.mock import patch
+from app.core.db_security import DBSecurityManager
+
+@pytest.fixture
+def manager(tmp_path):
+    with patch("app.core.db_security.settings") as mock_settings, \
+         patch("app.core.db_security.get_user_data_dir", return_value=tmp_path):
+        mock_settings.DATABASE_PATH = str(tmp_path)
+        mgr = DBSecurityManager(db_name="test.db")
+        mgr.load_memory_db()
+        yield mgr
+        mgr.release_lock()
+
+def _plain_image(rows=300):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.executemany("INSERT INTO t (data) VALUES (?)", [("x" * 500,) for _ in range(rows)])
+    conn.commit()
+    data = conn.serialize()
+    conn.close()
+    return data
+
+def test_v2_roundtrip_uses_multiple_chunks(manager, tmp_path):
+    manager._CHUNK_SIZE = 16 * 1024
+    image = _plain_image()
+    manager._safe_write(manager._encrypted_writer(image))
+
+    with open(manager.db_path, "rb") as f:
+        assert f.read(len(manager._HEADER_V2)) == manager._HEADER_V2
+
+    decoded, _, file_format = manager._read_database_file(manager.db_path)
+    assert file_format == manager._HEADER_V2
+    assert bytes(decoded) == image
+    assert manager.verify_integrity() is True
+
+def test_v1_file_is_migrated_on_save(manager, tmp_path):
+    image = _plain_image()
+    manager.db_path.write_bytes(manager._HEADER + manager.fernet.encrypt(image))
+
+    manager.load_memory_db()
+    manager.get_connection()
+    manager.acquire_session_lock({"user": "tester"})
+    assert manager.save_to_disk() is True
+
+    with open(manager.db_path, "rb") as f:
+        assert f.read(len(manager._HEADER_V2)) == manager._HEADER_V2
+    assert manager.verify_integrity() is True
+
+def test_truncated_v2_file_is_rejected(manager, tmp_path):
+    manager._CHUNK_SIZE = 16 * 1024
+    manager._safe_write(manager._encrypted_writer(_plain_image()))
+    content = manager.db_path.read_bytes()
+
+    # Drop the final chunk: the remaining records are still individually valid
+    manager.db_path.write_bytes(content[:len(content) // 2])
+
+    with pytest.raises(ValueError):
+        manager.load_memory_db()
+    assert manager.verify_integrity() is False
+
+def test_connection_releases_initial_bytes(manager, tmp_path):
+    manager._safe_write(manager._encrypted_writer(_plain_image()))
+    manager.load_memory_db()
+    assert manager.initial_bytes is not None
+
+    conn = manager.get_connection()
+    assert manager.initial_bytes is None
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 300
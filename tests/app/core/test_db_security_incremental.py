@@ -0,0 +1,107 @@
+import sqlite3
+import pytest
+from unittest.mock import patch
+from app.core.db_security import DBSecurityManager
+
+@pytest.fixture
+def manager(tmp_path):
+    with patch("app.core.db_security.settings") as mock_settings, \
+         patch("app.core.db_security.get_user_data_dir", return_value=tmp_path):
+        mock_settings.DATABASE_PATH = str(tmp_path)
+        mgr = DBSecurityManager(db_name="test.db")
+        mgr.load_memory_db()
+        yield mgr
+        mgr.release_lock()
+
+def _populate(conn, rows):
+    conn.execute("CREATE TABLE IF NOT EXISTS t (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.executemany("INSERT INTO t (data) VALUES (?)", [(f"row_{i}" * 20,) for i in range(rows)])
+    conn.commit()
+
+def _reload(tmp_path):
+    with patch("app.core.db_security.settings") as mock_settings, \
+         patch("app.core.db_security.get_user_data_dir", return_value=tmp_path):
+        mock_settings.DATABASE_PATH = str(tmp_path)
+        mgr = DBSecurityManager(db_name="test.db")
+    mgr.load_memory_db()
+    return mgr
+
+def test_second_save_appends_delta(manager, tmp_path):
+    conn = manager.get_connection()
+    _populate(conn, 2000)
+    manager.acquire_session_lock({"user": "tester"})
+
+    assert manager.save_to_disk() is True
+    base_bytes = manager.db_path.read_bytes()
+    delta_path = manager._delta_path(manager.db_path)
+    assert not delta_path.exists()
+
+    # Reload so the manager knows the on-disk page layout
+    manager.active_connection = None
+    manager.load_memory_db()
+    conn = manager.get_connection()
+    conn.execute("UPDATE t SET data = 'changed' WHERE id = 5")
+    conn.commit()
+
+    assert manager.save_to_disk() is True
+    assert manager.db_path.read_bytes() == base_bytes
+    assert delta_path.read_bytes().startswith(manager._DELTA_HEADER)
+
+    reloaded = _reload(tmp_path)
+    row = reloaded.get_connection().execute("SELECT data FROM t WHERE id = 5").fetchone()
+    assert row[0] == "changed"
+    assert reloaded.verify_integrity() is True
+
+def test_compact_rewrites_base_and_removes_sidecar(manager, tmp_path):
+    conn = manager.get_connection()
+    _populate(conn, 2000)
+    manager.acquire_session_lock({"user": "tester"})
+    manager.save_to_disk()
+    manager.active_connection = None
+    manager.load_memory_db()
+    conn = manager.get_connection()
+    conn.execute("DELETE FROM t WHERE id > 1000")
+    conn.commit()
+    manager.save_to_disk()
+    assert manager._delta_path(manager.db_path).exists()
+
+    assert manager.save_to_disk(compact=True) is True
+    assert not manager._delta_path(manager.db_path).exists()
+
+    reloaded = _reload(tmp_path)
+    count = reloaded.get_connection().execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    assert count == 1000
+
+def test_stale_sidecar_is_ignored(manager, tmp_path):
+    conn = manager.get_connection()
+    _populate(conn, 500)
+    manager.acquire_session_lock({"user": "tester"})
+    manager.save_to_disk()
+
+    # Sidecar written for a different base (e.g. crash during compaction)
+    delta_path = manager._delta_path(manager.db_path)
+    delta_path.write_bytes(manager._DELTA_HEADER + b"\x00" * 32 + b"\x00\x00\x00\x04junk")
+
+    reloaded = _reload(tmp_path)
+    count = reloaded.get_connection().execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    assert count == 500
+
+def test_truncated_record_forces_compaction(manager, tmp_path):
+    conn = manager.get_connection()
+    _populate(conn, 500)
+    manager.acquire_session_lock({"user": "tester"})
+    manager.save_to_disk()
+    manager.active_connection = None
+    manager.load_memory_db()
+    conn = manager.get_connection()
+    conn.execute("UPDATE t SET data = 'x' WHERE id = 1")
+    conn.commit()
+    manager.save_to_disk()
+
+    delta_path = manager._delta_path(manager.db_path)
+    with open(delta_path, "ab") as f:
+        f.write(b"\x00\x00\x10\x00partial")
+
+    reloaded = _reload(tmp_path)
+    assert reloaded.get_connection().execute("SELECT data FROM t WHERE id = 1").fetchone()[0] == "x"
+    assert reloaded._delta_records == reloaded._DELTA_MAX_RECORDS
@@ -73,7 +73,7 @@ def test_full_encryption_cycle(secure_db_env):
     # 4. Verify on Disk content is NOT plain SQLite
     with open(manager.db_path, 'rb') as f:
         header = f.read(15)
-        assert header == manager._HEADER
+        assert header == manager._HEADER_V2
         # Ensure it doesn't start with SQLite header "SQLite format 3"
         f.seek(0)
         full_content = f.read()
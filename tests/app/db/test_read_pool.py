@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+import pytest
+from unittest.mock import patch
+from app.core.db_security import DBSecurityManager
+
+@pytest.fixture
+def manager(tmp_path):
+    with patch("app.core.db_security.settings") as mock_settings, \
+         patch("app.core.db_security.get_user_data_dir", return_value=tmp_path):
+        mock_settings.DATABASE_PATH = str(tmp_path)
+        mgr = DBSecurityManager(db_name="test.db")
+    if not mgr.read_pool_size:
+        pytest.skip("SQLite build without memdb VFS")
+    return mgr
+
+def _image(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.executemany("INSERT INTO t (data) VALUES (?)", [("v",) for _ in range(rows)])
+    conn.commit()
+    return conn.serialize()
+
+def test_readers_see_loaded_image_and_commits(manager):
+    manager.initial_bytes = _image(10)
+    writer = manager.get_connection()
+    reader = manager.get_read_connection()
+
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 10
+
+    writer.execute("INSERT INTO t (data) VALUES ('new')")
+    writer.commit()
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 11
+
+def test_readers_are_read_only(manager):
+    manager.initial_bytes = _image(1)
+    manager.get_connection()
+    reader = manager.get_read_connection()
+
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("DELETE FROM t")
+
+def test_readers_run_concurrently(manager):
+    manager.initial_bytes = _image(2000)
+    manager.get_connection()
+    readers = [manager.get_read_connection() for _ in range(3)]
+    results = []
+
+    def run(conn):
+        results.append(conn.execute("SELECT COUNT(*) FROM t a, t b WHERE a.id = b.id").fetchone()[0])
+
+    threads = [threading.Thread(target=run, args=(conn,)) for conn in readers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [2000, 2000, 2000]
+
+def test_new_writer_gets_new_generation(manager):
+    manager.initial_bytes = _image(1)
+    manager.get_connection()
+    generation = manager.memory_generation
+    manager.active_connection.close()
+    manager.active_connection = None
+
+    manager.get_connection()
+    assert manager.memory_generation == generation + 1
+    reader = manager.get_read_connection()
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("SELECT * FROM t")
+
+def test_pool_disabled_shares_writer(manager):
+    manager.read_pool_size = 0
+    manager.initial_bytes = _image(1)
+    writer = manager.get_connection()
+    assert manager.get_read_connection() is writer
@@ -10,14 +10,18 @@ def test_gemini_client_singleton():
     ai_extraction.GeminiClient._instance = None
 
     with patch("google.generativeai.configure") as mock_conf, \
-         patch("google.generativeai.GenerativeModel") as mock_model:
+         patch("google.generativeai.GenerativeModel") as mock_model, \
+         patch("app.core.ai_clients.glm") as mock_glm, \
+         patch.dict("app.core.ai_clients._clients", clear=True):
 
         client1 = ai_extraction.GeminiClient()
         client2 = ai_extraction.GeminiClient()
+        client2.get_model()
 
         assert client1 is client2
-        mock_conf.assert_called_once()
+        mock_conf.assert_not_called()
         mock_model.assert_called_once()
+        mock_glm.GenerativeServiceClient.assert_called_once()
 
 def test_gemini_client_missing_key():
     ai_extraction.GeminiClient._instance = None
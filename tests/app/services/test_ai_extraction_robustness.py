@@ -31,6 +31,21 @@ def mock_genai(monkeypatch):
     monkeypatch.setattr("app.services.ai_extraction.genai", mock_genai_mod)
     return mock_genai_mod
 
+@pytest.fixture(autouse=True)
+def mock_glm(monkeypatch):
+    """Mocks the service client factory and clears the per-purpose client cache."""
+    mock_glm_mod = MagicMock()
+    monkeypatch.setattr("app.core.ai_clients.glm", mock_glm_mod)
+    monkeypatch.setattr("app.core.ai_clients._clients", {})
+    return mock_glm_mod
+
+@pytest.fixture(autouse=True)
+def mock_rate_limiter(monkeypatch):
+    """Replaces the shared rate limiter so calls never wait."""
+    limiter = MagicMock()
+    monkeypatch.setattr("app.services.ai_extraction.rate_limiter", limiter)
+    return limiter
+
 @pytest.fixture
 def reset_singleton():
     """Resets the GeminiClient singleton before and after each test."""
@@ -42,13 +57,27 @@ def reset_singleton():
 
 # --- Tests for Singleton Initialization ---
 
-def test_gemini_client_initialization_success(mock_settings, mock_genai, reset_singleton):
+def test_gemini_client_initialization_success(mock_settings, mock_genai, mock_glm, reset_singleton):
     """Test successful initialization of the GeminiClient singleton."""
     client = GeminiClient()
     assert client is not None
-    assert client.get_model() is not None
-    mock_genai.configure.assert_called_with(api_key="fake_key")
+    model = client.get_model()
+    assert model is not None
+    mock_genai.configure.assert_not_called()
     mock_genai.GenerativeModel.assert_called_with('models/gemini-2.5-pro')
+    mock_glm.GenerativeServiceClient.assert_called_once_with(client_options={"api_key": "fake_key"})
+    assert model._client is mock_glm.GenerativeServiceClient.return_value
+
+def test_gemini_client_follows_key_change(mock_settings, mock_genai, mock_glm, reset_singleton):
+    """A new analysis key rebuilds the client; the same key reuses it."""
+    client = GeminiClient()
+    client.get_model()
+    mock_settings.GEMINI_API_KEY_ANALYSIS = "new_key"
+    client.get_model()
+    client.get_model()
+
+    assert mock_glm.GenerativeServiceClient.call_count == 2
+    mock_glm.GenerativeServiceClient.assert_called_with(client_options={"api_key": "new_key"})
 
 def test_gemini_client_initialization_failure_no_key(mock_settings, mock_genai, reset_singleton):
     """Test initialization failure when API key is missing in settings."""
@@ -62,7 +91,7 @@ def test_gemini_client_initialization_failure_no_key(mock_settings, mock_genai,
 
 def test_gemini_client_initialization_generic_exception(mock_settings, mock_genai, reset_singleton):
     """Test initialization failure when genai raises an exception."""
-    mock_genai.configure.side_effect = Exception("Google API Error")
+    mock_genai.GenerativeModel.side_effect = Exception("Google API Error")
 
     with pytest.raises(Exception, match="Google API Error"):
         GeminiClient()
@@ -94,6 +123,8 @@ def test_extract_entities_valid_json(mock_model):
     assert result == expected_data
     assert result["categoria"] == "ANTINCENDIO"
     mock_model.generate_content.assert_called_once()
+    ai_extraction.rate_limiter.acquire.assert_called_once_with(ai_extraction.PRIORITY_BULK)
+    ai_extraction.rate_limiter.succeeded.assert_called_once()
 
 def test_extract_entities_list_response(mock_model):
     """Test extraction when AI returns a list of objects (taking the first one)."""
@@ -156,7 +187,7 @@ def test_extract_entities_atex_category(mock_model):
 
 # --- Tests for Retry Logic and Exceptions ---
 
-def test_extract_entities_resource_exhausted_retry(mock_model):
+def test_extract_entities_resource_exhausted_retry(mock_model, mock_rate_limiter):
     """
     Test that ResourceExhausted triggers retries and eventually fails.
     """
@@ -172,6 +203,9 @@ def test_extract_entities_resource_exhausted_retry(mock_model):
     assert result["status_code"] == 429
     # Bug 10 Fix: Retry policy increased to 6 attempts
     assert mock_model.generate_content.call_count == 6
+    # Every attempt waits for a slot and reports the quota error to the limiter
+    assert mock_rate_limiter.acquire.call_count == 6
+    assert mock_rate_limiter.throttled.call_count == 6
 
 def test_extract_entities_generic_exception(mock_model):
     """Test handling of generic exceptions during API call."""
@@ -0,0 +1,91 @@
+import threading
+import time
+import pytest
+from app.core.config import settings
+from app.services.ai_extraction import AdaptiveRateLimiter, PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setitem(settings.mutable._data, "AI_REQUESTS_PER_MINUTE", 600)
+    monkeypatch.setattr(AdaptiveRateLimiter, "COOLDOWN", 0.2)
+    return AdaptiveRateLimiter()
+
+def _wait_queued(limiter, count):
+    deadline = time.monotonic() + 2
+    while limiter.stats()["queued_bulk"] + limiter.stats()["queued_interactive"] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_throttling_lowers_rate_and_successes_restore_it(limiter):
+    assert limiter.stats()["rate_per_minute"] == 600
+
+    limiter.throttled()
+    limiter.throttled()  # Same cooldown: counted once
+    stats = limiter.stats()
+    assert stats["rate_per_minute"] == AdaptiveRateLimiter.MIN_PER_MINUTE  # No call in the last minute
+    assert stats["throttled"] == 1
+    assert stats["paused_seconds"] > 0
+
+    for _ in range(2000):
+        limiter.succeeded()
+    assert limiter.stats()["rate_per_minute"] == 600
+
+def test_acquire_waits_for_the_cooldown(limiter):
+    limiter.throttled()
+    start = time.monotonic()
+    limiter.acquire()
+    assert 0.15 <= time.monotonic() - start < 1  # Then the first call goes without another wait
+
+def test_interactive_calls_overtake_bulk(limiter):
+    limiter.acquire()
+    limiter.acquire()  # Burst used up: the next call waits for a token
+    order = []
+
+    def call(name, priority):
+        limiter.acquire(priority)
+        order.append(name)
+
+    threads = [threading.Thread(target=call, args=("bulk", PRIORITY_BULK))]
+    threads[0].start()
+    _wait_queued(limiter, 1)
+    threads.append(threading.Thread(target=call, args=("bulk2", PRIORITY_BULK)))
+    threads[1].start()
+    _wait_queued(limiter, 2)
+    threads.append(threading.Thread(target=call, args=("chat", PRIORITY_INTERACTIVE)))
+    threads[2].start()
+    _wait_queued(limiter, 3)
+    assert limiter.stats()["queued_interactive"] == 1
+
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order[0] == "chat" or order[:2] == ["bulk", "chat"]
+    assert order[-1] == "bulk2"
+
+def test_rate_endpoint_reports_limiter_state(test_client):
+    stats = test_client.get("/system/ai-rate").json()
+    assert {"rate_per_minute", "max_per_minute", "queued_interactive", "queued_bulk", "throttled"} <= set(stats)
+
+def test_no_ceiling_runs_unpaced_until_a_quota_error(monkeypatch):
+    monkeypatch.setitem(settings.mutable._data, "AI_REQUESTS_PER_MINUTE", None)
+    monkeypatch.setattr(AdaptiveRateLimiter, "COOLDOWN", 0.0)
+    limiter = AdaptiveRateLimiter()
+
+    start = time.monotonic()
+    for _ in range(40):
+        limiter.acquire()
+    assert time.monotonic() - start < 1
+    assert limiter.stats()["rate_per_minute"] is None
+    assert limiter.stats()["max_per_minute"] is None
+
+    limiter.throttled()  # Half of the 40 calls started in the last minute
+    assert limiter.stats()["rate_per_minute"] == 20
+
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.stats()["rate_per_minute"] == 70  # Probes past the rate in use: no ceiling
+
+def test_throttling_halves_the_rate_in_use(limiter):
+    limiter.acquire()
+    limiter.acquire()
+    limiter.throttled()
+    assert limiter.stats()["rate_per_minute"] == 1  # Two calls in the last minute, not the 600 ceiling
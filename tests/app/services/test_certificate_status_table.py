@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+from sqlalchemy.orm import Session
+from app.db.models import Certificato, Dipendente, Corso, StatoCertificato, ValidationStatus
+from app.services import certificate_logic
+from app.db.session import get_data_version
+
+def _stored(db_session, cert_id):
+    row = db_session.get(StatoCertificato, cert_id)
+    return row.stato if row else None
+
+def _setup(db_session):
+    dipendente = Dipendente(nome="Mario", cognome="Rossi")
+    corso = Corso(nome_corso="Antincendio", validita_mesi=12, categoria_corso="ANTINCENDIO")
+    db_session.add_all([dipendente, corso])
+    db_session.commit()
+    return dipendente, corso
+
+def _cert(dipendente, corso, rilascio, scadenza):
+    return Certificato(
+        dipendente_id=dipendente.id if dipendente else None,
+        corso_id=corso.id,
+        data_rilascio=rilascio,
+        data_scadenza_calcolata=scadenza,
+        stato_validazione=ValidationStatus.MANUAL
+    )
+
+def test_status_rows_follow_inserts(db_session: Session):
+    dipendente, corso = _setup(db_session)
+    old = _cert(dipendente, corso, date(2020, 1, 1), date(2021, 1, 1))
+    db_session.add(old)
+    db_session.commit()
+    assert _stored(db_session, old.id) == "scaduto"
+
+    # A renewal archives the older certificate of the same category
+    new = _cert(dipendente, corso, date.today(), date.today() + timedelta(days=365))
+    db_session.add(new)
+    db_session.commit()
+    assert _stored(db_session, new.id) == "attivo"
+    assert _stored(db_session, old.id) == "archiviato"
+
+def test_status_rows_follow_updates_and_deletes(db_session: Session):
+    dipendente, corso = _setup(db_session)
+    old = _cert(dipendente, corso, date(2020, 1, 1), date(2021, 1, 1))
+    new = _cert(dipendente, corso, date(2022, 1, 1), date.today() + timedelta(days=10))
+    db_session.add_all([old, new])
+    db_session.commit()
+    assert _stored(db_session, new.id) == "in_scadenza"
+    assert _stored(db_session, old.id) == "archiviato"
+
+    # Unlinking the old certificate makes it a plain expired orphan
+    old.dipendente_id = None
+    db_session.commit()
+    assert _stored(db_session, old.id) == "scaduto"
+
+    old.dipendente_id = dipendente.id
+    db_session.commit()
+    assert _stored(db_session, old.id) == "archiviato"
+
+    # Deleting the renewal brings the old one back to "scaduto"
+    new_id = new.id
+    db_session.delete(new)
+    db_session.commit()
+    assert _stored(db_session, new_id) is None
+    assert _stored(db_session, old.id) == "scaduto"
+
+def test_refresh_handles_date_rollover(db_session: Session):
+    dipendente, corso = _setup(db_session)
+    cert = _cert(dipendente, corso, date(2024, 1, 1), date.today() + timedelta(days=100))
+    db_session.add(cert)
+    db_session.commit()
+    assert _stored(db_session, cert.id) == "attivo"
+
+    # Pretend the row was computed yesterday: readers must not trust it
+    db_session.get(StatoCertificato, cert.id).aggiornato_il = date.today() - timedelta(days=1)
+    db_session.commit()
+    with patch.object(certificate_logic, "get_bulk_certificate_statuses", wraps=certificate_logic.get_bulk_certificate_statuses) as live:
+        assert certificate_logic.get_stored_statuses(db_session, [cert]) == {cert.id: "attivo"}
+        live.assert_called_once()
+
+    version = get_data_version()
+    assert certificate_logic.refresh_status_table(db_session) == 1
+    assert get_data_version() != version  # Cached list responses must not outlive the refresh
+    row = db_session.get(StatoCertificato, cert.id)
+    db_session.refresh(row)
+    assert row.aggiornato_il == date.today()
+
+def test_stored_statuses_match_live_computation(db_session: Session):
+    dipendente, corso = _setup(db_session)
+    certs = [
+        _cert(dipendente, corso, date(2019, 1, 1), date(2020, 1, 1)),
+        _cert(dipendente, corso, date(2021, 1, 1), date(2022, 1, 1)),
+        _cert(None, corso, date(2019, 1, 1), date(2020, 1, 1)),
+        _cert(dipendente, corso, date(2023, 1, 1), None),
+    ]
+    db_session.add_all(certs)
+    db_session.commit()
+
+    with patch.object(certificate_logic, "get_bulk_certificate_statuses") as live:
+        stored = certificate_logic.get_stored_statuses(db_session, certs)
+        live.assert_not_called()
+
+    assert stored == certificate_logic.get_bulk_certificate_statuses(db_session, certs)
+
+def test_status_counts(db_session: Session):
+    dipendente, corso = _setup(db_session)
+    db_session.add_all([
+        _cert(dipendente, corso, date(2019, 1, 1), date(2020, 1, 1)),
+        _cert(dipendente, corso, date(2023, 1, 1), date.today() + timedelta(days=365)),
+        _cert(None, corso, date(2019, 1, 1), date(2020, 1, 1)),
+    ])
+    db_session.commit()
+
+    # Drop one row: it is computed live and still counted
+    db_session.query(StatoCertificato).filter(StatoCertificato.stato == "scaduto").delete()
+    db_session.commit()
+
+    counts = certificate_logic.get_status_counts(db_session)
+    assert counts == {"ANTINCENDIO": {"archiviato": 1, "attivo": 1, "scaduto": 1}}
+
+def test_missing_issue_date_does_not_stop_the_table(db_session: Session):
+    dipendente, corso = _setup(db_session)
+    undated = _cert(dipendente, corso, None, date(2020, 1, 1))
+    old = _cert(dipendente, corso, date(2019, 1, 1), date(2020, 1, 1))
+    new = _cert(dipendente, corso, date(2021, 1, 1), date(2022, 1, 1))
+    db_session.add_all([undated, old, new])
+    db_session.commit()
+
+    expected = {undated.id: "scaduto", old.id: "archiviato", new.id: "scaduto"}
+    assert {cert_id: _stored(db_session, cert_id) for cert_id in expected} == expected
+    assert certificate_logic.refresh_status_table(db_session) == 3
+    assert certificate_logic.get_bulk_certificate_statuses(db_session, [undated, old, new]) == expected
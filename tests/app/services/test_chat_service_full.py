@@ -4,6 +4,11 @@ from datetime import date
 from app.services.chat_service import chat_service
 from app.db.models import User, Certificato, Dipendente, Corso
 
+@pytest.fixture(autouse=True)
+def mock_rate_limiter():
+    with patch("app.services.ai_extraction.rate_limiter") as limiter:
+        yield limiter
+
 def test_get_rag_context_empty_db():
     mock_db = MagicMock()
     # Mock counts (scalar() is used for func.count)
@@ -81,9 +86,10 @@ def test_get_rag_context_with_data():
     assert "DOCUMENTI DA VALIDARE/ORFANI (Top 1)" in context
     assert "ATEX" in context
 
-def test_chat_with_intelleo_success():
+def test_chat_with_intelleo_success(mock_rate_limiter):
     with patch("app.services.chat_service.settings") as mock_settings, \
-         patch("app.services.chat_service.genai") as mock_genai:
+         patch("app.services.chat_service.genai") as mock_genai, \
+         patch("app.services.chat_service.ai_clients.get_client") as mock_get_client:
 
         mock_settings.GEMINI_API_KEY_CHAT = "valid_key"
 
@@ -96,7 +102,11 @@ def test_chat_with_intelleo_success():
         reply = chat_service.chat_with_intelleo("Ciao", [], "Context")
 
         assert reply == "Risposta AI"
-        mock_genai.configure.assert_called_with(api_key="valid_key")
+        mock_genai.configure.assert_not_called()
+        mock_get_client.assert_called_with("chat", "valid_key")
+        assert mock_model._client is mock_get_client.return_value
+        mock_rate_limiter.acquire.assert_called_once_with(0)  # PRIORITY_INTERACTIVE
+        mock_rate_limiter.succeeded.assert_called_once()
 
 def test_chat_with_intelleo_missing_key():
     with patch("app.services.chat_service.settings") as mock_settings:
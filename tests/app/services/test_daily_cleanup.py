@@ -44,10 +44,10 @@ def test_daily_maintenance_calls_cleanup(mock_db_session, test_dirs):
          mock.patch("app.services.file_maintenance.clean_all_empty_folders") as mock_clean, \
          mock.patch("app.services.file_maintenance.log_security_action"):
 
-         mock_settings.DATABASE_PATH = str(test_dirs)
+         mock_settings.DOCUMENTS_FOLDER = str(test_dirs)
 
          organize_expired_files(mock_db_session)
 
          # Assert cleanup called
          expected_path = os.path.join(str(test_dirs), "DOCUMENTI DIPENDENTI")
-         mock_clean.assert_called_with(expected_path)
+         assert mock_clean.call_args.args == (expected_path,)
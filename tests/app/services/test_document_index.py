@@ -0,0 +1,91 @@
+import os
+import time
+from types import SimpleNamespace
+import pytest
+from app.services import document_index as document_index_module
+from app.services.document_index import document_index, _EventHandler
+from app.services.document_locator import find_document
+
+CERT = {"nome": "ROSSI MARIO", "matricola": "12345", "categoria": "ANTINCENDIO", "data_scadenza": "31/12/2025"}
+FILENAME = "ROSSI MARIO (12345) - ANTINCENDIO - 31_12_2025.pdf"
+
+@pytest.fixture
+def db_path(tmp_path):
+    return os.path.normpath(str(tmp_path / "db"))
+
+def _create(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    return os.path.normpath(path)
+
+def _age_folders(top):
+    """Moves folder mtimes out of the granularity window, as for a tree untouched for a while."""
+    past = time.time() - 60
+    for root, _, _ in os.walk(top):
+        os.utime(root, (past, past))
+
+def test_reconcile_only_relists_changed_folders(db_path):
+    docs = os.path.join(db_path, "DOCUMENTI DIPENDENTI")
+    _create(os.path.join(docs, "BIANCHI LUCA (1)", "ATEX", "ATTIVO", "BIANCHI LUCA (1) - ATEX - 01_01_2030.pdf"))
+    _age_folders(db_path)
+    assert find_document(db_path, CERT) is None
+    assert document_index.reconcile() == 0
+
+    target = _create(os.path.join(docs, "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", FILENAME))
+    assert document_index.reconcile() == 1  # DOCUMENTI DIPENDENTI: the new subtree is scanned from there
+    assert find_document(db_path, CERT) == target
+
+    os.remove(target)
+    os.rmdir(os.path.dirname(target))
+    document_index.reconcile()
+    snapshot = document_index.snapshot(db_path)
+    assert os.path.normcase(target) not in snapshot.entries
+    assert os.path.normcase(os.path.dirname(target)) not in snapshot.dirs
+
+def test_miss_reconciles_changed_folders(db_path, monkeypatch):
+    assert find_document(db_path, CERT) is None
+    target = _create(os.path.join(db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", FILENAME))
+    assert find_document(db_path, CERT) is None  # Reconciled moments ago
+
+    monkeypatch.setattr(document_index_module, "RECONCILE_ON_MISS_AFTER", 0)
+    assert find_document(db_path, CERT) == target
+
+def test_miss_stats_folders_without_the_lock(db_path, monkeypatch):
+    import threading
+    assert find_document(db_path, CERT) is None
+    target = _create(os.path.join(db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", FILENAME))
+    stat_folders = document_index_module._Snapshot.changed_dirs
+    free = []
+
+    def try_lock():
+        if document_index._lock.acquire(timeout=1):
+            document_index._lock.release()
+            free.append(True)
+
+    def changed_dirs(folders):
+        # Another thread must be able to use the index while the folders are statted
+        probe = threading.Thread(target=try_lock)
+        probe.start()
+        probe.join()
+        return stat_folders(folders)
+
+    monkeypatch.setattr(document_index_module._Snapshot, "changed_dirs", staticmethod(changed_dirs))
+    monkeypatch.setattr(document_index_module, "RECONCILE_ON_MISS_AFTER", 0)
+    assert find_document(db_path, CERT) == target
+    assert free == [True]
+
+def test_change_notifications_update_the_index(db_path):
+    folder = os.path.join(db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO")
+    os.makedirs(folder)
+    handler = _EventHandler(document_index._lock, document_index.snapshot(db_path))
+
+    created = _create(os.path.join(folder, "ATTIVO", FILENAME))
+    handler.dispatch(SimpleNamespace(event_type="created", is_directory=True, src_path=os.path.dirname(created)))
+    assert find_document(db_path, CERT) == created
+
+    moved = _create(os.path.join(folder, "STORICO", FILENAME))
+    os.remove(created)
+    handler.dispatch(SimpleNamespace(event_type="moved", is_directory=False, src_path=created, dest_path=moved))
+    assert os.path.normcase(created) not in document_index.snapshot(db_path).entries
+    assert find_document(db_path, CERT) == moved
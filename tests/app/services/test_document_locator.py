@@ -1,13 +1,18 @@
 import pytest
 import os
-from unittest.mock import patch, MagicMock
 from app.services.document_locator import find_document
-from app.utils.file_security import sanitize_filename
+from app.services.document_index import document_index
 
 @pytest.fixture
-def mock_db_path():
+def mock_db_path(tmp_path):
     # Use os.path.normpath to ensure the base path is consistent with the OS
-    return os.path.normpath("/mock/db/path")
+    return os.path.normpath(str(tmp_path / "db"))
+
+def _create(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    return os.path.normpath(path)
 
 @pytest.fixture
 def base_cert_data():
@@ -21,28 +26,18 @@ def base_cert_data():
 def test_find_document_success_active(mock_db_path, base_cert_data):
     """Test finding a document in the primary status folder (ATTIVO)."""
     expected_filename = "ROSSI MARIO (12345) - ANTINCENDIO - 31_12_2025.pdf"
-    expected_path = os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", expected_filename)
-    expected_path = os.path.normpath(expected_path)
-
-    with patch("os.path.isfile") as mock_isfile:
-        # Simulate file exists only at the expected path
-        # Need to handle potential path normalization in lambda
-        mock_isfile.side_effect = lambda x: os.path.normpath(x) == expected_path
+    expected_path = _create(os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", expected_filename))
 
-        result = find_document(mock_db_path, base_cert_data)
-        assert result == expected_path
+    result = find_document(mock_db_path, base_cert_data)
+    assert result == expected_path
 
 def test_find_document_success_fallback_status(mock_db_path, base_cert_data):
     """Test finding a document in a fallback status folder (e.g., STORICO)."""
     expected_filename = "ROSSI MARIO (12345) - ANTINCENDIO - 31_12_2025.pdf"
-    target_path = os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "STORICO", expected_filename)
-    target_path = os.path.normpath(target_path)
-
-    with patch("os.path.isfile") as mock_isfile:
-        mock_isfile.side_effect = lambda x: os.path.normpath(x) == target_path
+    target_path = _create(os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "STORICO", expected_filename))
 
-        result = find_document(mock_db_path, base_cert_data)
-        assert result == target_path
+    result = find_document(mock_db_path, base_cert_data)
+    assert result == target_path
 
 def test_find_document_missing_matricola(mock_db_path):
     """Test that missing matricola defaults to 'N-A'."""
@@ -55,44 +50,55 @@ def test_find_document_missing_matricola(mock_db_path):
 
     # Expect folder "VERDI LUIGI (N-A)"
     expected_filename = "VERDI LUIGI (N-A) - VISITA MEDICA - 01_01_2024.pdf"
-    expected_path = os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "VERDI LUIGI (N-A)", "VISITA MEDICA", "ATTIVO", expected_filename)
-    expected_path = os.path.normpath(expected_path)
+    expected_path = _create(os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "VERDI LUIGI (N-A)", "VISITA MEDICA", "ATTIVO", expected_filename))
 
-    with patch("os.path.isfile") as mock_isfile:
-        mock_isfile.side_effect = lambda x: os.path.normpath(x) == expected_path
-
-        result = find_document(mock_db_path, cert_data)
-        assert result == expected_path
+    result = find_document(mock_db_path, cert_data)
+    assert result == expected_path
 
 def test_find_document_date_parsing_formats(mock_db_path, base_cert_data):
     """Test handling of different date formats or invalid dates."""
     # Case 1: None -> 'no scadenza'
     base_cert_data["data_scadenza"] = None
     expected_filename_1 = "ROSSI MARIO (12345) - ANTINCENDIO - no scadenza.pdf"
-    path_1 = os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", expected_filename_1)
-    path_1 = os.path.normpath(path_1)
+    path_1 = _create(os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", expected_filename_1))
 
-    with patch("os.path.isfile") as mock_isfile:
-        mock_isfile.side_effect = lambda x: os.path.normpath(x) == path_1
-        result = find_document(mock_db_path, base_cert_data)
-        assert result == path_1
+    result = find_document(mock_db_path, base_cert_data)
+    assert result == path_1
 
 def test_find_document_in_error_folders(mock_db_path, base_cert_data):
     """Test finding a document in the ERRORI ANALISI structure."""
     expected_filename = "ROSSI MARIO (12345) - ANTINCENDIO - 31_12_2025.pdf"
     # Structure: ERRORI ANALISI / <ErrCategory> / <EmployeeFolder> / <Category> / <Status> / <Filename>
     # Note: Logic iterates error_categories. Let's place it in "ASSENZA MATRICOLE"
-    target_path = os.path.join(mock_db_path, "ERRORI ANALISI", "ASSENZA MATRICOLE", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", expected_filename)
-    target_path = os.path.normpath(target_path)
+    target_path = _create(os.path.join(mock_db_path, "ERRORI ANALISI", "ASSENZA MATRICOLE", "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", expected_filename))
+
+    result = find_document(mock_db_path, base_cert_data)
+    assert result == target_path
+
+def test_find_document_partial_and_deep_search(mock_db_path, base_cert_data):
+    """Test the name/category fallbacks, answered from the name token index."""
+    docs = os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI")
+    renamed = _create(os.path.join(docs, "ROSSI MARIO (12345)", "ANTINCENDIO", "ATTIVO", "ROSSI MARIO (12345) - ANTINCENDIO - copia.pdf"))
+    elsewhere = _create(os.path.join(docs, "ALTRO", "scan ROSSI MARIO ANTINCENDIO.pdf"))
+    _create(os.path.join(docs, "ALTRO", "ROSSI MARIA - ANTINCENDIO.pdf"))
+
+    assert find_document(mock_db_path, base_cert_data) == renamed
+
+    os.remove(renamed)  # Removed outside the application: dropped from the index
+    assert find_document(mock_db_path, base_cert_data) == elsewhere
+
+def test_find_document_sees_recorded_moves(mock_db_path, base_cert_data):
+    """Test that files moved by the application are found without a rescan."""
+    assert find_document(mock_db_path, base_cert_data) is None
 
-    with patch("os.path.isfile") as mock_isfile:
-        mock_isfile.side_effect = lambda x: os.path.normpath(x) == target_path
+    filename = "ROSSI MARIO (12345) - ANTINCENDIO - 31_12_2025.pdf"
+    target_path = _create(os.path.join(mock_db_path, "DOCUMENTI DIPENDENTI", "ROSSI MARIO (12345)", "ANTINCENDIO", "SCADUTO", filename))
+    assert find_document(mock_db_path, base_cert_data) is None  # Not rescanned yet
 
-        result = find_document(mock_db_path, base_cert_data)
-        assert result == target_path
+    document_index.record_added(target_path)
+    assert find_document(mock_db_path, base_cert_data) == target_path
 
 def test_find_document_not_found(mock_db_path, base_cert_data):
     """Test returning None when file is nowhere."""
-    with patch("os.path.isfile", return_value=False):
-        result = find_document(mock_db_path, base_cert_data)
-        assert result is None
+    result = find_document(mock_db_path, base_cert_data)
+    assert result is None
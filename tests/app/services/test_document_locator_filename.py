@@ -1,14 +1,13 @@
 import pytest
 import os
-from unittest.mock import patch
 from app.services.document_locator import find_document
 
-def test_find_document_sanitizes_path():
+def test_find_document_sanitizes_path(tmp_path):
     """
     This test verifies that document_locator correctly sanitizes input data
     to match the file system naming conventions.
     """
-    db_path = "/mock/db"
+    db_path = str(tmp_path / "db")
     # Ensure consistent path format across OS
     db_path = os.path.normpath(db_path)
     
@@ -25,10 +24,10 @@ def test_find_document_sanitizes_path():
     expected_path = os.path.join(db_path, "DOCUMENTI DIPENDENTI", sanitized_folder, "ANTINCENDIO", "ATTIVO", sanitized_filename)
     expected_path = os.path.normpath(expected_path)
 
-    with patch("os.path.isfile") as mock_isfile:
-        mock_isfile.side_effect = lambda p: os.path.normpath(p) == expected_path
+    os.makedirs(os.path.dirname(expected_path))
+    open(expected_path, "wb").close()
 
-        result = find_document(db_path, cert_data)
+    result = find_document(db_path, cert_data)
 
-        # This assertion will fail until the bug is fixed
-        assert result == expected_path
+    # This assertion will fail until the bug is fixed
+    assert result == expected_path
@@ -0,0 +1,58 @@
+from datetime import timedelta
+from sqlalchemy.orm import Session
+from app.db.models import AIExtractionCache, utc_now
+from app.services import extraction_cache
+
+RESULT = {"nome": "ROSSI MARIO", "corso": "ANTINCENDIO", "categoria": "ANTINCENDIO"}
+
+def test_store_and_lookup(db_session: Session):
+    key = extraction_cache.content_hash(b"%PDF-1.4 a")
+    assert extraction_cache.lookup(db_session, key) is None
+
+    extraction_cache.store(db_session, key, RESULT)
+    assert extraction_cache.lookup(db_session, key) == RESULT
+    assert extraction_cache.lookup(db_session, key) == RESULT
+    assert db_session.query(AIExtractionCache).one().hits == 2
+
+def test_only_final_results_are_cached(db_session: Session):
+    quota = extraction_cache.content_hash(b"quota")
+    rejected = extraction_cache.content_hash(b"rejected")
+    extraction_cache.store(db_session, quota, {"error": "AI call failed (Quota/Limit)", "status_code": 429})
+    extraction_cache.store(db_session, rejected, {"error": "REJECTED: Syllabus", "is_rejected": True})
+
+    assert extraction_cache.lookup(db_session, quota) is None
+    assert extraction_cache.lookup(db_session, rejected)["is_rejected"] is True
+
+def test_prompt_change_invalidates_entries(db_session: Session, mocker):
+    key = extraction_cache.content_hash(b"%PDF-1.4 a")
+    extraction_cache.store(db_session, key, RESULT)
+
+    extraction_cache.prompt_version.cache_clear()
+    mocker.patch("app.services.ai_extraction._generate_prompt", return_value="new prompt")
+    try:
+        assert extraction_cache.lookup(db_session, key) is None
+        assert extraction_cache.prune(db_session) == 1
+    finally:
+        extraction_cache.prompt_version.cache_clear()
+
+def test_prune_by_age_and_size(db_session: Session, monkeypatch):
+    for i in range(4):
+        extraction_cache.store(db_session, f"hash{i}", RESULT)
+    entries = {e.content_hash: e for e in db_session.query(AIExtractionCache)}
+    entries["hash0"].last_used_at = utc_now() - timedelta(days=extraction_cache.CACHE_MAX_AGE_DAYS + 1)
+    entries["hash1"].last_used_at = utc_now() - timedelta(days=10)
+    db_session.commit()
+
+    monkeypatch.setattr(extraction_cache, "CACHE_MAX_ENTRIES", 2)
+    assert extraction_cache.prune(db_session) == 2
+    assert {e.content_hash for e in db_session.query(AIExtractionCache)} == {"hash2", "hash3"}
+
+def test_upload_reuses_cached_extraction(test_client, mock_ai_service):
+    mock_ai_service.return_value = dict(RESULT)
+    for name in ("a.pdf", "copia di a.pdf"):
+        response = test_client.post("/upload-pdf/", files={"file": (name, b"%PDF-1.4 same", "application/pdf")})
+        assert response.status_code == 200
+        assert response.json()["entities"]["nome"] == "ROSSI MARIO"
+    assert mock_ai_service.call_count == 1
+
+    assert test_client.delete("/system/ai-cache").json() == {"deleted": 1}
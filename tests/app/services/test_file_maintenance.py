@@ -1,14 +1,14 @@
 import pytest
 import os
 from unittest.mock import MagicMock, patch
-from app.services import file_maintenance
+from app.services import file_maintenance, sync_service
 from app.db.models import Certificato, Dipendente, Corso
 from datetime import date, timedelta
 
 @pytest.fixture
 def mock_settings():
     with patch("app.services.file_maintenance.settings") as mock:
-        mock.DATABASE_PATH = os.path.join("mock", "db", "path")
+        mock.DOCUMENTS_FOLDER = os.path.join("mock", "db", "path")
         yield mock
 
 @pytest.fixture
@@ -16,64 +16,35 @@ def mock_db_session():
     return MagicMock()
 
 def test_organize_expired_files_no_db_path(mock_settings, mock_db_session):
-    mock_settings.DATABASE_PATH = None
+    mock_settings.DOCUMENTS_FOLDER = None
     with patch("app.services.file_maintenance.get_user_data_dir", return_value=None):
         file_maintenance.organize_expired_files(mock_db_session)
         # Should return early
         mock_db_session.query.assert_not_called()
 
-def test_organize_expired_files_move_success(mock_settings, mock_db_session):
-    # Setup Data
+def test_organize_expired_files_move_success(mock_settings, db_session, tmp_path):
     dip = Dipendente(nome="Mario", cognome="Rossi", matricola="123")
-    corso = Corso(categoria_corso="SICUREZZA")
-    cert = Certificato(dipendente=dip, corso=corso, data_scadenza_calcolata=date.today() - timedelta(days=1))
-
-    mock_db_session.query.return_value.filter.return_value.all.return_value = [cert]
-
-    # Use OS-specific paths
-    base_path = os.path.join("mock", "db", "path")
-    # Note: find_document result is usually absolute.
-    # We construct a path that matches what find_document returns (mocked) and what logic expects.
-
-    src_path = os.path.join(base_path, "DIP", "SICUREZZA", "ATTIVO", "file.pdf")
-    # Target structure: .../Category/STORICO/file.pdf
-    dst_path = os.path.join(base_path, "DIP", "SICUREZZA", "STORICO", "file.pdf")
-
-    # Mocks
-    with patch("app.services.file_maintenance.certificate_logic.get_certificate_status", return_value="scaduto"), \
-         patch("app.services.sync_service.find_document", return_value=src_path), \
-         patch("app.services.sync_service.construct_certificate_path", return_value=dst_path), \
-         patch("os.path.exists") as mock_exists, \
-         patch("os.path.isfile", return_value=True), \
-         patch("os.makedirs") as mock_makedirs, \
-         patch("shutil.move") as mock_move:
-
-         # Mock Audit Log check (return None so it runs)
-         def query_side_effect(model):
-             m = MagicMock()
-             if model.__name__ == 'AuditLog':
-                 m.filter.return_value.first.return_value = None # No existing log today
-                 return m
-             elif model.__name__ == 'Certificato':
-                 m.filter.return_value.all.return_value = [cert]
-                 return m
-             return m
-         
-         mock_db_session.query.side_effect = query_side_effect
-
-         # os.path.exists side effect: True for DB path, False for STORICO dir (so it creates it)
-         def exists_side_effect(path):
-             # Normalize for comparison
-             path = os.path.normpath(path)
-             if path == os.path.normpath(base_path): return True
-             if "STORICO" in path: return False
-             return True
-         mock_exists.side_effect = exists_side_effect
-
-         file_maintenance.organize_expired_files(mock_db_session)
-
-         mock_makedirs.assert_called() # Should create STORICO
-         mock_move.assert_called_with(src_path, dst_path)
+    corso = Corso(nome_corso="Sicurezza", validita_mesi=12, categoria_corso="SICUREZZA")
+    expiry = date.today() - timedelta(days=1)
+    db_session.add(Certificato(dipendente=dip, corso=corso, data_rilascio=expiry - timedelta(days=365),
+                               data_scadenza_calcolata=expiry))
+    db_session.commit()
+
+    filename = f"Rossi Mario (123) - SICUREZZA - {expiry.strftime('%d_%m_%Y')}.pdf"
+    category_dir = os.path.join(str(tmp_path), "DOCUMENTI DIPENDENTI", "Rossi Mario (123)", "SICUREZZA")
+    src_path = os.path.join(category_dir, "ATTIVO", filename)
+    os.makedirs(os.path.dirname(src_path))
+    with open(src_path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    mock_settings.DOCUMENTS_FOLDER = str(tmp_path)
+
+    with patch("app.services.file_maintenance.certificate_logic.get_certificate_status") as mock_status:
+        file_maintenance.organize_expired_files(db_session)
+        mock_status.assert_not_called()  # Bulk statuses only
+
+    assert os.path.exists(os.path.join(category_dir, "STORICO", filename))
+    assert not os.path.exists(os.path.dirname(src_path))
+    assert not os.path.exists(os.path.join(str(tmp_path), sync_service.ARCHIVE_JOURNAL_NAME))
 
 def test_organize_expired_files_already_archived(mock_settings, mock_db_session):
     cert = Certificato(data_scadenza_calcolata=date.today() - timedelta(days=1))
@@ -82,7 +53,7 @@ def test_organize_expired_files_already_archived(mock_settings, mock_db_session)
     path = os.path.join("mock", "db", "path", "DIP", "SICUREZZA", "STORICO", "file.pdf")
 
     with patch("app.services.file_maintenance.certificate_logic.get_certificate_status", return_value="scaduto"), \
-         patch("app.services.file_maintenance.find_document", return_value=path), \
+         patch("app.services.sync_service.find_document", return_value=path), \
          patch("os.path.exists", return_value=True), \
          patch("os.path.isfile", return_value=True), \
          patch("shutil.move") as mock_move:
@@ -96,8 +67,42 @@ def test_organize_expired_files_active_status(mock_settings, mock_db_session):
     mock_db_session.query.return_value.filter.return_value.all.return_value = [cert]
 
     with patch("app.services.file_maintenance.certificate_logic.get_certificate_status", return_value="attivo"), \
-         patch("app.services.file_maintenance.find_document", return_value="/path/file.pdf"), \
+         patch("app.services.sync_service.find_document", return_value="/path/file.pdf"), \
          patch("shutil.move") as mock_move:
 
          file_maintenance.organize_expired_files(mock_db_session)
          mock_move.assert_not_called()
+
+def test_scan_and_archive_orphans_uses_one_scan(db_session, tmp_path):
+    dip = Dipendente(nome="Mario", cognome="Rossi", matricola="123")
+    corso = Corso(nome_corso="Antincendio", validita_mesi=60, categoria_corso="ANTINCENDIO")
+    db_session.add(Certificato(dipendente=dip, corso=corso, data_rilascio=date(2020, 1, 1),
+                               data_scadenza_calcolata=date(2030, 1, 1)))
+    db_session.commit()
+
+    db_path = str(tmp_path)
+    docs = os.path.join(db_path, "DOCUMENTI DIPENDENTI")
+    known_dir = os.path.join(docs, "Rossi Mario (123)", "ANTINCENDIO", "ATTIVO")
+    orphan_dir = os.path.join(docs, "Verdi Luigi (9)", "ATEX", "ATTIVO")
+    os.makedirs(known_dir)
+    os.makedirs(orphan_dir)
+    os.makedirs(os.path.join(docs, "CESTINO"))
+    for path in (os.path.join(known_dir, "Rossi Mario (123) - ANTINCENDIO - 01_01_2030.pdf"),
+                 os.path.join(orphan_dir, "Verdi Luigi (9) - ATEX - 01_01_2030.pdf"),
+                 os.path.join(docs, "CESTINO", "old.pdf")):
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4")
+
+    with patch("os.walk") as mock_walk, patch("app.services.file_maintenance.log_security_action"):
+        assert file_maintenance.scan_and_archive_orphans(db_session, db_path) == 1
+        mock_walk.assert_not_called()
+
+    assert os.path.exists(os.path.join(docs, "ORFANI", "Verdi Luigi (9)", "ATEX", "ATTIVO", "Verdi Luigi (9) - ATEX - 01_01_2030.pdf"))
+    assert os.listdir(known_dir) and os.path.exists(os.path.join(docs, "CESTINO", "old.pdf"))
+
+    snapshot = file_maintenance.document_index.snapshot(db_path)
+    empty = snapshot.empty_dirs(docs)
+    assert empty[0] == orphan_dir and os.path.join(docs, "Verdi Luigi (9)") in empty
+    file_maintenance.clean_all_empty_folders(docs, folders=empty)
+    assert not os.path.exists(os.path.join(docs, "Verdi Luigi (9)"))
+    assert os.path.exists(known_dir)
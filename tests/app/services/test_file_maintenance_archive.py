@@ -1,15 +1,22 @@
 import pytest
+import json
 import os
 from unittest.mock import MagicMock, patch
-from app.services import file_maintenance
+from app.services import file_maintenance, sync_service
 from app.db.models import Certificato, Dipendente, Corso, AuditLog
 from datetime import date, timedelta
 
+def _create(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")
+    return path
+
 def test_organize_expired_files_moves_archived():
     # Setup Data
     dip = Dipendente(nome="Mario", cognome="Rossi", matricola="123")
     corso = Corso(categoria_corso="SICUREZZA")
-    cert = Certificato(dipendente=dip, corso=corso, data_scadenza_calcolata=date.today() - timedelta(days=1))
+    cert = Certificato(id=1, dipendente=dip, corso=corso, data_scadenza_calcolata=date.today() - timedelta(days=1))
 
     mock_db_session = MagicMock()
 
@@ -20,26 +27,82 @@ def test_organize_expired_files_moves_archived():
             return mock_query
         elif model == Certificato:
             mock_query = MagicMock()
-            mock_query.filter.return_value.all.return_value = [cert]
+            mock_query.options.return_value.filter.return_value.all.return_value = [cert]
             return mock_query
         return MagicMock()
 
     mock_db_session.query.side_effect = query_side_effect
 
     base_path = os.path.join("mock", "db", "path")
+    moves = [{"certificato_id": 1, "source": "a.pdf", "target": "b.pdf"}]
 
     # Mocks
     with patch("app.services.file_maintenance.settings") as mock_settings, \
-         patch("app.services.file_maintenance.certificate_logic.get_certificate_status", return_value="archiviato"), \
-         patch("app.services.file_maintenance.archive_certificate_file", return_value=True) as mock_archive_func, \
+         patch("app.services.file_maintenance.certificate_logic.get_bulk_certificate_statuses", return_value={1: "archiviato"}) as mock_statuses, \
+         patch("app.services.file_maintenance.plan_archive_moves", return_value=moves) as mock_plan, \
+         patch("app.services.file_maintenance.execute_archive_moves", return_value=1) as mock_execute, \
          patch("app.services.file_maintenance.scan_and_archive_orphans", return_value=0), \
          patch("app.services.file_maintenance.clean_all_empty_folders"), \
          patch("app.services.file_maintenance.cleanup_audit_logs"), \
+         patch("app.services.file_maintenance.log_security_action") as mock_log, \
          patch("os.path.exists", return_value=True): # Fix: Mock existence of database path
 
-         mock_settings.DATABASE_PATH = base_path
+         mock_settings.DOCUMENTS_FOLDER = base_path
 
          file_maintenance.organize_expired_files(mock_db_session)
 
-         # Assert that archive_certificate_file was called with the certificate
-         mock_archive_func.assert_called_with(mock_db_session, cert)
+         # All expired certificates are planned together from the bulk statuses
+         mock_statuses.assert_called_once_with(mock_db_session, [cert])
+         mock_plan.assert_called_once_with([cert], base_path, {1: "archiviato"})
+         mock_execute.assert_called_once_with(moves, base_path)
+         assert "Moved 1 expired files" in mock_log.call_args.args[3]
+
+def test_maintenance_uses_the_documents_folder(db_session, tmp_path, monkeypatch):
+    from app.core.config import settings
+    # A .db path that does not exist yet still means "the folder next to it"
+    monkeypatch.setitem(settings.mutable._data, "DATABASE_PATH", str(tmp_path / "database.db"))
+
+    with patch("app.services.file_maintenance.resume_archive_moves", side_effect=RuntimeError("stop")) as mock_resume:
+        with pytest.raises(RuntimeError):
+            file_maintenance.organize_expired_files(db_session)
+    assert mock_resume.call_args.args == (str(tmp_path),)
+
+def test_plan_archive_moves_skips_current_and_missing(tmp_path):
+    db_path = str(tmp_path)
+    corso = Corso(categoria_corso="SICUREZZA")
+    scaduto = Certificato(id=1, dipendente=Dipendente(nome="Mario", cognome="Rossi", matricola="1"),
+                          corso=corso, data_scadenza_calcolata=date(2020, 1, 1))
+    attivo = Certificato(id=2, dipendente=Dipendente(nome="Luca", cognome="Bianchi", matricola="2"),
+                         corso=corso, data_scadenza_calcolata=date(2020, 1, 1))
+    senza_file = Certificato(id=3, dipendente=Dipendente(nome="Anna", cognome="Verdi", matricola="3"),
+                             corso=corso, data_scadenza_calcolata=date(2020, 1, 1))
+    docs = os.path.join(db_path, "DOCUMENTI DIPENDENTI")
+    source = _create(os.path.join(docs, "Rossi Mario (1)", "SICUREZZA", "ATTIVO", "Rossi Mario (1) - SICUREZZA - 01_01_2020.pdf"))
+    _create(os.path.join(docs, "Bianchi Luca (2)", "SICUREZZA", "ATTIVO", "Bianchi Luca (2) - SICUREZZA - 01_01_2020.pdf"))
+
+    statuses = {1: "scaduto", 2: "attivo", 3: "archiviato"}
+    moves = sync_service.plan_archive_moves([scaduto, attivo, senza_file], db_path, statuses)
+
+    assert moves == [{"certificato_id": 1, "source": source,
+                      "target": os.path.join(docs, "Rossi Mario (1)", "SICUREZZA", "STORICO", os.path.basename(source))}]
+
+def test_interrupted_archive_batch_is_resumed(tmp_path):
+    db_path = str(tmp_path)
+    moves = []
+    for name in ("a", "b", "c"):
+        source = _create(os.path.join(db_path, "DOCUMENTI DIPENDENTI", name, "ATTIVO", f"{name}.pdf"))
+        moves.append({"certificato_id": len(moves), "source": source, "target": source.replace("ATTIVO", "STORICO")})
+
+    # Interrupted after the first move was journaled and while the second was
+    # being recorded: its file is moved, its journal line cut short
+    for move in moves[:2]:
+        os.makedirs(os.path.dirname(move["target"]))
+        os.replace(move["source"], move["target"])
+    journal = os.path.join(db_path, sync_service.ARCHIVE_JOURNAL_NAME)
+    with open(journal, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"moves": moves}) + "\n" + json.dumps({"done": 0}) + "\n" + '{"do')
+
+    assert sync_service.resume_archive_moves(db_path) == 1
+    assert all(os.path.exists(move["target"]) for move in moves)
+    assert not os.path.exists(journal)
+    assert sync_service.resume_archive_moves(db_path) == 0
@@ -16,7 +16,7 @@ def test_maintenance_skips_if_already_ran(mock_db_session):
     with patch("app.services.file_maintenance.settings") as mock_settings, \
          patch("app.services.file_maintenance.os.path.exists", return_value=True):
 
-        mock_settings.DATABASE_PATH = "/mock"
+        mock_settings.DOCUMENTS_FOLDER = "/mock"
 
         file_maintenance.organize_expired_files(mock_db_session)
 
@@ -57,7 +57,7 @@ def test_maintenance_runs_if_not_ran_today(mock_db_session):
          patch("app.services.file_maintenance.os.path.exists", return_value=True), \
          patch("app.services.file_maintenance.log_security_action") as mock_log:
 
-        mock_settings.DATABASE_PATH = "/mock"
+        mock_settings.DOCUMENTS_FOLDER = "/mock"
 
         file_maintenance.organize_expired_files(mock_db_session)
 
@@ -144,7 +144,7 @@ def test_check_and_send_alerts_success(mock_db_session, sample_certificates, moc
     mock_db_session.query.return_value.all.return_value = sample_certificates
 
     with patch("app.services.notification_service.SessionLocal", return_value=mock_db_session), \
-         patch("app.services.notification_service.certificate_logic.get_certificate_status", return_value="scaduto"), \
+         patch("app.services.notification_service.certificate_logic.get_stored_statuses", side_effect=lambda db, certs: {c.id: "scaduto" for c in certs}), \
          patch("app.services.notification_service.generate_pdf_report_in_memory", return_value=b"PDF"), \
          patch("app.services.notification_service.send_email_notification") as mock_send:
 
@@ -159,7 +159,7 @@ def test_check_and_send_alerts_pdf_gen_failure(mock_db_session, sample_certifica
     mock_db_session.query.return_value.all.return_value = sample_certificates
 
     with patch("app.services.notification_service.SessionLocal", return_value=mock_db_session), \
-         patch("app.services.notification_service.certificate_logic.get_certificate_status", return_value="scaduto"), \
+         patch("app.services.notification_service.certificate_logic.get_stored_statuses", side_effect=lambda db, certs: {c.id: "scaduto" for c in certs}), \
          patch("app.services.notification_service.generate_pdf_report_in_memory", return_value=None), \
          patch("app.services.notification_service.logging.error") as mock_log:
 
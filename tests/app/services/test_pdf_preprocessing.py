@@ -0,0 +1,56 @@
+import io
+import pytest
+from fpdf import FPDF
+from app.core.config import settings
+from app.services import pdf_preprocessing
+
+TEXT = "ATTESTATO DI FORMAZIONE - Si certifica che ROSSI MARIO ha frequentato il corso ANTINCENDIO RISCHIO MEDIO. "
+
+def _pdf(text=None, image=False, blank_pages=0):
+    pdf = FPDF()
+    for _ in range(blank_pages):
+        pdf.add_page()
+    pdf.add_page()
+    if text:
+        pdf.set_font("helvetica", size=12)
+        pdf.multi_cell(0, 10, text)
+    if image:
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.effect_noise((1200, 1600), 60).convert("RGB").save(buffer, format="PNG")
+        pdf.image(buffer, x=0, y=0, w=210)
+    return bytes(pdf.output())
+
+def test_original_file_without_pymupdf(monkeypatch):
+    monkeypatch.setattr(pdf_preprocessing, "pymupdf", None)
+    before = pdf_preprocessing.stats()
+    pdf_bytes = _pdf(TEXT * 3)
+
+    assert pdf_preprocessing.prepare_parts(pdf_bytes) == [{"mime_type": "application/pdf", "data": pdf_bytes}]
+    after = pdf_preprocessing.stats()
+    assert after["original"] == before["original"] + 1
+    assert after["bytes_saved"] == before["bytes_saved"]
+
+def test_disabled_by_setting(monkeypatch):
+    pytest.importorskip("pymupdf")
+    monkeypatch.setitem(settings.mutable._data, "AI_PDF_PREPROCESSING", False)
+    pdf_bytes = _pdf(TEXT * 3)
+    assert pdf_preprocessing.prepare_parts(pdf_bytes)[0]["mime_type"] == "application/pdf"
+
+def test_text_layer_is_sent_as_text():
+    pytest.importorskip("pymupdf")
+    parts = pdf_preprocessing.prepare_parts(_pdf(TEXT * 3, blank_pages=1))
+    assert len(parts) == 1 and isinstance(parts[0], str)
+    assert "--- Pagina 2 ---" in parts[0] and "ROSSI MARIO" in parts[0]
+    assert pdf_preprocessing.stats()["bytes_saved"] > 0
+
+def test_scanned_pages_are_rendered():
+    pytest.importorskip("pymupdf")
+    pdf_bytes = _pdf(image=True)
+    parts = pdf_preprocessing.prepare_parts(pdf_bytes)
+    assert [part["mime_type"] for part in parts] == ["image/jpeg"]
+    assert len(parts[0]["data"]) < len(pdf_bytes)
+
+def test_unreadable_file_is_sent_unchanged():
+    pytest.importorskip("pymupdf")
+    assert pdf_preprocessing.prepare_parts(b"not a pdf") == [{"mime_type": "application/pdf", "data": b"not a pdf"}]
@@ -42,7 +42,8 @@ def test_sync_service_calls_bulk():
 
     with patch("app.services.sync_service.certificate_logic.get_bulk_certificate_statuses") as mock_bulk, \
          patch("app.services.sync_service.certificate_logic.get_certificate_status") as mock_single, \
-         patch("app.services.sync_service.find_document", return_value="/tmp/found.pdf"), \
+         patch("app.services.sync_service.document_search", return_value=lambda snapshot: "/tmp/found.pdf"), \
+         patch("app.services.sync_service.document_index.query", side_effect=lambda db_path, read, **kwargs: read(None)), \
          patch("os.path.exists", side_effect=exists_side_effect), \
          patch("app.services.sync_service.construct_certificate_path", return_value="/tmp/found.pdf"), \
          patch("shutil.move"):
@@ -74,7 +75,8 @@ def test_file_move_permission_error():
         return True
 
     with patch("app.services.sync_service.certificate_logic.get_bulk_certificate_statuses", return_value={1:"attivo"}), \
-         patch("app.services.sync_service.find_document", return_value="/old/path.pdf"), \
+         patch("app.services.sync_service.document_search", return_value=lambda snapshot: "/old/path.pdf"), \
+         patch("app.services.sync_service.document_index.query", side_effect=lambda db_path, read, **kwargs: read(None)), \
          patch("os.path.exists", side_effect=exists_side_effect), \
          patch("app.services.sync_service.construct_certificate_path", return_value="/new/path.pdf"), \
          patch("shutil.move", side_effect=PermissionError("File locked")):
@@ -101,3 +103,51 @@ def test_remove_empty_folders_safety():
          # 1. Path is root -> No delete
          sync_service.remove_empty_folders(root_path, root_path=root_path)
          mock_rmdir.assert_not_called()
+
+def _cert(cert_id, cognome, nome, matricola, categoria):
+    cert = MagicMock(id=cert_id)
+    cert.dipendente.cognome, cert.dipendente.nome, cert.dipendente.matricola = cognome, nome, matricola
+    cert.corso.categoria_corso = categoria
+    cert.data_scadenza_calcolata = None
+    return cert
+
+def test_plan_and_execute_file_sync(tmp_path):
+    import os
+    db_path = str(tmp_path)
+    docs = tmp_path / "DOCUMENTI DIPENDENTI"
+    stale = docs / "ROSSI MARIO (1)" / "ATEX" / "ATTIVO" / "ROSSI MARIO (1) - ATEX - no scadenza.pdf"
+    in_place = docs / "VERDI LUCA (2)" / "ATEX" / "ATTIVO" / "VERDI LUCA (2) - ATEX - no scadenza.pdf"
+    for path in (stale, in_place):
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"%PDF-1.4")
+
+    certs = [_cert(1, "ROSSI", "MARIO", "1", "ATEX"), _cert(2, "VERDI", "LUCA", "2", "ATEX"), _cert(3, "NERI", "ANNA", "3", "ATEX")]
+    status_map = {1: "scaduto", 2: "attivo", 3: "attivo"}
+
+    moves, missing = sync_service.plan_file_sync(certs, db_path, status_map)
+    target = docs / "ROSSI MARIO (1)" / "ATEX" / "STORICO" / stale.name
+    assert moves == [{"certificato_id": 1, "source": str(stale), "target": str(target)}]
+    assert missing == [3]
+    assert stale.exists()  # Planning touches nothing
+
+    assert sync_service.execute_file_sync(moves, db_path, workers=2) == 1
+    assert target.exists() and in_place.exists()
+    assert not os.path.exists(stale.parent)  # Emptied folder removed
+    assert sync_service.plan_file_sync(certs, db_path, status_map) == ([], [3])
+
+def test_plan_file_sync_resolves_in_one_pass(tmp_path):
+    docs = tmp_path / "DOCUMENTI DIPENDENTI"
+    for cognome, matricola in (("ROSSI", "1"), ("VERDI", "2")):
+        path = docs / f"{cognome} MARIO ({matricola})" / "ATEX" / "ATTIVO" / f"{cognome} MARIO ({matricola}) - ATEX - no scadenza.pdf"
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"%PDF-1.4")
+    certs = [_cert(1, "ROSSI", "MARIO", "1", "ATEX"), _cert(2, "VERDI", "MARIO", "2", "ATEX"), _cert(3, "NERI", "ANNA", "3", "ATEX")]
+
+    with patch("app.services.sync_service.document_index.query", wraps=sync_service.document_index.query) as mock_query, \
+         patch("app.services.sync_service.find_document") as mock_find:
+        moves, missing = sync_service.plan_file_sync(certs, str(tmp_path), {1: "attivo", 2: "scaduto", 3: "attivo"})
+
+    assert mock_query.call_count == 1
+    mock_find.assert_not_called()
+    assert [move["certificato_id"] for move in moves] == [2]
+    assert missing == [3]
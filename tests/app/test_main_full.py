@@ -33,7 +33,6 @@ async def test_lifespan_success():
                      
                      with patch("app.main.Base.metadata.create_all"), \
                           patch("app.main.seed_database"), \
-                          patch("app.main.genai"), \
                           patch("app.main.settings") as mock_settings:
 
                         mock_settings.GEMINI_API_KEY_ANALYSIS = "key"
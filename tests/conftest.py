@@ -47,7 +47,7 @@ from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
 
 from app.main import app
-from app.db.session import get_db, engine
+from app.db.session import get_db, get_read_db, engine
 from app.db.models import Base, User
 from app.api import deps
 from app.core.db_security import db_security
@@ -133,6 +133,13 @@ def setup_security_manager(test_dirs):
     
     return db_security
 
+@pytest.fixture(autouse=True)
+def reset_document_index():
+    """Tests lay out files directly on disk: every test starts from a fresh document index."""
+    from app.services.document_index import document_index
+    document_index.invalidate()
+    yield
+
 @pytest.fixture(scope="function")
 def db_session(setup_security_manager):
     """
@@ -183,6 +190,7 @@ def test_client(db_session):
         return User(id=1, username="admin", is_admin=True, hashed_password="hashed_secret")
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     app.dependency_overrides[deps.check_write_permission] = lambda: None # Always allow write in basic tests
     app.dependency_overrides[deps.verify_license] = lambda: True # Bypass license check in tests
     app.dependency_overrides[deps.get_current_user] = override_get_current_user
@@ -0,0 +1,49 @@
+from desktop_app.widgets.advanced_filter import DateKeyCache, EMPTY_LABEL, get_date_keys, setup_filterable_treeview
+
+
+class CountingCache(DateKeyCache):
+    parsed = 0
+
+    def __missing__(self, value):
+        self.parsed += 1
+        return super().__missing__(value)
+
+
+class FakeTree:
+    def bind(self, sequence, callback):
+        pass
+
+
+def test_date_keys_for_every_format():
+    keys = DateKeyCache()
+    assert keys["31/12/2025"] == (2025, 12, 31)
+    assert keys["2025-12-31T08:00:00"] == (2025, 12, 31)
+    assert keys[None] == keys[""] == keys["NESSUNA"] == keys["None"] == EMPTY_LABEL
+    assert keys["da definire"] == "da definire"
+
+
+def test_each_distinct_value_is_parsed_once():
+    keys = CountingCache()
+    for _ in range(3):
+        keys["31/12/2025"], keys["01/01/2026"]
+    assert keys.parsed == 2
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(DateKeyCache, "MAX_SIZE", 2)
+    keys = DateKeyCache()
+    keys["01/01/2025"], keys["02/01/2025"], keys["03/01/2025"]
+    assert len(keys) == 1
+
+
+def test_date_filter_uses_the_tree_cache():
+    tree = setup_filterable_treeview(FakeTree(), {})
+    cache = get_date_keys(tree)
+    assert get_date_keys(tree) is cache
+
+    tree._column_filters["scadenza"] = ("date", {(2025, 12, 31), EMPTY_LABEL})
+    assert tree.check_filter("scadenza", "31/12/2025")
+    assert tree.check_filter("scadenza", "NESSUNA")
+    assert not tree.check_filter("scadenza", "2024-01-15")
+    assert tree.check_filter("nome", "ROSSI")  # No filter on the column
+    assert set(cache) == {"31/12/2025", "NESSUNA", "2024-01-15"}
@@ -0,0 +1,61 @@
+from desktop_app.widgets.column_sorter import ColumnSorter
+from desktop_app.widgets.search_index import SearchIndex, int_key, text_key, date_key
+
+
+class FakeTree:
+    """The heading API ColumnSorter uses, without Tk."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.headings = {col: {} for col in columns}
+
+    def __getitem__(self, option):
+        assert option == "columns"
+        return self.columns
+
+    def heading(self, col, **options):
+        self.headings[col].update(options)
+
+    def click(self, col):
+        self.headings[col]["command"]()
+
+
+def test_click_sorts_and_second_click_reverses():
+    tree = FakeTree(("nome", "scadenza"))
+    calls = []
+    sorter = ColumnSorter(tree, {"nome": "Nome", "scadenza": "Scadenza"}, lambda: calls.append((sorter.column, sorter.reverse)))
+    assert tree.headings["nome"]["text"] == "Nome"
+
+    tree.click("nome")
+    tree.click("nome")
+    tree.click("scadenza")
+    assert calls == [("nome", False), ("nome", True), ("scadenza", False)]
+    assert tree.headings["nome"]["text"] == "Nome"
+    assert tree.headings["scadenza"]["text"] == "Scadenza" + ColumnSorter.ARROW_ASC
+
+
+def test_initial_state_shows_its_arrow():
+    tree = FakeTree(("nome",))
+    ColumnSorter(tree, {}, lambda: None, column="nome", reverse=True)
+    assert tree.headings["nome"]["text"] == "nome" + ColumnSorter.ARROW_DESC
+
+
+def test_typed_keys_sort_blanks_last():
+    values = ["10", None, "9", "abc"]
+    assert sorted(values, key=int_key) == ["9", "10", None, "abc"]
+    assert sorted(["b", "", "A"], key=text_key) == ["A", "b", ""]
+    assert sorted(["NESSUNA", "2024-01-15", "31/12/2023"], key=date_key) == ["31/12/2023", "2024-01-15", "NESSUNA"]
+
+
+def test_sort_order_is_computed_once_per_direction():
+    rows = [{"n": 3}, {"n": 1}, {"n": 2}]
+    calls = []
+    index = SearchIndex(rows, sort_keys={"n": lambda r: calls.append(r) or int_key(r["n"])})
+
+    assert index.order("n") == [1, 2, 0]
+    assert index.order("n") == [1, 2, 0]
+    assert len(calls) == 3
+    assert index.order("n", descending=True) == [0, 2, 1]
+    assert len(calls) == 6
+    assert index.search(order_by="n") == [1, 2, 0]
+    assert len(calls) == 6
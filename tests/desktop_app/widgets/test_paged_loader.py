@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock, patch
+import pytest
+from desktop_app.widgets import paged_loader
+from desktop_app.widgets.paged_loader import PagedLoader
+
+
+class FakeWidget:
+    """Queues after() callbacks so the test decides when the Tk thread runs them."""
+
+    def __init__(self):
+        self.pending = []
+        self.alive = True
+
+    def winfo_exists(self):
+        return self.alive
+
+    def after(self, delay, callback):
+        self.pending.append(callback)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            callback()
+
+
+class SyncThread:
+    def __init__(self, target, daemon=None):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+@pytest.fixture
+def loader():
+    api = MagicMock()
+    pages = []
+    with patch.object(paged_loader.threading, "Thread", SyncThread):
+        yield PagedLoader(FakeWidget(), api, lambda *args: pages.append(args), page_size=2), api, pages
+
+
+def _page(items, total, next_cursor):
+    return {"items": items, "total": total, "next_cursor": next_cursor}
+
+
+def test_pages_follow_the_keyset_cursor(loader):
+    loader, api, pages = loader
+    api.get_certificati_page.side_effect = [_page([1, 2], 3, "c2"), _page([3], 3, None)]
+
+    loader.reload(search="rossi")
+    loader.widget.run_pending()
+    assert loader.rows == [1, 2] and loader.has_more
+    loader.load_more()
+    loader.widget.run_pending()
+
+    assert loader.rows == [1, 2, 3] and not loader.has_more
+    assert pages == [([1, 2], 3, True), ([3], 3, False)]
+    assert [c.kwargs for c in api.get_certificati_page.call_args_list] == [
+        {"limit": 2, "cursor": None, "search": "rossi"},
+        {"limit": 2, "cursor": "c2", "search": "rossi"},
+    ]
+    loader.load_more()  # Nothing left
+    assert api.get_certificati_page.call_count == 2
+
+
+def test_responses_for_superseded_filters_are_dropped(loader):
+    loader, api, pages = loader
+    api.get_certificati_page.side_effect = [_page(["old"], 1, None), _page(["new"], 1, None)]
+
+    loader.reload(search="a")
+    loader.reload(search="ab")  # Before the first response reaches the Tk thread
+    loader.widget.run_pending()
+
+    assert loader.rows == ["new"]
+    assert pages == [(["new"], 1, True)]
+
+
+def test_load_more_waits_for_the_running_request(loader):
+    loader, api, pages = loader
+    api.get_certificati_page.side_effect = [_page([1], 2, "c1"), _page([2], 2, None)]
+
+    loader.reload()
+    loader.widget.run_pending()
+    loader.load_more()
+    loader.load_more()  # Still loading: no second request for the same cursor
+    loader.widget.run_pending()
+    assert api.get_certificati_page.call_count == 2
+    assert loader.rows == [1, 2]
+
+
+def test_errors_reach_on_error_only_for_the_current_generation(loader):
+    loader, api, pages = loader
+    errors = []
+    loader.on_error = errors.append
+    api.get_certificati_page.side_effect = [RuntimeError("stale"), RuntimeError("down")]
+
+    loader.reload()
+    loader.reload()
+    loader.widget.run_pending()
+    assert [str(e) for e in errors] == ["down"]
+    assert not loader._loading
+
+
+def test_destroyed_widget_is_not_called_back(loader):
+    loader, api, pages = loader
+    loader.widget.alive = False
+    api.get_certificati_page.return_value = _page([1], 1, None)
+    loader.reload()
+    assert loader.widget.pending == [] and pages == []
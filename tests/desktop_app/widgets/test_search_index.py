@@ -0,0 +1,63 @@
+from desktop_app.widgets.search_index import SearchIndex, text_key
+
+ROWS = [
+    {"id": 1, "nome": "Rossi Mario", "stato": "attivo", "scadenza": "31/12/2025"},
+    {"id": 2, "nome": "Bianchi Luca", "stato": "scaduto", "scadenza": "2024-01-15"},
+    {"id": 3, "nome": "Verdi Anna", "stato": "attivo", "scadenza": None},
+]
+
+
+def _index(rows):
+    return SearchIndex(
+        rows,
+        text=(lambda r: r["nome"],),
+        facets={"stato": lambda r: r["stato"]},
+        display=lambda r: (r["id"], r["nome"]),
+        sort_keys={"nome": lambda r: text_key(r["nome"])},
+    )
+
+
+def test_extend_matches_a_full_build():
+    full = _index(ROWS)
+    paged = _index(ROWS[:1])
+    paged.order("nome")
+    paged.extend(ROWS[1:])
+
+    assert paged.rows == full.rows
+    assert paged.haystacks == full.haystacks
+    assert paged.facets == full.facets
+    assert paged.display == full.display
+    assert paged.order("nome") == full.order("nome") == [1, 0, 2]  # Cached order dropped by extend()
+    assert paged.search("a", stato="attivo") == [0, 2]
+
+
+def test_extend_prepares_only_the_new_rows():
+    seen = []
+    index = SearchIndex(ROWS[:2], display=lambda r: seen.append(r["id"]) or r["id"])
+    index.extend(ROWS[2:])
+    assert seen == [1, 2, 3]
+    assert index.display == [1, 2, 3]
+
+
+def test_facets_are_bitsets_per_value():
+    index = _index(ROWS)
+    assert index.facets["stato"] == {"attivo": 0b101, "scaduto": 0b010}
+    assert index.facet_values("stato") == ["attivo", "scaduto"]
+
+
+def test_search_intersects_facets_and_text():
+    index = _index(ROWS)
+    assert index.search() == [0, 1, 2]
+    assert index.search(stato="attivo") == [0, 2]
+    assert index.search(stato=("attivo", "scaduto")) == [0, 1, 2]
+    assert index.search(stato=None) == [0, 1, 2]
+    assert index.search(stato="archiviato") == []
+    assert index.search("  ROSSI ") == [0]
+    assert index.search("luca", stato="attivo") == []
+    assert index.select("anna") == [ROWS[2]]
+
+
+def test_query_does_not_match_across_fields():
+    index = SearchIndex([{"a": "ross", "b": "i mario"}], text=(lambda r: r["a"], lambda r: r["b"]))
+    assert index.search("ross") == [0]
+    assert index.search("rossi") == []
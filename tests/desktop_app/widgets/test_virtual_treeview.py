@@ -0,0 +1,42 @@
+import tkinter as tk
+from itertools import count
+import pytest
+from desktop_app.widgets.virtual_treeview import VirtualTreeview
+
+
+@pytest.fixture
+def tree():
+    """The row model of a VirtualTreeview, without creating the Tk widget."""
+    tree = VirtualTreeview.__new__(VirtualTreeview)
+    tree._keys, tree._rows, tree._selected = [], {}, set()
+    tree._auto_ids = count(1)
+    tree._schedule_render = lambda: None
+    for iid in "abc":
+        tree.insert("", "end", iid=iid, values=(iid,))
+    return tree
+
+
+@pytest.mark.parametrize("index, expected", [
+    ("end", ["a", "b", "c", "x"]),
+    (0, ["x", "a", "b", "c"]),
+    (1, ["a", "x", "b", "c"]),
+    ("2", ["a", "b", "x", "c"]),
+    ("3", ["a", "b", "c", "x"]),
+    (99, ["a", "b", "c", "x"]),
+    (-1, ["x", "a", "b", "c"]),
+])
+def test_insert_reads_the_index_like_ttk(tree, index, expected):
+    assert tree.insert("", index, iid="x", values=(1,), tags="row") == "x"
+    assert list(tree.get_children()) == expected
+    assert tree._rows["x"] == ((1,), ("row",))
+
+
+def test_insert_rejects_a_non_numeric_index(tree):
+    with pytest.raises(tk.TclError):
+        tree.insert("", "first", iid="x")
+    assert list(tree.get_children()) == ["a", "b", "c"]
+
+
+def test_insert_generates_ids(tree):
+    assert tree.insert("", "end") == "V1"
+    assert tree.row_count == 4